@@ -0,0 +1,236 @@
+import asyncio
+import grpc
+from proto import greenhouse_pb2, greenhouse_pb2_grpc
+
+# Deadline of one setValue call (in seconds)
+COMMAND_TIMEOUT = 2.0
+
+# Extra attempts after a failed setValue call
+COMMAND_RETRIES = 2
+
+# Seconds between two health checks of the pooled channels
+HEALTH_CHECK_INTERVAL = 10
+
+# Upper bound (in seconds) for the wait between two attempts to reopen a watchState stream
+WATCH_MAX_BACKOFF = 30.0
+
+# Status codes after which a command is retried (setValue is idempotent)
+RETRYABLE_CODES = (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+
+# Commands per second sent to each actuator device (0: no limit, one command in flight at a time)
+COMMAND_RATE = 10
+
+class ActuatorChannelPool():
+    """
+    Keeps one long-lived grpc.aio channel and stub per actuator address.
+    Commands reuse the open HTTP/2 connection, so a call costs one RPC instead of a connection handshake.
+    Channels are created lazily in the running event loop.
+    """
+    def __init__(self, timeout: float = COMMAND_TIMEOUT, retries: int = COMMAND_RETRIES) -> None:
+        """
+        Initializes an empty pool.
+
+        Parameters:
+            timeout (float): Deadline of each setValue attempt, in seconds.
+            retries (int): Extra attempts after an UNAVAILABLE or DEADLINE_EXCEEDED error.
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self._channels = {}
+        self._stubs = {}
+
+    def stub(self, address: str):
+        """
+        Returns the stub of an address, opening its channel on first use
+        or when the previous channel was shut down.
+
+        Parameters:
+            address (str): The actuator's gRPC address ("host:port").
+        """
+        channel = self._channels.get(address)
+        if channel is None or channel.get_state() == grpc.ChannelConnectivity.SHUTDOWN:
+            channel = grpc.aio.insecure_channel(address)
+            self._channels[address] = channel
+            self._stubs[address] = greenhouse_pb2_grpc.ActuatorServiceStub(channel)
+        return self._stubs[address]
+
+    async def set_value(self, address: str, request, timeout: float = None):
+        """
+        Calls setValue on an actuator, retrying transient failures with exponential backoff.
+
+        Parameters:
+            address (str): The actuator's gRPC address.
+            request (greenhouse_pb2.ActuatorRequest): The command.
+            timeout (float): Deadline of each attempt (defaults to the pool's timeout).
+
+        Returns:
+            greenhouse_pb2.ActuatorResponse: The actuator's response.
+
+        Raises:
+            grpc.aio.AioRpcError: If every attempt failed.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        for attempt in range(self.retries + 1):
+            try:
+                return await self.stub(address).setValue(request, timeout=timeout)
+            except grpc.aio.AioRpcError as e:
+                if e.code() not in RETRYABLE_CODES or attempt == self.retries:
+                    raise
+                await asyncio.sleep(0.05 * 2 ** attempt)
+
+    def warm(self, addresses):
+        """
+        Opens the channels of the given addresses and starts connecting them in the background.
+        """
+        for address in addresses:
+            self.stub(address)
+            self._channels[address].get_state(try_to_connect=True)
+
+    def health(self) -> dict:
+        """
+        Returns the connectivity state of every pooled channel, nudging idle or failed channels to reconnect.
+
+        Returns:
+            dict: A dictionary mapping each address to its state name (e.g., "READY").
+        """
+        states = {}
+        for address, channel in self._channels.items():
+            state = channel.get_state(try_to_connect=True)
+            states[address] = state.name
+        return states
+
+    async def run_health_checks(self, interval: float = HEALTH_CHECK_INTERVAL):
+        """
+        Checks every channel periodically so connections are re-established before the next command needs them.
+        """
+        while True:
+            for address, state in self.health().items():
+                if state == "TRANSIENT_FAILURE":
+                    print(f"[GATEWAY] Actuator channel {address} is unreachable, reconnecting")
+            await asyncio.sleep(interval)
+
+    async def watch_state(self, address: str, on_state, max_backoff: float = WATCH_MAX_BACKOFF):
+        """
+        Follows the state changes of an actuator over its watchState stream, reopening the stream with
+        exponential backoff when the actuator goes away. Returns if the actuator does not implement the stream
+        (e.g., the multiplexed fleet servers).
+
+        Parameters:
+            address (str): The actuator's gRPC address.
+            on_state: Function (address, greenhouse_pb2.ActuatorState) called with every state received.
+            max_backoff (float): Upper bound (in seconds) for the wait between two attempts.
+        """
+        backoff = 1.0
+        while True:
+            try:
+                async for state in self.stub(address).watchState(greenhouse_pb2.WatchStateRequest()):
+                    backoff = 1.0
+                    on_state(address, state)
+            except grpc.aio.AioRpcError as e:
+                if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                    return
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+    async def close(self):
+        """
+        Closes every channel.
+        """
+        for channel in self._channels.values():
+            await channel.close()
+        self._channels.clear()
+        self._stubs.clear()
+
+class CommandSuperseded(Exception):
+    """
+    Raised for a command that was replaced by a newer command to the same actuator device before it was sent.
+    """
+    def __init__(self, request, newer) -> None:
+        """
+        Parameters:
+            request (greenhouse_pb2.ActuatorRequest): The command that was not sent.
+            newer (greenhouse_pb2.ActuatorRequest): The command that replaced it.
+        """
+        super().__init__(f"Superseded by value {newer.value}")
+        self.request = request
+        self.newer = newer
+
+class ActuatorCommandQueue():
+    """
+    Sends the commands of each actuator device (address, actuator name and deviceId: one multiplexed server,
+    such as a fleet, serves several actuators with the same deviceId) one at a time, at most `rate` per second,
+    keeping only the latest pending command. A command waiting for its turn is superseded by the next one
+    (latest wins), so a storm of commands costs the actuator at most one call per interval, and a caller waits
+    at most for the call in flight, the interval and its own call.
+    """
+    def __init__(self, pool: ActuatorChannelPool, rate: float = COMMAND_RATE) -> None:
+        """
+        Initializes an empty queue.
+
+        Parameters:
+            pool (ActuatorChannelPool): The channels the commands are sent over.
+            rate (float): Commands per second sent to each actuator device (0: no limit).
+        """
+        self.pool = pool
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self.sent = 0  # Commands sent to the actuators
+        self.superseded = 0  # Commands replaced before they were sent
+        self._pending = {}  # Device -> (request, future) of the command waiting to be sent
+        self._senders = {}  # Device -> task sending its commands
+        self._last_sent = {}  # Device -> event loop time of its latest call
+
+    def __len__(self) -> int:
+        """
+        Returns the number of commands waiting to be sent.
+        """
+        return len(self._pending)
+
+    async def submit(self, address: str, request):
+        """
+        Queues a command and waits until it is sent, replacing the command of the same device that waits.
+
+        Parameters:
+            address (str): The actuator's gRPC address.
+            request (greenhouse_pb2.ActuatorRequest): The command.
+
+        Returns:
+            greenhouse_pb2.ActuatorResponse: The actuator's response.
+
+        Raises:
+            CommandSuperseded: If a newer command to the same device was queued before this one was sent.
+            grpc.aio.AioRpcError: If the call failed.
+        """
+        device = (address, request.name, request.deviceId)
+        pending = self._pending.get(device)
+        if pending is not None and not pending[1].done():
+            pending[1].set_exception(CommandSuperseded(pending[0], request))
+            self.superseded += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[device] = (request, future)
+        if device not in self._senders:
+            self._senders[device] = asyncio.create_task(self._send_pending(device))
+        return await future
+
+    async def _send_pending(self, device):
+        """
+        Sends the pending commands of a device until none is left, spacing the calls by the interval.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            while device in self._pending:
+                wait = self._last_sent.get(device, float("-inf")) + self.interval - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)  # Newer commands replace the pending one meanwhile
+                request, future = self._pending.pop(device)
+                self._last_sent[device] = loop.time()
+                try:
+                    response = await self.pool.set_value(device[0], request)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(response)
+                self.sent += 1
+        finally:
+            del self._senders[device]
@@ -0,0 +1,133 @@
+"""
+Compares the actuator gRPC servers of greenhouse.py: the thread-pool server (one worker thread by default,
+as every sensor process used to run it) and the grpc.aio server. Each server runs in a child process;
+this process sends setValue commands over one grpc.aio channel with --in-flight commands outstanding, and
+reports RPCs per second and latency percentiles. With --service-ms, each command also waits that long before
+it is applied (e.g., a slow device bus), which is where one worker thread serializes every caller.
+--watchers watchState streams stay open during the run (as the gateway's --watch-actuators opens one), and
+the run reports the state changes they received: commands must not wait for a thread held by a stream.
+
+Usage (from the src directory):
+    python -m benchmarks.actuator_server --commands 2000 --in-flight 50
+    python -m benchmarks.actuator_server --server thread:1 thread:8 aio:100 --service-ms 5
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import time
+import grpc
+from benchmarks.load import latency_summary
+from greenhouse import Sensor, Actuator, AsyncActuator, run_actuator_server, serve_actuator_async
+from proto import greenhouse_pb2, greenhouse_pb2_grpc
+
+class SlowActuator(Actuator):
+    """
+    A thread-server Actuator that waits a fixed time before applying each command.
+    """
+    def __init__(self, sensor, service_time: float) -> None:
+        super().__init__(sensor)
+        self.service_time = service_time
+
+    def setValue(self, request, context):
+        if self.service_time:
+            time.sleep(self.service_time)
+        return super().setValue(request, context)
+
+class SlowAsyncActuator(AsyncActuator):
+    """
+    A grpc.aio AsyncActuator that waits a fixed time before applying each command.
+    """
+    def __init__(self, sensor, service_time: float) -> None:
+        super().__init__(sensor)
+        self.service_time = service_time
+
+    async def setValue(self, request, context):
+        if self.service_time:
+            await asyncio.sleep(self.service_time)
+        return await super().setValue(request, context)
+
+def serve(kind: str, concurrency: int, port: int, service_time: float):
+    """
+    Runs one actuator server (in a child process), with its output discarded.
+    """
+    sensor = Sensor(id=1, name="sensor_temperature", value=20.0, unit="°C")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if kind == "aio":
+            asyncio.run(serve_actuator_async(SlowAsyncActuator(sensor, service_time), port, concurrency))
+        else:
+            run_actuator_server(SlowActuator(sensor, service_time), port, concurrency)
+
+async def send_commands(address: str, commands: int, in_flight: int, watchers: int = 0) -> dict:
+    """
+    Sends setValue commands over one channel, with at most in_flight outstanding, while watchers
+    watchState streams are open.
+    """
+    async with grpc.aio.insecure_channel(address) as channel:
+        await asyncio.wait_for(channel.channel_ready(), 10)
+        stub = greenhouse_pb2_grpc.ActuatorServiceStub(channel)
+        limit = asyncio.Semaphore(in_flight)
+        latencies, errors = [], 0
+        watch = {"updates": 0, "errors": 0}
+
+        async def follow():
+            try:
+                async for _ in stub.watchState(greenhouse_pb2.WatchStateRequest()):
+                    watch["updates"] += 1
+            except grpc.aio.AioRpcError as e:
+                if e.code() != grpc.StatusCode.CANCELLED:
+                    watch["errors"] += 1  # e.g., RESOURCE_EXHAUSTED beyond the thread server's watch streams
+
+        streams = [asyncio.create_task(follow()) for _ in range(watchers)]
+        await asyncio.sleep(0.1)  # Let the streams open before the commands
+
+        async def send(value: float):
+            nonlocal errors
+            async with limit:
+                start = time.perf_counter()
+                try:
+                    await stub.setValue(greenhouse_pb2.ActuatorRequest(deviceId=1, value=value, active=True), timeout=30)
+                    latencies.append(time.perf_counter() - start)
+                except grpc.aio.AioRpcError:
+                    errors += 1  # e.g., RESOURCE_EXHAUSTED beyond the aio server's concurrency
+
+        await send(0.0)  # Warm up the connection
+        latencies.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(send(index % 100 / 10) for index in range(commands)))
+        elapsed = time.perf_counter() - start
+        for stream in streams:
+            stream.cancel()
+    return {
+        "rpcs_per_sec": round(len(latencies) / elapsed, 1), "errors": errors,
+        "watch_updates": watch["updates"], "watch_errors": watch["errors"], **latency_summary(latencies),
+    }
+
+def run(server: str, args) -> dict:
+    """
+    Benchmarks one server ("thread:<workers>" or "aio:<concurrency>").
+    """
+    kind, concurrency = server.split(":")
+    process = multiprocessing.Process(target=serve, args=(kind, int(concurrency), args.port, args.service_ms / 1000), daemon=True)
+    process.start()
+    try:
+        result = asyncio.run(send_commands(f"localhost:{args.port}", args.commands, args.in_flight, args.watchers))
+    finally:
+        process.terminate()
+        process.join()
+    return {"server": server, "service_ms": args.service_ms, "in_flight": args.in_flight, "watchers": args.watchers, **result}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the thread-pool and grpc.aio actuator servers.")
+    parser.add_argument("--server", nargs="+", default=["thread:1", "aio:100"], help="Servers to benchmark (thread:<workers> or aio:<concurrency>)")
+    parser.add_argument("--commands", type=int, default=2000, help="Commands sent to each server")
+    parser.add_argument("--in-flight", type=int, default=50, help="Commands outstanding at a time")
+    parser.add_argument("--service-ms", type=float, default=0.0, help="Milliseconds each command waits before it is applied")
+    parser.add_argument("--watchers", type=int, default=1, help="watchState streams open during the run")
+    parser.add_argument("--port", type=int, default=50181, help="Port of the actuator server")
+    args = parser.parse_args()
+
+    for server in args.server:
+        print(json.dumps(run(server, args)))
@@ -0,0 +1,154 @@
+"""
+Compares actuator command latency of a new channel per call with the pooled grpc.aio channels,
+against a local Actuator server. Then sends a storm of commands to an actuator that takes --service-ms
+per command, directly through the pool and through the latest-wins command queue.
+
+Usage (from the src directory):
+    python -m benchmarks.actuators --commands 500 --concurrency 100
+    python -m benchmarks.actuators --storm 200 --spacing-ms 1 --service-ms 5 --rate 0 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import threading
+import time
+import grpc
+from concurrent.futures import ThreadPoolExecutor
+from actuators import ActuatorChannelPool, ActuatorCommandQueue, CommandSuperseded
+from greenhouse import Sensor, Actuator, run_actuator_server
+from proto import greenhouse_pb2, greenhouse_pb2_grpc
+
+def percentiles(latencies) -> dict:
+    """
+    Returns the p50 and p99 of a list of latencies (seconds), in milliseconds.
+    """
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+    }
+
+def channel_per_call(address: str, commands: int, concurrency: int) -> dict:
+    """
+    Sends commands the way the gateway used to: one channel per command, from a thread pool.
+    """
+    latencies = []
+
+    def send():
+        start = time.perf_counter()
+        with grpc.insecure_channel(address) as channel:
+            stub = greenhouse_pb2_grpc.ActuatorServiceStub(channel)
+            stub.setValue(greenhouse_pb2.ActuatorRequest(value=1.0))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(commands):
+            executor.submit(send)
+    elapsed = time.perf_counter() - start
+    return {"path": "channel_per_call", "commands_per_sec": round(commands / elapsed, 1), **percentiles(latencies)}
+
+async def pooled(address: str, commands: int, concurrency: int) -> dict:
+    """
+    Sends commands through the pooled grpc.aio channel with bounded concurrency.
+    """
+    pool = ActuatorChannelPool()
+    await pool.set_value(address, greenhouse_pb2.ActuatorRequest(value=1.0))  # Open the connection once
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def send():
+        async with limit:
+            start = time.perf_counter()
+            await pool.set_value(address, greenhouse_pb2.ActuatorRequest(value=1.0))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send() for _ in range(commands)))
+    elapsed = time.perf_counter() - start
+    await pool.close()
+    return {"path": "pooled_aio", "commands_per_sec": round(commands / elapsed, 1), **percentiles(latencies)}
+
+class SlowActuator(Actuator):
+    """
+    An Actuator that takes a fixed time per command and counts the commands it received.
+    """
+    def __init__(self, sensor, service_time: float) -> None:
+        super().__init__(sensor)
+        self.service_time = service_time
+        self.calls = 0
+
+    def setValue(self, request, context):
+        self.calls += 1
+        time.sleep(self.service_time)
+        return super().setValue(request, context)
+
+async def storm(address: str, actuator: SlowActuator, commands: int, spacing: float, rate: float = None) -> dict:
+    """
+    Sends commands with increasing values every `spacing` seconds without waiting for the previous ones,
+    through the pool (rate None) or through a command queue with the given rate.
+    """
+    pool = ActuatorChannelPool()
+    await pool.set_value(address, greenhouse_pb2.ActuatorRequest(value=-1.0))  # Open the connection once
+    queue = ActuatorCommandQueue(pool, rate) if rate is not None else None
+    actuator.calls = 0
+    latencies, superseded = [], 0
+
+    async def send(value: float):
+        nonlocal superseded
+        request = greenhouse_pb2.ActuatorRequest(value=value)
+        start = time.perf_counter()
+        try:
+            await (pool.set_value(address, request) if queue is None else queue.submit(address, request))
+        except CommandSuperseded:
+            superseded += 1
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    for i in range(commands):
+        tasks.append(asyncio.create_task(send(float(i))))
+        await asyncio.sleep(spacing)
+    await asyncio.gather(*tasks)
+    await pool.close()
+    return {
+        "path": "pooled_storm" if queue is None else f"queued_storm_rate_{rate:g}",
+        "commands": commands,
+        "actuator_calls": actuator.calls,
+        "superseded": superseded,
+        **percentiles(latencies),
+        "final_value": actuator.sensor.value,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark actuator command paths.")
+    parser.add_argument("--commands", type=int, default=500, help="Commands per run")
+    parser.add_argument("--concurrency", type=int, default=100, help="Commands in flight")
+    parser.add_argument("--port", type=int, default=50151, help="Port of the local Actuator server (the storm uses the next one)")
+    parser.add_argument("--storm", type=int, default=200, help="Commands of the storm")
+    parser.add_argument("--spacing-ms", type=float, default=1.0, help="Milliseconds between two commands of the storm")
+    parser.add_argument("--service-ms", type=float, default=5.0, help="Milliseconds the storm's actuator takes per command")
+    parser.add_argument("--rate", type=float, nargs="+", default=[0, 10], help="Command queue rates of the storm (0: no limit)")
+    args = parser.parse_args()
+
+    address = f"localhost:{args.port}"
+    sensor = Sensor(id=1, name="sensor_benchmark", value=20.0, unit="°C")
+
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence the actuator's per-command prints
+        threading.Thread(target=run_actuator_server, args=(Actuator(sensor), args.port), daemon=True).start()
+        time.sleep(0.5)
+        results.append(channel_per_call(address, args.commands, args.concurrency))
+        results.append(asyncio.run(pooled(address, args.commands, args.concurrency)))
+
+        slow = SlowActuator(Sensor(id=1, name="sensor_benchmark", value=20.0, unit="°C"), args.service_ms / 1000)
+        threading.Thread(target=run_actuator_server, args=(slow, args.port + 1), daemon=True).start()
+        time.sleep(0.5)
+        storm_address = f"localhost:{args.port + 1}"
+        results.append(asyncio.run(storm(storm_address, slow, args.storm, args.spacing_ms / 1000)))
+        for rate in args.rate:
+            results.append(asyncio.run(storm(storm_address, slow, args.storm, args.spacing_ms / 1000, rate)))
+
+    for result in results:
+        print(json.dumps(result))
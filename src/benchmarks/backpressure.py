@@ -0,0 +1,123 @@
+"""
+Replays a reconnect burst (every sensor publishing a backlog of readings at once) through the in-memory broker
+into the gateway's consumer, once per overflow policy of the ingest queue, each in a child process.
+Reports the readings stored and shed, the peak depths of the broker and of the ingest queue,
+and the lag from publish to storage. With --broker-watermark, the broker raises its memory alarm at that depth,
+and the publisher waits --flow-wait seconds for it to clear before dropping a batch.
+
+Usage (from the src directory):
+    python -m benchmarks.backpressure --sensors 1000 --readings 20
+    python -m benchmarks.backpressure --policy block --broker-watermark 5000 --flow-wait 0.05
+"""
+import argparse
+import collections
+import contextlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from benchmarks.load import latency_summary
+from ingest import OVERFLOW_POLICIES, INGEST_QUEUE_SIZE, SAMPLE_RATE
+from proto import greenhouse_pb2
+
+# Readings handed to the publisher in one publish_many() call
+PUBLISH_BATCH = 500
+
+# Seconds between two samples of the queue depths
+MONITOR_PERIOD = 0.005
+
+def burst(policy: str, args, results):
+    """
+    Runs the gateway's consumer and one burst in this (child) process, and reports what was stored.
+    """
+    import gateway
+    from publisher import PublisherBlocked, StatusPublisher, SENSOR_EXCHANGE, routing_key
+    from transport import MEMORY_HOST, get_memory_broker
+
+    broker = get_memory_broker()
+    broker.high_watermark = args.broker_watermark
+    stored, lags = collections.Counter(), []
+    ingest = gateway.ingest_status
+
+    def recording_ingest(status, source):
+        device = ingest(status, source)
+        stored[status.deviceId] += 1
+        lags.append(time.time() - status.timestamp)
+        return device
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gateway.ingest_status = recording_ingest
+        gateway.RABBITMQ_HOST = MEMORY_HOST
+        gateway.config.queues = []  # Sensors publish to the topic exchange
+        gateway.INGEST_QUEUE, gateway.OVERFLOW, gateway.SAMPLING = args.queue_size, policy, args.sample_rate
+        threading.Thread(target=gateway.consume_sensors, daemon=True).start()
+        time.sleep(0.5)  # Let the consumer bind its queue before sensors publish
+
+        peaks = {"broker": 0, "ingest_queue": 0}
+
+        def monitor():
+            while True:
+                peaks["broker"] = max(peaks["broker"], broker.depth())
+                peaks["ingest_queue"] = max(peaks["ingest_queue"], gateway.pipeline.depth())
+                time.sleep(MONITOR_PERIOD)
+
+        threading.Thread(target=monitor, daemon=True).start()
+        publisher = StatusPublisher(host=MEMORY_HOST, exchange=SENSOR_EXCHANGE, flow_wait=args.flow_wait)
+        keys = [routing_key("sensor_temperature", sensor, SENSOR_EXCHANGE) for sensor in range(args.sensors)]
+        messages = [
+            (keys[sensor], sensor)
+            for reading in range(args.readings)
+            for sensor in range(args.sensors)
+        ]
+
+        start = time.perf_counter()
+        for offset in range(0, len(messages), PUBLISH_BATCH):
+            batch = [
+                (key, greenhouse_pb2.DeviceStatus(deviceId=sensor, name="sensor_temperature", value=20.0, unit="°C", timestamp=time.time()).SerializeToString())
+                for key, sensor in messages[offset:offset + PUBLISH_BATCH]
+            ]
+            try:
+                publisher.publish_many(batch)
+            except PublisherBlocked:
+                pass  # Counted in publisher.messages_dropped
+        published = time.perf_counter() - start
+
+        # Wait until the broker and the ingest queue are drained
+        pipeline = gateway.pipeline
+        while broker.depth() or pipeline.depth() or pipeline.messages + pipeline.dropped + pipeline.sampler.skipped < publisher.messages_published:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+
+    results.put({
+        "policy": policy,
+        "offered": len(messages),
+        "publisher_dropped": publisher.messages_dropped,
+        "stored": sum(stored.values()),
+        "dropped": gateway.pipeline.dropped,
+        "sampled_out": gateway.pipeline.sampler.skipped,
+        "min_per_sensor": min(stored[sensor] for sensor in range(args.sensors)),
+        "peak_broker_depth": peaks["broker"],
+        "peak_ingest_queue": peaks["ingest_queue"],
+        "publish_seconds": round(published, 3),
+        "drain_seconds": round(elapsed, 3),
+        **{f"lag_{key}": value for key, value in latency_summary(lags).items()},
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a sensor reconnect burst through each ingest overflow policy.")
+    parser.add_argument("--policy", choices=OVERFLOW_POLICIES, nargs="+", default=list(OVERFLOW_POLICIES), help="Overflow policies to run")
+    parser.add_argument("--sensors", type=int, default=1000, help="Sensors publishing at once")
+    parser.add_argument("--readings", type=int, default=20, help="Readings published by each sensor")
+    parser.add_argument("--queue-size", type=int, default=INGEST_QUEUE_SIZE, help="Messages buffered for the ingest workers")
+    parser.add_argument("--sample-rate", type=int, default=SAMPLE_RATE, help="Readings of each sensor kept while sampling (1 of N)")
+    parser.add_argument("--broker-watermark", type=int, help="Queued messages at which the broker blocks publishers")
+    parser.add_argument("--flow-wait", type=float, default=1.0, help="Seconds the publisher waits for the broker to unblock it")
+    args = parser.parse_args()
+
+    results = multiprocessing.Queue()
+    for policy in args.policy:
+        process = multiprocessing.Process(target=burst, args=(policy, args, results))
+        process.start()
+        print(json.dumps(results.get()))
+        process.join()
@@ -0,0 +1,94 @@
+"""
+Measures readings/sec for batch sizes 1, 10, 100 and 1000: batching and encoding on the sensor side,
+optional publishing to RabbitMQ, and batch decoding on the gateway side.
+
+Usage (from the src directory):
+    python -m benchmarks.batching --readings 100000
+    python -m benchmarks.batching --broker localhost   # also publish through RabbitMQ
+"""
+import argparse
+import json
+import time
+from proto import greenhouse_pb2
+from publisher import StatusPublisher, BatchingPublisher, BATCH_TYPE
+
+# Queue used by the benchmark when publishing to RabbitMQ
+BENCH_QUEUE = "queue_benchmark_batching"
+
+class CollectingPublisher():
+    """
+    Publisher that keeps the messages in memory, to measure encoding and decoding without a broker.
+    """
+    def __init__(self):
+        self.messages = []
+
+    def publish_many(self, messages, properties=None):
+        self.messages.extend((key, body, properties) for key, body in messages)
+
+    def publish(self, queue_name, body):
+        self.publish_many([(queue_name, body)])
+
+class TeePublisher(CollectingPublisher):
+    """
+    Publisher that sends the messages to RabbitMQ and keeps them for the decoding step.
+    """
+    def __init__(self, publisher):
+        super().__init__()
+        self.publisher = publisher
+
+    def publish_many(self, messages, properties=None):
+        self.publisher.publish_many(messages, properties=properties)
+        super().publish_many(messages, properties)
+
+def decode(messages) -> int:
+    """
+    Decodes messages the way the gateway callback does and returns the number of readings.
+    """
+    readings = 0
+    for _, body, properties in messages:
+        if properties is not None and properties.type == BATCH_TYPE:
+            readings += len(greenhouse_pb2.DeviceStatusBatch.FromString(body).readings)
+        else:
+            greenhouse_pb2.DeviceStatus.FromString(body)
+            readings += 1
+    return readings
+
+def run(batch_size: int, bodies, broker: str) -> dict:
+    """
+    Publishes every reading with one batch size and decodes the resulting messages.
+    """
+    sink = TeePublisher(StatusPublisher(host=broker)) if broker else CollectingPublisher()
+    publisher = sink if batch_size == 1 else BatchingPublisher(sink, max_batch=batch_size, linger=3600)
+
+    start = time.perf_counter()
+    for body in bodies:
+        publisher.publish(BENCH_QUEUE, body)
+    if batch_size > 1:
+        publisher.flush()
+    publish_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    readings = decode(sink.messages)
+    decode_seconds = time.perf_counter() - start
+
+    return {
+        "batch_size": batch_size,
+        "messages": len(sink.messages),
+        "bytes_per_reading": round(sum(len(body) for _, body, _ in sink.messages) / readings, 1),
+        "publish_readings_per_sec": round(readings / publish_seconds),
+        "decode_readings_per_sec": round(readings / decode_seconds),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DeviceStatusBatch sizes.")
+    parser.add_argument("--readings", type=int, default=100000, help="Readings per run")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000], help="Batch sizes")
+    parser.add_argument("--broker", default="", help="RabbitMQ host (in-memory if empty)")
+    args = parser.parse_args()
+
+    bodies = [
+        greenhouse_pb2.DeviceStatus(deviceId=i % 1000, name="sensor_temperature", value=20.0 + i % 7, unit="°C", timestamp=time.time()).SerializeToString()
+        for i in range(args.readings)
+    ]
+    for size in args.sizes:
+        print(json.dumps(run(size, bodies, args.broker)))
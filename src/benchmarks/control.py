@@ -0,0 +1,95 @@
+"""
+Deterministic closed-loop simulation of the gateway's control engine against an in-process Sensor
+and its Actuator gRPC server. Each tick, the sensor takes a seeded random-walk step plus a constant drift
+(e.g., heat loss), its reading goes through gateway.ingest_status, and the command of the control loop is
+awaited before the next tick, so the sensor trajectory is the same on every run. Reaction times are the
+wall-clock times from ingesting a reading to the actuator's response.
+The setpoint tracking itself is checked by tests/test_control.py.
+
+Usage (from the src directory):
+    python -m benchmarks.control --ticks 300 --setpoint 22 --drift 0.3
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import threading
+import time
+from proto import greenhouse_pb2
+from benchmarks.load import latency_summary
+
+# Control modes simulated ("open" runs without a loop)
+MODES = ("open", "pid", "hysteresis")
+
+def simulate(mode: str, args) -> dict:
+    """
+    Runs one closed-loop simulation and summarizes how well the sensor was held at the setpoint.
+    """
+    import gateway
+    from greenhouse import Sensor, Actuator, run_actuator_server
+
+    random.seed(args.seed)
+    sensor = Sensor(id=1, name="sensor_temperature", value=args.initial, unit="°C", noise=args.noise)
+    port = args.port + MODES.index(mode)
+    threading.Thread(target=run_actuator_server, args=(Actuator(sensor), port), daemon=True).start()
+    time.sleep(0.5)  # Let the server bind its port
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    gateway.control.start(loop)
+    gateway.config.actuators = {"actuator_temperature": f"localhost:{port}"}
+    gateway.control.loops.clear()
+    if mode != "open":
+        gateway.set_control_loop("sensor_temperature", 1, gateway.ControlSettings(
+            actuator="actuator_temperature", deviceId=1, mode=mode, setpoint=args.setpoint, band=args.band,
+        ))
+
+    # Keep the command future of each reading, to wait for it before the next tick
+    commands = []
+    on_reading = gateway.control.on_reading
+    gateway.control.on_reading = lambda *reading: commands.append(on_reading(*reading))
+
+    start, trajectory, reactions = 1_700_000_000.0, [], []
+    for tick in range(args.ticks):
+        sensor.step()
+        sensor.value = round(sensor.value - args.drift, 2)
+        trajectory.append(sensor.value)
+        status = greenhouse_pb2.DeviceStatus(deviceId=1, name=sensor.name, value=sensor.value, unit=sensor.unit, timestamp=start + tick * args.period)
+        received = time.perf_counter()
+        gateway.ingest_status(status, "simulation")
+        if commands[-1] is not None:
+            commands[-1].result(timeout=5)
+            reactions.append(time.perf_counter() - received)
+
+    gateway.control.on_reading = on_reading
+    settled = [abs(value - args.setpoint) for value in trajectory[args.ticks // 2:]]
+    return {
+        "mode": mode,
+        "final_value": trajectory[-1],
+        "mean_abs_error": round(sum(settled) / len(settled), 3),
+        "max_abs_error": round(max(settled), 3),
+        "commands": len(reactions),
+        **{f"reaction_{key}": value for key, value in latency_summary(reactions).items()},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the gateway's control loops against an in-process sensor and actuator.")
+    parser.add_argument("--mode", choices=MODES, nargs="+", default=list(MODES), help="Control modes to simulate")
+    parser.add_argument("--ticks", type=int, default=300, help="Readings simulated")
+    parser.add_argument("--period", type=float, default=2.0, help="Simulated seconds between two readings")
+    parser.add_argument("--initial", type=float, default=15.0, help="Initial sensor value")
+    parser.add_argument("--setpoint", type=float, default=22.0, help="Setpoint of the loop")
+    parser.add_argument("--drift", type=float, default=0.3, help="Value lost by the sensor every tick")
+    parser.add_argument("--noise", type=float, default=0.2, help="Standard deviation of the sensor's random walk")
+    parser.add_argument("--band", type=float, default=0.5, help="Half-width of the hysteresis band")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the sensor's random walk")
+    parser.add_argument("--port", type=int, default=50161, help="First port of the local actuators")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.mode:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results[mode] = simulate(mode, args)
+        print(json.dumps(results[mode]))
@@ -0,0 +1,87 @@
+"""
+Measures per-process memory and publish throughput of the asyncio fleet host.
+Each fleet size runs in its own child process so the RSS figures do not accumulate.
+
+Usage (from the src directory):
+    python -m benchmarks.fleet --sizes 100 1000 10000 --duration 20
+    python -m benchmarks.fleet --broker localhost   # publish to a real RabbitMQ
+    python -m benchmarks.fleet --engine vectorized --sizes 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+from fleet import run_fleet
+from greenhouse import Sensor
+from publisher import StatusPublisher
+
+class CountingPublisher():
+    """
+    Publisher that only counts messages, to measure the host without a broker.
+    """
+    def __init__(self):
+        self.messages_published = 0
+
+    def publish_many(self, messages):
+        self.messages_published += len(messages)
+
+def rss_mb() -> float:
+    """
+    Returns the current resident set size of the process in MiB.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Peak RSS (KiB on Linux)
+
+def run_child(sensors: int, duration: float, interval: float, broker: str, engine: str):
+    """
+    Runs one fleet size and prints its results as JSON.
+    """
+    baseline = rss_mb()
+    fleet = [Sensor(id=i, name="sensor_temperature", value=20.0, unit="°C") for i in range(1, sensors + 1)]
+    publisher = StatusPublisher(host=broker) if broker else CountingPublisher()
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    asyncio.run(run_fleet(fleet, publisher, port=0, publish_interval=interval, duration=duration, engine=engine))
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "sensors": sensors,
+        "engine": engine,
+        "seconds": round(elapsed, 1),
+        "messages": publisher.messages_published,
+        "messages_per_sec": round(publisher.messages_published / elapsed, 1),
+        "expected_per_sec": round(sensors / interval, 1),
+        "cpu_percent": round(100 * (time.process_time() - cpu_start) / elapsed, 1),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_per_sensor_kb": round((rss_mb() - baseline) * 1024 / sensors, 2),
+    }))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the asyncio fleet host.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Fleet sizes to run")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per run")
+    parser.add_argument("--publish-interval", type=float, default=2.0, help="Seconds between publishes of a sensor")
+    parser.add_argument("--broker", default="", help="RabbitMQ host (counts messages in-process if empty)")
+    parser.add_argument("--engine", choices=["tasks", "vectorized"], default="tasks", help="Simulation engine")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.duration, args.publish_interval, args.broker, args.engine)
+    else:
+        for size in args.sizes:
+            subprocess.run([
+                sys.executable, "-m", "benchmarks.fleet", "--child", str(size),
+                "--duration", str(args.duration), "--publish-interval", str(args.publish_interval),
+                "--broker", args.broker, "--engine", args.engine,
+            ], check=True)
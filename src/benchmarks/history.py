@@ -0,0 +1,55 @@
+"""
+Compares the memory used per sample by the old deque-of-dicts sensor history and by the columnar RingBuffer.
+
+Usage (from the src directory):
+    python -m benchmarks.history --samples 3600
+"""
+import argparse
+import json
+import tracemalloc
+from collections import deque
+from ringbuffer import RingBuffer
+
+def deque_of_dicts(samples: int) -> int:
+    """
+    Fills a deque the way the gateway used to and returns the bytes it allocated.
+    """
+    tracemalloc.start()
+    history = deque(maxlen=samples)
+    for i in range(samples):
+        value = 20.0 + i * 0.01
+        history.append({
+            "id": 1,
+            "value": f"{round(value, 2)}",
+            "unit": "°C",
+            "name": "sensor_temperature"
+        })
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated
+
+def ring_buffer(samples: int) -> int:
+    """
+    Fills a RingBuffer and returns the bytes it allocated.
+    """
+    tracemalloc.start()
+    history = RingBuffer(samples)
+    for i in range(samples):
+        history.append(1_700_000_000.0 + i, 20.0 + i * 0.01)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sensor history memory.")
+    parser.add_argument("--samples", type=int, nargs="+", default=[20, 3600, 43200], help="Samples per device")
+    args = parser.parse_args()
+
+    for samples in args.samples:
+        old, new = deque_of_dicts(samples), ring_buffer(samples)
+        print(json.dumps({
+            "samples": samples,
+            "deque_bytes_per_sample": round(old / samples, 1),
+            "ring_bytes_per_sample": round(new / samples, 1),
+            "ratio": round(old / new, 1),
+        }))
@@ -0,0 +1,160 @@
+"""
+Measures sustained gateway ingest throughput (messages/sec) of the old inline, auto-ack callback,
+of an inline callback acknowledging each message, and of the worker pipeline with prefetch and batched acknowledgements.
+
+An in-process stand-in replaces the broker connection. It decodes each delivery from real AMQP frames with
+pika's frame decoder and marshals every acknowledgement frame, on the thread calling deliver() (the connection
+thread), delivers messages under the prefetch limit, and runs the callbacks and timers pika would run.
+Printing goes to /dev/null, so the old path's console cost is a lower bound.
+
+Usage (from the src directory):
+    python -m benchmarks.ingest --messages 50000 --workers 1 2 4
+"""
+import argparse
+import contextlib
+import heapq
+import io
+import json
+import os
+import queue
+import sys
+import tempfile
+import time
+from pika import frame, spec
+import gateway
+from ingest import IngestPipeline, PREFETCH_COUNT
+from proto import greenhouse_pb2
+from tsdb import TimeSeriesStore
+
+class StandInConnection():
+    """
+    The parts of pika.BlockingConnection the pipeline uses. The thread calling deliver() plays the connection thread.
+    """
+    def __init__(self) -> None:
+        self.acked = 0
+        self._callbacks = queue.Queue()
+        self._timers = []
+
+    def add_callback_threadsafe(self, callback):
+        self._callbacks.put(callback)
+
+    def call_later(self, delay: float, callback):
+        heapq.heappush(self._timers, (time.perf_counter() + delay, id(callback), callback))
+
+    def basic_ack(self, delivery_tag: int, multiple: bool = False):
+        frame.Method(1, spec.Basic.Ack(delivery_tag, multiple)).marshal()
+        self.acked = delivery_tag
+
+    def _run_pending(self, timeout: float):
+        while self._timers and self._timers[0][0] <= time.perf_counter():
+            heapq.heappop(self._timers)[2]()
+        try:
+            self._callbacks.get(timeout=timeout)()
+        except queue.Empty:
+            pass
+
+    def deliver(self, callback, messages, prefetch: int):
+        """
+        Delivers every message, never more than `prefetch` unacknowledged ones, and waits until all are acknowledged.
+        """
+        tag = 0
+        while self.acked < len(messages):
+            if tag < len(messages) and tag - self.acked < prefetch:
+                method, properties, body = decode_delivery(messages[tag])
+                tag += 1
+                callback(self, method, properties, body)
+                if tag % 64 == 0:
+                    self._run_pending(0)
+            else:
+                self._run_pending(0.001)
+
+def make_messages(count: int, devices: int):
+    """
+    Builds the AMQP frames (Basic.Deliver, content header, body) delivering serialized DeviceStatus messages
+    spread over `devices` routing keys. Delivery tags start at 1, as on a new channel.
+    """
+    messages = []
+    for i in range(count):
+        device_id = i % devices
+        status = greenhouse_pb2.DeviceStatus(deviceId=device_id, name="sensor_benchmark", value=20.0 + i % 7, unit="°C", timestamp=1.7e9 + i)
+        body = status.SerializeToString()
+        deliver = spec.Basic.Deliver("benchmark", i + 1, False, "greenhouse.sensors", f"sensor.sensor_benchmark.{device_id}")
+        messages.append(
+            frame.Method(1, deliver).marshal()
+            + frame.Header(1, len(body), spec.BasicProperties()).marshal()
+            + frame.Body(1, body).marshal()
+        )
+    return messages
+
+def decode_delivery(data: bytes):
+    """
+    Decodes the frames of one delivery with pika's decoder.
+
+    Returns:
+        tuple: The Basic.Deliver method, the message properties and the body.
+    """
+    used, method_frame = frame.decode_frame(data)
+    offset = used
+    used, header_frame = frame.decode_frame(data[offset:])
+    offset += used
+    used, body_frame = frame.decode_frame(data[offset:])
+    return method_frame.method, header_frame.properties, body_frame.fragment
+
+def inline_callback(verbose: bool, ack: bool = False):
+    """
+    Returns an inline consumer callback: parse, optionally print, and store on the consumer thread.
+    Messages are acknowledged one by one if `ack` is set, and on delivery (auto_ack) otherwise.
+    """
+    def callback(ch, method, properties, body):
+        status = greenhouse_pb2.DeviceStatus()
+        status.ParseFromString(body)
+        if verbose:
+            print(f"[GATEWAY] Message received from queue {method.routing_key}:")
+            print(f"  - ID: {status.deviceId}")
+            print(f"  - Name: {status.name}")
+            print(f"  - Value: {round(status.value, 2)} {status.unit}")
+        gateway.ingest_status(status, method.routing_key)
+        if ack:
+            ch.basic_ack(method.delivery_tag)
+        else:
+            ch.acked = method.delivery_tag  # auto_ack: acknowledged on delivery
+    return callback
+
+def run(callback, messages, prefetch: int, connection=None) -> int:
+    """
+    Delivers the messages to a callback and returns the sustained messages/sec.
+    """
+    connection = connection or StandInConnection()
+    start = time.perf_counter()
+    connection.deliver(callback, messages, prefetch)
+    return round(len(messages) / (time.perf_counter() - start))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark gateway ingest throughput.")
+    parser.add_argument("--messages", type=int, default=50000, help="Messages per run")
+    parser.add_argument("--devices", type=int, default=1000, help="Distinct devices (routing keys)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to test")
+    parser.add_argument("--prefetch", type=int, default=PREFETCH_COUNT, help="Prefetch count of the pipeline runs")
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages, args.devices)
+    with tempfile.TemporaryDirectory() as data_dir:
+        gateway.store = TimeSeriesStore(data_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Register every device up front so registration messages are not timed
+            StandInConnection().deliver(inline_callback(False), messages[:args.devices], len(messages))
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            rate = run(inline_callback(True), messages, len(messages))
+        print(json.dumps({"path": "inline_print_auto_ack", "messages_per_sec": rate}))
+        rate = run(inline_callback(False, ack=True), messages, args.prefetch)
+        print(json.dumps({"path": "inline_ack_each", "prefetch": args.prefetch, "messages_per_sec": rate}))
+
+        for workers in args.workers:
+            connection = StandInConnection()
+            pipeline = IngestPipeline(gateway.handle_message, workers=workers)
+            pipeline.attach(connection, connection)
+            pipeline.start()
+            rate = run(pipeline.on_message, messages, args.prefetch, connection)
+            print(json.dumps({"path": "pipeline_batched_acks", "workers": workers, "prefetch": args.prefetch, "messages_per_sec": rate}))
+        sys.stdout.flush()
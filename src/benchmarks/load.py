@@ -0,0 +1,330 @@
+"""
+End-to-end load scenarios, runnable offline: sensors publish through the in-memory broker
+(transport.MEMORY_HOST) to the gateway's real consumer, dashboards poll /sensors, and the gateway
+sends command storms to a local gRPC Actuator. Each scenario prints one JSON line with its throughput,
+p50/p99 latency, and the CPU and RSS of the process under test.
+
+Scenarios:
+    ingest     N simulated sensors publish at a fixed interval; latency is sensor timestamp to gateway ingest.
+    poll       Dashboards poll /sensors with since= and If-None-Match while sensors publish; latency per request.
+               With --http-workers N, N uvicorn workers serve the polls from the shared memory registry.
+    actuators  Concurrent setValue commands through the gateway's channel pool; latency per command.
+
+Usage (from the src directory):
+    python -m benchmarks.load --scenario ingest --sensors 1000 --interval 0.5 --seconds 10
+    python -m benchmarks.load --scenario poll --sensors 200 --clients 20 --poll-interval 0.5
+    python -m benchmarks.load --scenario poll --clients 64 --poll-interval 0 --full --http-workers 1 4
+    python -m benchmarks.load --scenario actuators --commands 5000 --concurrency 64
+    python -m benchmarks.load --output results.jsonl   # every scenario, results appended to a file
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import httpx
+from proto import greenhouse_pb2
+
+# Scenarios run when none is given
+SCENARIOS = ("ingest", "poll", "actuators")
+
+def percentile(samples, fraction: float) -> float:
+    """
+    Returns a percentile of the samples (nearest rank), or 0 if there are none.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def latency_summary(samples) -> dict:
+    """
+    Returns the p50 and p99 of latencies given in seconds, in milliseconds.
+    """
+    return {"p50_ms": round(percentile(samples, 0.50) * 1000, 3), "p99_ms": round(percentile(samples, 0.99) * 1000, 3)}
+
+def process_usage(pid: int) -> dict:
+    """
+    Returns the CPU seconds used so far and the resident set size of a process (Linux /proc).
+    """
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")  # utime + stime
+    rss = 0.0
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) / 1024
+    return {"cpu_seconds": cpu, "rss_mb": rss}
+
+def tree_usage(pid: int) -> dict:
+    """
+    Returns process_usage() summed over a process and its descendants (e.g., uvicorn and its workers).
+    """
+    total = {"cpu_seconds": 0.0, "rss_mb": 0.0}
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            usage = process_usage(current)
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pending += [int(child) for child in children.read().split()]
+        except OSError:
+            continue  # The process exited
+        total = {key: total[key] + usage[key] for key in total}
+    return total
+
+def usage_between(start: dict, end: dict, seconds: float) -> dict:
+    """
+    Returns the CPU use (percent of one core) between two process_usage() readings, and the final RSS.
+    """
+    return {
+        "cpu_percent": round((end["cpu_seconds"] - start["cpu_seconds"]) / seconds * 100, 1),
+        "rss_mb": round(end["rss_mb"], 1),
+    }
+
+def start_gateway(feed_sensors: int, interval: float):
+    """
+    Starts the gateway's consumer on the in-memory broker and a fleet of sensors publishing to it, in this process.
+
+    Returns:
+        list: The lags (seconds) of the ingested readings, appended as they arrive.
+    """
+    import gateway
+    from fleet import Fleet
+    from greenhouse import Sensor
+    from publisher import StatusPublisher, SENSOR_EXCHANGE
+    from transport import MEMORY_HOST
+
+    lags = []
+    ingest = gateway.ingest_status
+
+    def recording_ingest(status, source):
+        device = ingest(status, source)
+        lags.append(time.time() - status.timestamp)
+        return device
+
+    gateway.ingest_status = recording_ingest
+    gateway.RABBITMQ_HOST = MEMORY_HOST
+    gateway.config.queues = []  # Sensors publish to the topic exchange
+    threading.Thread(target=gateway.consume_sensors, daemon=True).start()
+    time.sleep(0.5)  # Let the consumer bind its queue before sensors publish
+
+    sensors = [Sensor(id=i, name="sensor_temperature", value=20.0, unit="°C") for i in range(feed_sensors)]
+    fleet = Fleet(sensors, StatusPublisher(host=MEMORY_HOST, exchange=SENSOR_EXCHANGE), interval)
+    threading.Thread(target=asyncio.run, args=(fleet.run(),), daemon=True).start()
+    return lags
+
+def ingest_scenario(sensors: int, interval: float, seconds: float, results):
+    """
+    Runs sensors and gateway in this (child) process and reports the ingest throughput and lag.
+    """
+    from transport import get_memory_broker
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        lags = start_gateway(sensors, interval)
+        time.sleep(interval)  # Every sensor has started publishing
+        ingested, usage, start = len(lags), process_usage(os.getpid()), time.perf_counter()
+        time.sleep(seconds)
+        count, elapsed = len(lags) - ingested, time.perf_counter() - start
+        result = {
+            "scenario": "ingest",
+            "sensors": sensors,
+            "offered_per_sec": round(sensors / interval, 1),
+            "throughput_per_sec": round(count / elapsed, 1),
+            **latency_summary(lags[ingested:ingested + count]),
+            "broker_backlog": get_memory_broker().depth(),
+            **usage_between(usage, process_usage(os.getpid()), elapsed),
+        }
+    results.put(result)
+
+def serve_gateway(sensors: int, interval: float, port: int, http_workers: int):
+    """
+    Runs the gateway's HTTP API with sensors feeding it through the in-memory broker (in a child process).
+    With several HTTP workers, this process ingests into a shared memory registry the workers read.
+    """
+    import uvicorn
+    import gateway
+    from sharedstate import SharedSensorRegistry
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gateway.TELEMETRY_PORT = 0
+        if http_workers > 1:
+            gateway.registry = SharedSensorRegistry.create()
+            os.environ["GATEWAY_SHARED_STATE"] = gateway.registry.name
+        start_gateway(sensors, interval)
+        try:
+            if http_workers > 1:
+                uvicorn.run("gateway:app", port=port, log_level="warning", workers=http_workers)
+            else:
+                uvicorn.run(gateway.app, port=port, log_level="warning")
+        finally:
+            if http_workers > 1:
+                gateway.registry.unlink()
+
+async def poll(base: str, clients: int, poll_interval: float, seconds: float, full: bool = False):
+    """
+    Polls /sensors like the dashboards: a full fetch, then deltas with since= and If-None-Match
+    (or a full fetch every time if full is True).
+
+    Returns:
+        tuple: The request latencies (seconds), and the number of 200 and 304 responses.
+    """
+    latencies, statuses = [], {200: 0, 304: 0}
+    deadline = time.perf_counter() + seconds
+
+    async def client(session: httpx.AsyncClient):
+        since, etag = None, None
+        while time.perf_counter() < deadline:
+            params = {} if since is None else {"since": since}
+            start = time.perf_counter()
+            response = await session.get(f"{base}/sensors", params=params, headers={"If-None-Match": etag} if etag else {})
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200 and not full:
+                since, etag = int(response.headers["X-Sequence"]), response.headers["ETag"]
+            await asyncio.sleep(poll_interval)
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=clients), timeout=30) as session:
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+    return latencies, statuses
+
+def poll_scenario(sensors: int, interval: float, clients: int, poll_interval: float, seconds: float, port: int,
+                  full: bool = False, http_workers: int = 1) -> dict:
+    """
+    Runs the gateway in a child process and polls it from this one.
+    """
+    # Not a daemon: uvicorn starts its workers as children of the gateway process
+    server = multiprocessing.Process(target=serve_gateway, args=(sensors, interval, port, http_workers))
+    server.start()
+    base = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            httpx.get(f"{base}/sensors?limit=1")
+            break
+        except httpx.TransportError:
+            time.sleep(0.2)
+    time.sleep(max(interval, 1.0))  # Every sensor has published and every worker has started
+
+    usage, start = tree_usage(server.pid), time.perf_counter()
+    latencies, statuses = asyncio.run(poll(base, clients, poll_interval, seconds, full))
+    elapsed = time.perf_counter() - start
+    result = {
+        "scenario": "poll",
+        "sensors": sensors,
+        "clients": clients,
+        "http_workers": http_workers,
+        "full": full,
+        "throughput_per_sec": round(len(latencies) / elapsed, 1),
+        **latency_summary(latencies),
+        "not_modified": statuses.get(304, 0),
+        **usage_between(usage, tree_usage(server.pid), elapsed),
+    }
+    server.terminate()
+    server.join()
+    return result
+
+def serve_actuator(port: int):
+    """
+    Runs one greenhouse Actuator gRPC server (in a child process).
+    """
+    from greenhouse import Actuator, Sensor, run_actuator_server
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        run_actuator_server(Actuator(Sensor(id=1, name="sensor_temperature", value=20.0, unit="°C")), port)
+
+async def command_storm(address: str, commands: int, concurrency: int):
+    """
+    Sends commands through the gateway's actuator channel pool, at most `concurrency` at a time.
+
+    Returns:
+        tuple: The command latencies (seconds) and the number of failed commands.
+    """
+    from actuators import ActuatorChannelPool
+
+    pool = ActuatorChannelPool()
+    limit = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def send(value: float):
+        nonlocal errors
+        async with limit:
+            start = time.perf_counter()
+            try:
+                await pool.set_value(address, greenhouse_pb2.ActuatorRequest(name="actuator_temperature", value=value, active=True))
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+
+    await send(20.0)  # Connect the channel before timing
+    latencies.clear()
+    await asyncio.gather(*(send(20.0 + i % 10) for i in range(commands)))
+    await pool.close()
+    return latencies, errors
+
+def actuators_scenario(commands: int, concurrency: int, port: int) -> dict:
+    """
+    Runs an Actuator in a child process and sends it a storm of commands from this one.
+    """
+    server = multiprocessing.Process(target=serve_actuator, args=(port,), daemon=True)
+    server.start()
+    time.sleep(1)  # Let the server bind its port
+
+    usage, start = process_usage(server.pid), time.perf_counter()
+    latencies, errors = asyncio.run(command_storm(f"localhost:{port}", commands, concurrency))
+    elapsed = time.perf_counter() - start
+    result = {
+        "scenario": "actuators",
+        "commands": commands,
+        "concurrency": concurrency,
+        "throughput_per_sec": round(len(latencies) / elapsed, 1),
+        **latency_summary(latencies),
+        "errors": errors,
+        **usage_between(usage, process_usage(server.pid), elapsed),
+    }
+    server.terminate()
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run end-to-end load scenarios against an in-memory broker and local servers.")
+    parser.add_argument("--scenario", choices=SCENARIOS, nargs="+", default=list(SCENARIOS), help="Scenarios to run")
+    parser.add_argument("--sensors", type=int, default=1000, help="Simulated sensors")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between two publishes of a sensor")
+    parser.add_argument("--seconds", type=float, default=10, help="Measured duration of the ingest and poll scenarios")
+    parser.add_argument("--clients", type=int, default=20, help="Polling dashboards")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between two polls of a dashboard")
+    parser.add_argument("--full", action="store_true", help="Poll full /sensors responses instead of deltas")
+    parser.add_argument("--http-workers", type=int, nargs="+", default=[1], help="HTTP worker processes of the polled gateway (one run each)")
+    parser.add_argument("--commands", type=int, default=5000, help="Actuator commands")
+    parser.add_argument("--concurrency", type=int, default=64, help="Actuator commands in flight")
+    parser.add_argument("--port", type=int, default=8102, help="Port of the local gateway")
+    parser.add_argument("--actuator-port", type=int, default=50151, help="Port of the local actuator")
+    parser.add_argument("--output", help="File the JSON results are appended to (one line per scenario)")
+    args = parser.parse_args()
+
+    for scenario in args.scenario:
+        if scenario == "ingest":
+            # Sensors and gateway share the in-memory broker, so they run together in a child process
+            results = multiprocessing.Queue()
+            child = multiprocessing.Process(target=ingest_scenario, args=(args.sensors, args.interval, args.seconds, results), daemon=True)
+            child.start()
+            result = results.get()
+            child.terminate()
+        elif scenario == "poll":
+            result = [
+                poll_scenario(args.sensors, args.interval, args.clients, args.poll_interval, args.seconds, args.port, args.full, workers)
+                for workers in args.http_workers
+            ]
+        else:
+            result = actuators_scenario(args.commands, args.concurrency, args.actuator_port)
+
+        for run in result if isinstance(result, list) else [result]:
+            run["timestamp"] = time.time()
+            line = json.dumps(run)
+            print(line)
+            if args.output:
+                with open(args.output, "a", encoding="utf-8") as output:
+                    output.write(line + "\n")
@@ -0,0 +1,80 @@
+"""
+Measures the cost of the gateway's instrumentation: each metric operation on its own, and everything
+recorded per consumed message (parse timer per queue, which also counts the messages, and lag histogram),
+from one and several threads.
+
+Usage (from the src directory):
+    python -m benchmarks.metrics --operations 1000000 --threads 4
+"""
+import argparse
+import json
+import threading
+import time
+from metrics import Counter, Histogram, LAG_BUCKETS
+
+def per_operation(operation, count: int) -> float:
+    """
+    Returns the nanoseconds per call of an operation, minus the cost of an empty loop.
+    """
+    start = time.perf_counter()
+    for _ in range(count):
+        pass
+    empty = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(count):
+        operation()
+    return (time.perf_counter() - start - empty) / count * 1e9
+
+def message_instrumentation(parse: Histogram, lag: Histogram):
+    """
+    Returns a function recording what the gateway records for one RabbitMQ message
+    (the gateway already reads the clock for readings without a timestamp, so only the parse timer is extra).
+    """
+    children = {}
+
+    def record():
+        routing_key = "sensor.sensor_temperature.1"
+        start = time.perf_counter()
+        timer = children.get(routing_key)
+        if timer is None:
+            timer = children[routing_key] = parse.labels(routing_key.rsplit(".", 1)[0])
+        timer.observe(time.perf_counter() - start)
+        lag.observe(0.004)
+    return record
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the metrics hot paths.")
+    parser.add_argument("--operations", type=int, default=1000000, help="Calls per measurement")
+    parser.add_argument("--threads", type=int, default=4, help="Threads recording concurrently")
+    args = parser.parse_args()
+
+    counter = Counter("benchmark_total", "Benchmark counter.")
+    labeled = Counter("benchmark_labeled_total", "Benchmark counter.", "queue")
+    histogram = Histogram("benchmark_seconds", "Benchmark histogram.")
+    parse = Histogram("benchmark_parse_seconds", "Benchmark histogram.", "queue")
+    lag = Histogram("benchmark_lag_seconds", "Benchmark histogram.", buckets=LAG_BUCKETS)
+    record = message_instrumentation(parse, lag)
+
+    results = {
+        "counter_inc_ns": per_operation(counter.inc, args.operations),
+        "labeled_counter_inc_ns": per_operation(lambda: labeled.labels("queue_sensor_temperature").inc(), args.operations),
+        "histogram_observe_ns": per_operation(lambda: histogram.observe(0.0003), args.operations),
+        "per_message_ns": per_operation(record, args.operations),
+    }
+    print(json.dumps({"threads": 1, **{key: round(value) for key, value in results.items()}}))
+
+    # The same per-message recording from several threads at once: the counts must add up exactly
+    per_thread = args.operations // args.threads
+    threads = [threading.Thread(target=per_operation, args=(record, per_thread)) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "threads": args.threads,
+        "per_message_ns": round(elapsed / (per_thread * args.threads) * 1e9),
+        "messages_counted": parse.counts()["sensor.sensor_temperature"],
+        "messages_expected": args.operations + per_thread * args.threads,
+    }))
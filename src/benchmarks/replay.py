@@ -0,0 +1,104 @@
+"""
+Records a synthetic day-in-the-life of a site with the gateway's RecordingWriter, then replays it with replay.py
+into the gateway's consumer through the in-memory broker, each run in a child process:
+as fast as possible with one message per reading, as fast as possible with DeviceStatusBatch messages,
+and paced at --paced-speed times real time. Reports the recorder's cost per reading, the recording's read rate,
+the achieved replay rate and the time until the gateway stored every reading.
+
+Usage (from the src directory):
+    python -m benchmarks.replay --sensors 1000 --seconds 120 --period 2
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from proto import greenhouse_pb2
+from recording import RecordingWriter, read_recording
+
+def make_recording(path: str, sensors: int, seconds: float, period: float) -> dict:
+    """
+    Writes every sensor's reading of each period, in time order, and times the writes.
+    """
+    writer = RecordingWriter(path)
+    start, count = 1_700_000_000.0, 0
+    elapsed = 0.0
+    for tick in range(int(seconds / period)):
+        for sensor in range(sensors):
+            status = greenhouse_pb2.DeviceStatus(
+                deviceId=sensor, name="sensor_temperature", value=20.0 + sensor % 7, unit="°C",
+                timestamp=start + tick * period + sensor * period / sensors
+            )
+            begin = time.perf_counter()
+            writer.write(status)
+            elapsed += time.perf_counter() - begin
+            count += 1
+    writer.close()
+    return {"readings": count, "bytes": os.path.getsize(path), "record_us_per_reading": round(elapsed / count * 1e6, 3)}
+
+def run(path: str, speed: float, batch_size: int, results):
+    """
+    Replays the recording into the gateway's consumer in this (child) process and waits until every reading is stored.
+    """
+    import gateway
+    from publisher import StatusPublisher, BatchingPublisher, SENSOR_EXCHANGE
+    from replay import replay
+    from transport import MEMORY_HOST
+
+    stored = [0]
+    ingest = gateway.ingest_status
+
+    def counting_ingest(status, source):
+        stored[0] += 1
+        return ingest(status, source)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gateway.ingest_status = counting_ingest
+        gateway.RABBITMQ_HOST = MEMORY_HOST
+        gateway.config.queues = []  # The replay publishes to the topic exchange
+        threading.Thread(target=gateway.consume_sensors, daemon=True).start()
+        time.sleep(0.5)  # Let the consumer bind its queue before the replay publishes
+
+        publisher = StatusPublisher(host=MEMORY_HOST, exchange=SENSOR_EXCHANGE)
+        if batch_size > 1:
+            publisher = BatchingPublisher(publisher, max_batch=batch_size)
+        start = time.perf_counter()
+        result = replay(read_recording(path), publisher, speed, SENSOR_EXCHANGE, report_period=0)
+        while stored[0] < result["readings"]:
+            time.sleep(0.01)
+        drained = time.perf_counter() - start
+
+    results.put({
+        "speed": speed or "max",
+        "batch_size": batch_size,
+        **result,
+        "stored_seconds": round(drained, 3),
+        "stored_per_sec": round(result["readings"] / drained, 1),
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recording and replaying sensor readings.")
+    parser.add_argument("--sensors", type=int, default=1000, help="Sensors in the recording")
+    parser.add_argument("--seconds", type=float, default=120, help="Recorded seconds")
+    parser.add_argument("--period", type=float, default=2.0, help="Seconds between two readings of a sensor")
+    parser.add_argument("--batch-size", type=int, default=100, help="Readings per DeviceStatusBatch in the batched run")
+    parser.add_argument("--paced-speed", type=float, default=60, help="Multiple of real time of the paced run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "recording.pb")
+        summary = make_recording(path, args.sensors, args.seconds, args.period)
+        start = time.perf_counter()
+        read = sum(1 for _ in read_recording(path))
+        summary["read_per_sec"] = round(read / (time.perf_counter() - start), 1)
+        print(json.dumps(summary))
+
+        results = multiprocessing.Queue()
+        for speed, batch_size in ((0.0, 1), (0.0, args.batch_size), (args.paced_speed, 1)):
+            process = multiprocessing.Process(target=run, args=(path, speed, batch_size, results))
+            process.start()
+            print(json.dumps(results.get()))
+            process.join()
@@ -0,0 +1,122 @@
+"""
+Load-tests GET /sensors on a local gateway while readings keep arriving, comparing the old
+encode-every-request path with the cached JSON and protobuf responses.
+
+Usage (from the src directory):
+    python -m benchmarks.responses --devices 100 --seconds 5 --clients 50 --rate 50
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import random
+import threading
+import time
+import httpx
+import uvicorn
+from fastapi.responses import JSONResponse
+import gateway
+from proto import greenhouse_pb2
+from registry import RESPONSE_LIMIT
+
+def uncached_sensors(limit: int = RESPONSE_LIMIT):
+    """
+    Builds the response the way the gateway used to: every device dictionary encoded again on every request.
+    """
+    sequence = gateway.registry.sequence
+    devices = gateway.registry.devices()
+    return JSONResponse({device.key: device.to_dict(limit, None, sequence) for device in devices})
+
+def feed(devices: int, rate: float, stop: threading.Event):
+    """
+    Ingests `rate` readings per second into random devices until stopped.
+    """
+    while not stop.is_set():
+        device_id = random.randrange(devices)
+        gateway.ingest_status(greenhouse_pb2.DeviceStatus(deviceId=device_id, name="sensor_benchmark", value=random.random(), unit="°C"), "benchmark")
+        time.sleep(1 / rate)
+
+async def load(url: str, headers: dict, clients: int, seconds: float) -> dict:
+    """
+    Sends GET requests from concurrent clients for a fixed time.
+
+    Returns:
+        dict: The number of requests per second and the mean response size.
+    """
+    deadline = time.perf_counter() + seconds
+    requests, sizes = 0, 0
+
+    async def client(session: httpx.AsyncClient):
+        nonlocal requests, sizes
+        while time.perf_counter() < deadline:
+            response = await session.get(url, headers=headers)
+            requests += 1
+            sizes += len(response.content)
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return {"requests_per_sec": round(requests / elapsed, 1), "bytes_per_response": round(sizes / max(requests, 1))}
+
+def serve(devices: int, history: int, rate: float, port: int):
+    """
+    Runs the gateway with pre-filled devices and a steady stream of readings (in its own process,
+    so the load generator does not compete with it for the GIL).
+    """
+    gateway.TELEMETRY_PORT = 0
+    gateway.app.get("/benchmark/uncached")(uncached_sensors)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(history):
+            for device_id in range(devices):
+                gateway.ingest_status(greenhouse_pb2.DeviceStatus(deviceId=device_id, name="sensor_benchmark", value=random.random(), unit="°C"), "benchmark")
+    threading.Thread(target=feed, args=(devices, rate, threading.Event()), daemon=True).start()
+    uvicorn.run(gateway.app, port=port, log_level="warning")
+
+def run_load(url: str, headers: dict, clients: int, seconds: float) -> dict:
+    """
+    Runs one load generator process.
+    """
+    return asyncio.run(load(url, headers, clients, seconds))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark /sensors response encoding under load.")
+    parser.add_argument("--devices", type=int, default=100, help="Registered devices")
+    parser.add_argument("--history", type=int, default=RESPONSE_LIMIT, help="Readings per device before the test")
+    parser.add_argument("--seconds", type=float, default=5, help="Duration of each run")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent dashboard clients")
+    parser.add_argument("--processes", type=int, default=2, help="Load generator processes")
+    parser.add_argument("--rate", type=float, default=50, help="Readings ingested per second during the runs")
+    parser.add_argument("--port", type=int, default=8101, help="Port of the local gateway")
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=serve, args=(args.devices, args.history, args.rate, args.port), daemon=True)
+    server.start()
+    base = f"http://127.0.0.1:{args.port}"
+    while True:
+        try:
+            httpx.get(f"{base}/sensors?limit=1")
+            break
+        except httpx.TransportError:
+            time.sleep(0.2)
+
+    runs = [
+        ("uncached_json", f"{base}/benchmark/uncached", {}),
+        ("cached_json", f"{base}/sensors", {}),
+        ("cached_protobuf", f"{base}/sensors", {"Accept": "application/x-protobuf"}),
+    ]
+    clients = max(1, args.clients // args.processes)
+    with multiprocessing.Pool(args.processes) as pool:
+        for path, url, headers in runs:
+            results = pool.starmap(run_load, [(url, headers, clients, args.seconds)] * args.processes)
+            print(json.dumps({
+                "path": path,
+                "devices": args.devices,
+                "readings_per_sec": args.rate,
+                "requests_per_sec": round(sum(result["requests_per_sec"] for result in results), 1),
+                "bytes_per_response": results[0]["bytes_per_response"],
+            }))
+    server.terminate()
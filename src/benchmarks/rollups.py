@@ -0,0 +1,80 @@
+"""
+Compares windowed aggregates read from the rollups with the same aggregates computed from raw samples
+of the on-disk store, and measures the cost of updating the rollups with each reading.
+
+Usage (from the src directory):
+    python -m benchmarks.rollups --days 7 --period 2
+"""
+import argparse
+import json
+import tempfile
+import time
+import numpy as np
+from rollups import Rollups
+from tsdb import TimeSeriesStore
+
+def timed(function, repeat: int) -> float:
+    """
+    Returns the median milliseconds of a call.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return round(sorted(durations)[len(durations) // 2] * 1000, 3)
+
+def raw_aggregates(store: TimeSeriesStore, start: float, end: float, step: float) -> dict:
+    """
+    Computes count/min/max/mean per step from the raw samples of the store (what a query costs without rollups).
+    """
+    timestamps, values = store.query("sensor_temperature", 1, start, end)
+    buckets = ((timestamps - start) // step).astype(np.int64)
+    edges = np.flatnonzero(np.diff(buckets)) + 1
+    starts = np.concatenate(([0], edges))
+    return {
+        "count": np.diff(np.append(starts, len(values))),
+        "min": np.minimum.reduceat(values, starts),
+        "max": np.maximum.reduceat(values, starts),
+        "mean": np.add.reduceat(values.astype(np.float64), starts) / np.diff(np.append(starts, len(values))),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the rollup windows.")
+    parser.add_argument("--days", type=float, default=7, help="Days of readings")
+    parser.add_argument("--period", type=float, default=2, help="Seconds between two readings")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs of each query")
+    args = parser.parse_args()
+
+    samples = int(args.days * 86400 / args.period)
+    end = float(int(time.time() // 3600 * 3600))
+    start = end - samples * args.period
+    timestamps = start + np.arange(samples) * args.period
+    values = 20 + np.random.default_rng(0).normal(0, 1, samples)
+
+    rollups = Rollups()
+    began = time.perf_counter()
+    for timestamp, value in zip(timestamps.tolist(), values.tolist()):
+        rollups.add(timestamp, value)
+    add_us = (time.perf_counter() - began) / samples * 1e6
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = TimeSeriesStore(directory, retention_seconds=(args.days + 1) * 86400)
+        for timestamp, value in zip(timestamps.tolist(), values.tolist()):
+            store.append("sensor_temperature", 1, timestamp, value)
+
+        day, week = (end - 86400, end), (max(start, end - 7 * 86400), end)
+        minutes, hours = rollups.windows["1m"], rollups.windows["1h"]
+        check = hours.query(*week)
+        raw = raw_aggregates(store, week[0], week[1], 3600)
+        assert np.array_equal(check["count"], raw["count"]) and np.allclose(check["mean"], raw["mean"])
+
+        print(json.dumps({
+            "samples": samples,
+            "rollup_add_us": round(add_us, 3),
+            "rollup_bytes_per_device": rollups.nbytes,
+            "day_by_minute_rollup_ms": timed(lambda: minutes.query(*day), args.repeat),
+            "day_by_minute_raw_ms": timed(lambda: raw_aggregates(store, day[0], day[1], 60), args.repeat),
+            "week_by_hour_rollup_ms": timed(lambda: hours.query(*week), args.repeat),
+            "week_by_hour_raw_ms": timed(lambda: raw_aggregates(store, week[0], week[1], 3600), args.repeat),
+        }))
@@ -0,0 +1,45 @@
+"""
+Times one step and one bulk encode of the vectorized SensorArray engine for growing fleet sizes.
+
+Usage (from the src directory):
+    python -m benchmarks.simulation --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import json
+import time
+from simulation import SensorArray
+
+def best_of(function, repeats: int) -> float:
+    """
+    Returns the fastest of several runs of a function, in milliseconds.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized simulation engine.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000], help="Fleet sizes")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        engine = SensorArray(
+            ids=range(1, size + 1),
+            names=["sensor_temperature"] * size,
+            values=[20.0] * size,
+            units=["°C"] * size,
+            noise=0.5,
+            seed=0,
+        )
+        step_ms = best_of(engine.step, args.repeats)
+        encode_ms = best_of(engine.encode, args.repeats)
+        print(json.dumps({
+            "sensors": size,
+            "step_ms": round(step_ms, 3),
+            "encode_ms": round(encode_ms, 3),
+            "max_tick_hz": round(1000 / step_ms, 1),
+        }))
@@ -0,0 +1,123 @@
+"""
+Compares the old timeout monitor (a scan of every device every 10 seconds) with the deadline heap:
+cost of recording a reading, CPU used while devices are online (10 second timeout), CPU used while
+no deadline is due, and how late timeouts are detected.
+
+Usage (from the src directory):
+    python -m benchmarks.timeouts --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import threading
+import time
+from deadlines import DeadlineScheduler, TIMEOUT_PRECISION
+
+# Seconds between two scans of the old monitor
+SCAN_PERIOD = 10
+
+class Device():
+    """
+    The field of SensorDevice the old monitor reads.
+    """
+    def __init__(self) -> None:
+        self.last_update = time.time()
+
+def scan(devices, timeout: float) -> int:
+    """
+    One pass of the old monitor: checks every device's last update time.
+    """
+    expired = 0
+    for device in devices:
+        if time.time() - device.last_update > timeout:
+            expired += 1
+            device.last_update = time.time()
+    return expired
+
+def reschedule_cost(size: int) -> float:
+    """
+    Returns the seconds spent moving the deadline of a device that kept reporting (once per timeout period).
+    """
+    scheduler = DeadlineScheduler(1, lambda key: None)
+    for key in range(size):
+        scheduler.touch(key)
+    time.sleep(0.5)
+    for key in range(size):
+        scheduler.touch(key)
+    start = time.perf_counter()
+    scheduler.expire_due(time.monotonic() + 0.6)  # Every first deadline is due, every device was touched since
+    return (time.perf_counter() - start) / size
+
+def idle_cpu(scheduler: DeadlineScheduler, seconds: float) -> float:
+    """
+    Returns the CPU seconds per second used by the scheduler thread while no deadline is due.
+    """
+    thread = threading.Thread(target=scheduler.run, daemon=True)
+    start_cpu, start = time.process_time(), time.perf_counter()
+    thread.start()
+    time.sleep(seconds)
+    return (time.process_time() - start_cpu) / (time.perf_counter() - start)
+
+def lateness(size: int, timeout: float, precision: float) -> dict:
+    """
+    Arms `size` keys with staggered deadlines and measures how late each one expires.
+    """
+    late = []
+    deadlines = {}
+
+    def on_expire(key):
+        late.append(time.monotonic() - deadlines[key])
+
+    scheduler = DeadlineScheduler(timeout, on_expire, precision)
+    threading.Thread(target=scheduler.run, daemon=True).start()
+    for key in range(size):
+        scheduler.touch(key)
+        deadlines[key] = time.monotonic() + timeout
+        if key % max(1, size // 100) == 0:
+            time.sleep(timeout / 100)  # Spread the deadlines over one timeout period
+    while scheduler.expired < size:
+        time.sleep(0.05)
+    late.sort()
+    return {"p50_ms": round(late[len(late) // 2] * 1000, 1), "max_ms": round(late[-1] * 1000, 1)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sensor timeout detection.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Numbers of devices")
+    parser.add_argument("--timeout", type=float, default=2, help="Timeout of the lateness test (seconds)")
+    parser.add_argument("--precision", type=float, default=TIMEOUT_PRECISION, help="Scheduler precision (seconds)")
+    parser.add_argument("--idle-seconds", type=float, default=3, help="Duration of the idle CPU measurement")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        # Old monitor: each reading sets last_update, each scan walks every device
+        devices = [Device() for _ in range(size)]
+        start = time.perf_counter()
+        for device in devices:
+            device.last_update = time.time()
+        old_touch = (time.perf_counter() - start) / size
+        start = time.perf_counter()
+        scan(devices, 3600)
+        old_scan = time.perf_counter() - start
+
+        # Deadline heap: each reading touches the scheduler
+        scheduler = DeadlineScheduler(3600, lambda key: None, args.precision)
+        keys = list(range(size))
+        for key in keys:
+            scheduler.touch(key)
+        start = time.perf_counter()
+        for key in keys:
+            scheduler.touch(key)
+        heap_touch = (time.perf_counter() - start) / size
+
+        reschedule = reschedule_cost(size)
+        print(json.dumps({
+            "devices": size,
+            "scan_touch_us": round(old_touch * 1e6, 3),
+            "heap_touch_us": round(heap_touch * 1e6, 3),
+            "scan_ms_per_pass": round(old_scan * 1000, 2),
+            "scan_cpu_percent": round(old_scan / SCAN_PERIOD * 100, 3),
+            "scan_max_lateness_ms": round((SCAN_PERIOD + old_scan) * 1000),
+            "heap_reschedule_us": round(reschedule * 1e6, 3),
+            "heap_online_cpu_percent": round(reschedule * size / SCAN_PERIOD * 100, 3),
+            "heap_idle_cpu_percent": round(idle_cpu(scheduler, args.idle_seconds) * 100, 3),
+            "heap_lateness": lateness(size, args.timeout, args.precision),
+        }))
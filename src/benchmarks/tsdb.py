@@ -0,0 +1,51 @@
+"""
+Fills the on-disk time-series store with weeks of readings and times range queries against it.
+
+Usage (from the src directory):
+    python -m benchmarks.tsdb --weeks 4 --directory /tmp/greenhouse_tsdb
+"""
+import argparse
+import json
+import random
+import shutil
+import time
+from tsdb import TimeSeriesStore
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the time-series store.")
+    parser.add_argument("--weeks", type=float, default=4, help="Weeks of history to write")
+    parser.add_argument("--period", type=float, default=2, help="Seconds between two readings")
+    parser.add_argument("--queries", type=int, default=200, help="Range queries to time")
+    parser.add_argument("--directory", default="/tmp/greenhouse_tsdb", help="Store directory (deleted first)")
+    args = parser.parse_args()
+
+    shutil.rmtree(args.directory, ignore_errors=True)
+    store = TimeSeriesStore(args.directory, retention_seconds=args.weeks * 7 * 86400 * 2)
+
+    samples = int(args.weeks * 7 * 86400 / args.period)
+    end = time.time()
+    start = end - samples * args.period
+
+    began = time.perf_counter()
+    for i in range(samples):
+        store.append("sensor_temperature", 1, start + i * args.period, 20.0)
+    write_seconds = time.perf_counter() - began
+
+    def timed_queries(span: float, step: float = None) -> float:
+        latencies = []
+        for _ in range(args.queries):
+            low = random.uniform(start, end - span)
+            began = time.perf_counter()
+            store.query("sensor_temperature", 1, low, low + span, step)
+            latencies.append(time.perf_counter() - began)
+        latencies.sort()
+        return round(latencies[len(latencies) // 2] * 1000, 3)
+
+    print(json.dumps({
+        "samples": samples,
+        "writes_per_sec": round(samples / write_seconds),
+        "query_1h_p50_ms": timed_queries(3600),
+        "query_1d_p50_ms": timed_queries(86400),
+        "query_1w_step_1h_p50_ms": timed_queries(7 * 86400, 3600),
+    }))
+    shutil.rmtree(args.directory, ignore_errors=True)
@@ -0,0 +1,82 @@
+import time
+from collections import deque
+import numpy as np
+
+# Maximum number of points drawn per chart; longer histories are decimated
+MAX_CHART_POINTS = 600
+
+# Number of refreshes the render statistics are computed over
+RENDER_WINDOW = 100
+
+def minmax_decimate(timestamps, values, max_points: int = MAX_CHART_POINTS):
+    """
+    Reduces a series to at most max_points points by keeping the minimum and the maximum of
+    equal-size buckets, in time order. Unlike plain subsampling or averaging, spikes stay visible.
+
+    Parameters:
+        timestamps (array): Reading times, oldest first.
+        values (array): Reading values.
+        max_points (int): Maximum number of points returned.
+
+    Returns:
+        tuple: The timestamps and values arrays of the kept points.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) <= max_points:
+        return timestamps, values
+
+    # Pad the values to a whole number of buckets (NaN is ignored by nanargmin/nanargmax)
+    buckets = max(1, max_points // 2)
+    size = -(-len(values) // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:len(values)] = values
+    used = -(-len(values) // size)  # Buckets holding at least one value
+    rows = padded.reshape(buckets, size)[:used]
+    offsets = np.arange(used) * size
+
+    lowest = offsets + np.nanargmin(rows, axis=1)
+    highest = offsets + np.nanargmax(rows, axis=1)
+    indices = np.stack([np.minimum(lowest, highest), np.maximum(lowest, highest)], axis=1).ravel()
+    indices = indices[np.concatenate(([True], np.diff(indices) != 0))]  # Flat buckets keep one point
+    return timestamps[indices], values[indices]
+
+class RenderTimer():
+    """
+    Measures how long the dashboard takes to render each refresh.
+    """
+    def __init__(self, window: int = RENDER_WINDOW) -> None:
+        """
+        Initializes empty statistics.
+
+        Parameters:
+            window (int): Number of most recent refreshes the statistics are computed over.
+        """
+        self.durations = deque(maxlen=window)
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record(time.perf_counter() - self._start)
+
+    def record(self, seconds: float):
+        """
+        Adds the duration of one refresh.
+        """
+        self.durations.append(seconds)
+
+    def summary(self) -> str:
+        """
+        Returns the last, mean and p95 render times as a short text.
+        """
+        if not self.durations:
+            return "No refresh rendered yet."
+        durations = sorted(self.durations)
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        return (
+            f"Render: last {self.durations[-1] * 1000:.1f} ms, mean {np.mean(durations) * 1000:.1f} ms, "
+            f"p95 {p95 * 1000:.1f} ms over {len(durations)} refreshes"
+        )
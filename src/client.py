@@ -1,64 +1,130 @@
 import streamlit as st
 import requests
-import matplotlib.pyplot as plt
-import numpy as np
+import pandas as pd
+import json
 import time
+from charts import minmax_decimate, RenderTimer, MAX_CHART_POINTS
 
 # Gateway URL for fetching sensor data and sending actuator commands
 GATEWAY_URL = "http://localhost:8001"
 
-# Cache the sensor data to avoid frequent API calls
-@st.cache_data(ttl=2)
-def get_sensor_data():
+# Number of readings plotted per device by default (same as the gateway's default response limit)
+PLOT_POINTS = 20
+
+# Choices of readings plotted per device (the longest ones are decimated to MAX_CHART_POINTS)
+PLOT_CHOICES = [20, 100, 500, 1800, 3600]
+
+
+# Minimum seconds between two redraws of a chart
+REDRAW_PERIOD = 1.0
+
+# Seconds without any data (events or keepalives) after which the stream is reopened
+STREAM_TIMEOUT = 30
+
+def get_sensor_data(since=None, etag=None, limit=PLOT_POINTS):
     """
-    Fetches sensor data from the gateway API.
+    Fetches sensor data from the gateway API, or only what changed after a sequence number.
+
+    Parameters:
+        since (int): Sequence number of the previous response (None for a full fetch).
+        etag (str): ETag of the previous response. The gateway answers 304 if nothing changed since.
+        limit (int): Number of most recent readings per device.
 
     Returns:
-        dict: A dictionary containing sensor data for temperature, light, and humidity.
-              Returns an empty dictionary if the request fails.
+        tuple: The devices (an empty dictionary if nothing changed or if the request fails),
+               and the sequence number and ETag to pass to the next call.
     """
     try:
-        response = requests.get(f"{GATEWAY_URL}/sensors")
-        return response.json()  # Return the JSON response
+        response = requests.get(
+            f"{GATEWAY_URL}/sensors",
+            params={"limit": limit} if since is None else {"limit": limit, "since": since},
+            headers={"If-None-Match": etag} if etag else {},
+            timeout=5,
+        )
+        if response.status_code == 304:
+            return {}, since, etag  # Nothing changed
+        return response.json(), int(response.headers["X-Sequence"]), response.headers.get("ETag")
     except requests.exceptions.RequestException as e:
         # Handle connection errors
         print(f"Error to connect to gateway: {e}")
         st.error("Error to connect to gateway.")
-        return {}
+        return {}, since, etag
+
+def merge_sensor_data(sensor_data, delta, limit=PLOT_POINTS):
+    """
+    Merges a /sensors response into the local copy of the sensor data.
+    Readings the dashboard already has (e.g., received on the event stream) are skipped by timestamp.
+
+    Parameters:
+        sensor_data (dict): The local devices, mapping "<name>:<id>" to a device.
+        delta (dict): A full or delta response of /sensors.
+        limit (int): Number of most recent readings kept per device.
 
-def plot_sensor_data(sensor_data, sensor_name):
+    Returns:
+        bool: True if the response contains devices that are not displayed yet.
+    """
+    added = False
+    for key, device in delta.items():
+        local = sensor_data.get(key)
+        if local is None or device.get("reset", True):
+            # New device, cleared history or full response: replace the local readings
+            added = added or local is None
+            sensor_data[key] = device
+            continue
+        local["stale"] = device.get("stale", False)
+        last = local["timestamps"][-1] if local["timestamps"] else float("-inf")
+        newer = [i for i, timestamp in enumerate(device["timestamps"]) if timestamp > last]
+        local["timestamps"] = (local["timestamps"] + [device["timestamps"][i] for i in newer])[-limit:]
+        local["values"] = (local["values"] + [device["values"][i] for i in newer])[-limit:]
+    return added
+
+def chart_spec(label, stale=False):
+    """
+    Returns the Vega-Lite specification of a sensor chart.
+    Charts are drawn from this fixed specification and a data frame, which skips building an Altair chart
+    on every redraw; the browser renders the points, so the dashboard never rasterizes images.
+
+    Parameters:
+        label (str): The y-axis title.
+        stale (bool): Whether the device stopped reporting (its last readings are drawn in grey).
     """
-    Plots sensor data using Matplotlib.
+    if stale:
+        return {
+            "title": "Stale: no recent readings",
+            "mark": {"type": "line", "point": True, "color": "grey"},
+            "encoding": chart_spec(label)["encoding"],
+        }
+    return {
+        "mark": {"type": "line", "point": True},
+        "encoding": {
+            "x": {"field": "time", "type": "temporal", "title": None},
+            "y": {"field": "value", "type": "quantitative", "title": label, "scale": {"zero": False}},
+        },
+    }
+
+def draw_chart(placeholder, device, sensor_name):
+    """
+    Draws the chart of a device in its placeholder, replacing the previous one in place.
+    Long histories are reduced to MAX_CHART_POINTS with min/max decimation, so spikes stay visible
+    and the data sent per redraw stays bounded whatever the plotted window.
 
     Parameters:
-        sensor_data (list): A list of sensor readings.
+        placeholder: The Streamlit placeholder of the chart.
+        device (dict): A device returned by the gateway, with "timestamps", "values" and "unit" fields (None if unavailable).
         sensor_name (str): The name of the sensor (e.g., "Temperature").
     """
-    if not sensor_data:
+    if not device or not device["values"]:
         # Display a warning if no data is available
-        st.warning(f"{sensor_name} Unavailable.")
+        placeholder.warning(f"{sensor_name} Unavailable.")
         return
-    
-    # Extract values and times from the sensor data
-    values = [float(sensor["value"]) for sensor in sensor_data]
-    times = np.arange(len(sensor_data))
-    unit = sensor_data[0]["unit"] if "unit" in sensor_data[0] else ""
-    
-    # Create a Matplotlib figure
-    fig, ax = plt.subplots(figsize=(10, 5))
-    
-    # Plot the sensor data
-    ax.plot(times, values, marker='o', linestyle='-', color='b')
-    ax.set_ylabel(f"{sensor_name} Value ({unit})", fontsize=15)
-    
-    # Customize the plot
-    ax.grid(True, axis='y')
-    ax.set_xlim(0, 20)
-    ax.set_xticks([])  # Remove x-axis labels
-    ax.tick_params(axis='y', labelsize=12)  # Set y-axis tick font size
-    
-    # Display the plot in the Streamlit app
-    st.pyplot(fig)
+
+    timestamps, values = minmax_decimate(device["timestamps"], device["values"], MAX_CHART_POINTS)
+    frame = pd.DataFrame({"time": timestamps * 1000, "value": values})  # Vega-Lite times are in milliseconds
+    spec = chart_spec(f"{sensor_name} Value ({device.get('unit', '')})", device.get("stale", False))
+    if "setpoint" in device and not device.get("stale", False):
+        # Latest setpoint pushed by the device's actuator
+        spec["title"] = f"Setpoint: {device['setpoint']} {device.get('unit', '')}" + ("" if device["actuator_active"] else " (inactive)")
+    placeholder.vega_lite_chart(frame, spec)
 
 def send_actuator_command(actuator_name, value):
     """
@@ -87,56 +153,170 @@ def send_actuator_command(actuator_name, value):
 # Set the title of the Streamlit app
 st.title("🌱 Smart Greenhouse Dashboard")
 
-# Initialize session state for storing sensor data
-if "sensor_data" not in st.session_state:
+# Number of readings plotted per device
+plot_points = st.sidebar.select_slider("Readings per chart", options=PLOT_CHOICES, value=PLOT_POINTS)
+
+# Initialize session state for the local copy of the sensor data (fetched again when the window changes)
+if "sensor_data" not in st.session_state or st.session_state.plot_points != plot_points:
     st.session_state.sensor_data = {}
+    st.session_state.sequence = None
+    st.session_state.etag = None
+    st.session_state.plot_points = plot_points
+if "render_timer" not in st.session_state:
+    st.session_state.render_timer = RenderTimer()
+render_stats = st.sidebar.empty()
 
 def update_sensor_data():
     """
-    Updates the sensor data in the session state.
+    Fetches what changed since the previous fetch and merges it into the session state.
+
+    Returns:
+        tuple: The changed devices, and True if some of them are not displayed yet.
+    """
+    state = st.session_state
+    delta, state.sequence, state.etag = get_sensor_data(state.sequence, state.etag, plot_points)
+    return delta, merge_sensor_data(state.sensor_data, delta, plot_points)
+
+# Only the readings received since the previous run are downloaded; new readings then arrive through the event stream
+update_sensor_data()
+
+# Dashboard sections: sensor name -> (title, chart label, actuator name, slider maximum)
+SECTIONS = {
+    "sensor_temperature": ("🌡️ Temperature Sensor", "Temperature", "actuator_temperature", 50),
+    "sensor_light": ("💡 Light Sensor", "Light", "actuator_light", 100),
+    "sensor_humidity": ("💧 Humidity Sensor", "Humidity", "actuator_humidity", 100),
+}
+
+def group_devices(sensor_data):
+    """
+    Groups the devices returned by the gateway by sensor name.
+
+    Parameters:
+        sensor_data (dict): The gateway response, mapping "<name>:<id>" to a device.
+
+    Returns:
+        dict: A dictionary mapping each sensor name to its devices, sorted by ID.
+    """
+    groups = {name: [] for name in SECTIONS}
+    for device in sensor_data.values():
+        groups.setdefault(device["name"], []).append(device)
+    for devices in groups.values():
+        devices.sort(key=lambda device: device["id"])
+    return groups
+
+def stream_events():
+    """
+    Reads the gateway's Server-Sent Events stream.
+
+    Yields:
+        tuple: The event type ("reading", "stale", "online" or "actuator") and its data.
+    """
+    with requests.get(f"{GATEWAY_URL}/sensors/stream", stream=True, timeout=(3, STREAM_TIMEOUT)) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[5:])
+                event = "message"
+
+def apply_event(sensor_data, event, data, limit=PLOT_POINTS):
     """
-    st.session_state.sensor_data = get_sensor_data()
+    Applies one gateway event to the local copy of the sensor data.
+    An "actuator" event updates the setpoint shown with the device's chart; only "reading" events add points.
 
-# Update sensor data every 2 seconds
-if "last_update" not in st.session_state or time.time() - st.session_state.last_update > 2:
-    update_sensor_data()
-    st.session_state.last_update = time.time()
+    Parameters:
+        sensor_data (dict): The devices, as returned by /sensors.
+        event (str): The event type.
+        data (dict): The event data.
+        limit (int): Number of most recent readings kept per device.
+
+    Returns:
+        bool: True if the event comes from a device that is not displayed yet.
+    """
+    device = sensor_data.get(data["key"])
+    if event in ("stale", "online"):
+        if device is not None:
+            device["stale"] = event == "stale"
+        return False
+    if event == "actuator":
+        if device is not None:
+            device["setpoint"], device["actuator_active"] = data["value"], data["active"]
+        return False
+    if event != "reading":
+        return False  # An event this dashboard does not display
+    if device is None:
+        sensor_data[data["key"]] = {
+            "name": data["name"], "id": data["id"], "unit": data["unit"], "stale": False,
+            "timestamps": [data["timestamp"]], "values": [data["value"]],
+        }
+        return True
+    if device["timestamps"] and data["timestamp"] <= device["timestamps"][-1]:
+        return False  # Already received with the last /sensors response
+    device["timestamps"] = (device["timestamps"] + [data["timestamp"]])[-limit:]
+    device["values"] = (device["values"] + [data["value"]])[-limit:]
+    device["stale"] = False
+    return False
 
 # Main UI loop
+placeholders = {}  # One chart placeholder per device, updated in place by the stream
+labels = {}
+layout_start = time.perf_counter()
 if "sensor_data" in st.session_state:
-    # Temperature Sensor Section
-    with st.container():
-        st.subheader("🌡️ Temperature Sensor")
-        # Plot temperature data
-        plot_sensor_data(st.session_state.sensor_data.get('temperature_sensor', []), 'Temperature')
-        
-        # Temperature control slider and button
-        temperature_value = st.slider("Set Temperature", min_value=0, max_value=50, value=25, key="temp_slider")
-        if st.button("Send Temperature Command", key="temp_button"):
-            send_actuator_command("actuator_temperature", temperature_value)
-
-    # Light Sensor Section
-    with st.container():
-        st.subheader("💡 Light Sensor")
-        # Plot light data
-        plot_sensor_data(st.session_state.sensor_data.get('light_sensor', []), 'Light')
-        
-        # Light control slider and button
-        light_value = st.slider("Set Light", min_value=0, max_value=100, value=50, key="light_slider")
-        if st.button("Send Light Command", key="light_button"):
-            send_actuator_command("actuator_light", light_value)
-
-    # Humidity Sensor Section
-    with st.container():
-        st.subheader("💧 Humidity Sensor")
-        # Plot humidity data
-        plot_sensor_data(st.session_state.sensor_data.get('humidity_sensor', []), 'Humidity')
-        
-        # Humidity control slider and button
-        humidity_value = st.slider("Set Humidity", min_value=0, max_value=100, value=50, key="humidity_slider")
-        if st.button("Send Humidity Command", key="humidity_button"):
-            send_actuator_command("actuator_humidity", humidity_value)
-
-# Refresh the page every 3 seconds
-time.sleep(3)
-st.rerun()
\ No newline at end of file
+    for name, devices in group_devices(st.session_state.sensor_data).items():
+        feature = name.removeprefix("sensor_")
+        title, label, actuator_name, max_value = SECTIONS.get(
+            name, (f"📟 {feature.capitalize()} Sensor", feature.capitalize(), f"actuator_{feature}", 100)
+        )
+
+        with st.container():
+            st.subheader(title)
+            if not devices:
+                # Display a warning if no device of this type has reported yet
+                draw_chart(st.empty(), None, label)
+            for device in devices:
+                # Plot the device data
+                if len(devices) > 1:
+                    st.caption(f"Device {device['id']}")
+                key = f"{name}:{device['id']}"
+                placeholders[key], labels[key] = st.empty(), label
+                draw_chart(placeholders[key], device, label)
+
+            # Control slider and button
+            value = st.slider(f"Set {label}", min_value=0, max_value=max_value, value=max_value // 2, key=f"{feature}_slider")
+            if st.button(f"Send {label} Command", key=f"{feature}_button"):
+                send_actuator_command(actuator_name, value)
+
+# Time to render the whole page
+st.session_state.render_timer.record(time.perf_counter() - layout_start)
+render_stats.caption(st.session_state.render_timer.summary())
+
+# Update the charts as readings are pushed by the gateway (no polling, no full reruns)
+try:
+    dirty, last_redraw = set(), time.time()
+    for event, data in stream_events():
+        if event == "connected":
+            # Fetch the readings ingested between the previous fetch and the subscription
+            delta, added = update_sensor_data()
+            if added:
+                st.rerun()
+            dirty.update(delta)
+            continue
+        if apply_event(st.session_state.sensor_data, event, data, plot_points):
+            # A new device appeared: rebuild the layout
+            st.rerun()
+        dirty.add(data["key"])
+        if time.time() - last_redraw >= REDRAW_PERIOD:
+            # Redraw the changed charts only
+            with st.session_state.render_timer:
+                for key in dirty & placeholders.keys():
+                    draw_chart(placeholders[key], st.session_state.sensor_data[key], labels[key])
+            render_stats.caption(st.session_state.render_timer.summary())
+            dirty, last_redraw = set(), time.time()
+except requests.exceptions.RequestException as e:
+    # Handle connection errors, then reconnect
+    print(f"Error to connect to gateway: {e}")
+    st.error("Error to connect to gateway.")
+    time.sleep(3)
+st.rerun()
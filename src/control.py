@@ -0,0 +1,216 @@
+import asyncio
+import threading
+import time
+
+# Control modes of a loop
+CONTROL_MODES = ("pid", "hysteresis")
+
+# Default PID gains (per reading error, per error-second, per unit of measurement change per second)
+PID_GAINS = (0.6, 0.05, 0.0)
+
+# Default half-width of the hysteresis band (in the sensor's unit)
+HYSTERESIS_BAND = 0.5
+
+# Smallest change of the commanded value that is sent to the actuator (PID)
+MIN_CHANGE = 0.01
+
+class PIDController():
+    """
+    Proportional-integral-derivative controller.
+    The greenhouse actuators drive their sensor to the commanded value, so the output is the value to drive
+    the sensor to: the measurement plus the PID correction. The integral is frozen while the output is clamped
+    (anti-windup), and the derivative acts on the measurement so setpoint changes cause no kick.
+    """
+    def __init__(self, setpoint: float, kp: float = PID_GAINS[0], ki: float = PID_GAINS[1], kd: float = PID_GAINS[2],
+                 output_min: float = None, output_max: float = None) -> None:
+        """
+        Initializes the controller.
+
+        Parameters:
+            setpoint (float): The target value of the sensor.
+            kp (float): Proportional gain.
+            ki (float): Integral gain (per second).
+            kd (float): Derivative gain (in seconds).
+            output_min (float): Lowest value commanded (None for no limit).
+            output_max (float): Highest value commanded (None for no limit).
+        """
+        self.setpoint = setpoint
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.output_min, self.output_max = output_min, output_max
+        self.integral = 0.0
+        self._last = None  # (timestamp, measurement) of the previous reading
+        self._output = None  # Latest commanded value
+
+    def update(self, measurement: float, timestamp: float):
+        """
+        Computes the command for a new reading.
+
+        Parameters:
+            measurement (float): The sensor value.
+            timestamp (float): The time of the reading (seconds).
+
+        Returns:
+            tuple: The (value, active) to command, or None if the command would not change by MIN_CHANGE.
+        """
+        error = self.setpoint - measurement
+        derivative, integral = 0.0, self.integral
+        if self._last is not None and timestamp > self._last[0]:
+            elapsed = timestamp - self._last[0]
+            integral += error * elapsed
+            derivative = -(measurement - self._last[1]) / elapsed
+        self._last = (timestamp, measurement)
+
+        output = measurement + self.kp * error + self.ki * integral + self.kd * derivative
+        clamped = output
+        if self.output_min is not None:
+            clamped = max(clamped, self.output_min)
+        if self.output_max is not None:
+            clamped = min(clamped, self.output_max)
+        if clamped == output:
+            self.integral = integral  # Only accumulate while the actuator can follow
+
+        if self._output is not None and abs(clamped - self._output) < MIN_CHANGE:
+            return None
+        self._output = clamped
+        return round(clamped, 2), True
+
+    def to_dict(self) -> dict:
+        return {
+            "mode": "pid", "setpoint": self.setpoint, "kp": self.kp, "ki": self.ki, "kd": self.kd,
+            "output_min": self.output_min, "output_max": self.output_max, "output": self._output,
+        }
+
+class HysteresisController():
+    """
+    On/off controller: switches the actuator on when the measurement falls below setpoint - band and off
+    when it rises above setpoint + band (the other way round if reverse, e.g., for coolers).
+    Inside the band the state is kept and nothing is sent. Outside it, the state is sent again with every
+    reading (commands are idempotent), with the setpoint as value, so actuators that only apply a value
+    once, like the greenhouse actuators, are corrected again if the measurement keeps drifting.
+    """
+    def __init__(self, setpoint: float, band: float = HYSTERESIS_BAND, reverse: bool = False) -> None:
+        """
+        Initializes the controller.
+
+        Parameters:
+            setpoint (float): The target value of the sensor.
+            band (float): Half-width of the band around the setpoint where the state is kept.
+            reverse (bool): True if the actuator lowers the measurement when on.
+        """
+        self.setpoint = setpoint
+        self.band = band
+        self.reverse = reverse
+        self.active = None  # Unknown until the first reading outside the band
+
+    def update(self, measurement: float, timestamp: float):
+        """
+        Computes the command for a new reading.
+
+        Returns:
+            tuple: The (value, active) to command, or None inside the band.
+        """
+        if measurement < self.setpoint - self.band:
+            self.active = not self.reverse
+        elif measurement > self.setpoint + self.band:
+            self.active = self.reverse
+        else:
+            return None
+        return self.setpoint, self.active
+
+    def to_dict(self) -> dict:
+        return {"mode": "hysteresis", "setpoint": self.setpoint, "band": self.band, "reverse": self.reverse, "active": self.active}
+
+class ControlLoop():
+    """
+    Binds a controller to the sensor device it reads and the actuator it commands.
+    """
+    def __init__(self, controller, actuator: str, actuator_id: int = 0) -> None:
+        """
+        Initializes the loop.
+
+        Parameters:
+            controller (PIDController | HysteresisController): The controller.
+            actuator (str): The name of the actuator (e.g., "actuator_temperature").
+            actuator_id (int): The device the commands target (for multiplexed actuator servers).
+        """
+        self.controller = controller
+        self.actuator = actuator
+        self.actuator_id = actuator_id
+        self.commands = 0  # Commands sent
+        self.last_command = None  # Time of the latest command
+        self._lock = threading.Lock()  # Readings of a device may arrive on several threads (broker, telemetry)
+
+    def to_dict(self) -> dict:
+        return {
+            "actuator": self.actuator, "deviceId": self.actuator_id,
+            **self.controller.to_dict(), "commands": self.commands, "last_command": self.last_command,
+        }
+
+class ControlEngine():
+    """
+    Runs the control loops of the gateway. Each ingested reading is handed to the loop of its device,
+    on the ingest thread, and the resulting command is sent on the event loop of the actuator channels
+    without waiting for a dashboard.
+    """
+    def __init__(self, send) -> None:
+        """
+        Initializes an engine without loops.
+
+        Parameters:
+            send: Coroutine function (actuator, device_id, value, active, received) sending one command,
+                  where received is the perf_counter() time the triggering reading was ingested.
+        """
+        self.send = send
+        self.loops = {}  # (sensor name, device ID) -> ControlLoop
+        self._loop = None
+
+    def start(self, loop):
+        """
+        Binds the engine to the event loop the commands are sent on.
+        """
+        self._loop = loop
+
+    def set_loop(self, name: str, device_id: int, control_loop: ControlLoop):
+        """
+        Adds or replaces the loop of a sensor device.
+        """
+        self.loops[(name, device_id)] = control_loop
+
+    def remove_loop(self, name: str, device_id: int) -> bool:
+        """
+        Removes the loop of a sensor device. Returns False if it had none.
+        """
+        return self.loops.pop((name, device_id), None) is not None
+
+    def on_reading(self, name: str, device_id: int, value: float, timestamp: float):
+        """
+        Feeds a reading to the loop of its device, and sends the command it produces.
+        Safe to call from any thread; costs one dictionary lookup for devices without a loop.
+
+        Returns:
+            concurrent.futures.Future: The command being sent, or None if no command was needed.
+        """
+        control_loop = self.loops.get((name, device_id))
+        if control_loop is None or self._loop is None:
+            return None
+        received = time.perf_counter()
+        with control_loop._lock:
+            command = control_loop.controller.update(value, timestamp)
+            if command is None:
+                return None
+            control_loop.commands += 1
+            control_loop.last_command = time.time()
+        value, active = command
+        try:
+            return asyncio.run_coroutine_threadsafe(
+                self.send(control_loop.actuator, control_loop.actuator_id, value, active, received), self._loop
+            )
+        except RuntimeError:
+            # The event loop is closed (server shutting down)
+            return None
+
+    def to_dict(self) -> dict:
+        """
+        Returns every loop by device key ("<name>:<id>").
+        """
+        return {f"{name}:{device_id}": control_loop.to_dict() for (name, device_id), control_loop in list(self.loops.items())}
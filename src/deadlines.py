@@ -0,0 +1,112 @@
+import heapq
+import threading
+import time
+
+# Seconds a timeout may fire late; expiries within this window are handled in one wakeup
+TIMEOUT_PRECISION = 0.5
+
+class DeadlineScheduler():
+    """
+    Detects the keys (e.g., devices) that were not touched for `timeout` seconds.
+    A min-heap holds one deadline per armed key, so the thread only wakes when the earliest deadline is due,
+    whatever the number of keys, and sleeps while nothing is armed.
+    Touching an armed key only records the time (O(1)); its heap entry is moved when it comes due
+    and the key was touched since (O(log n) at most once per timeout period).
+    """
+    def __init__(self, timeout: float, on_expire, precision: float = TIMEOUT_PRECISION) -> None:
+        """
+        Initializes an empty scheduler.
+
+        Parameters:
+            timeout (float): Seconds without a touch after which a key expires.
+            on_expire: Called as on_expire(key) from the scheduler thread when a key expires.
+                       Runs under the scheduler lock, so a touch of the same key cannot interleave with it.
+            precision (float): Seconds an expiry may be late, so close deadlines share one wakeup.
+        """
+        self.timeout = timeout
+        self.on_expire = on_expire
+        self.precision = precision
+        self.expired = 0  # Number of expiries so far
+        self._touched = {}  # Monotonic time of the latest touch of each armed key
+        self._heap = []  # (deadline, order, key) entries, one per armed key
+        self._order = 0  # Breaks ties between equal deadlines without comparing keys
+        self._condition = threading.Condition()
+
+    def touch(self, key) -> bool:
+        """
+        Records activity of a key and arms its deadline if it was not armed.
+
+        Returns:
+            bool: True if the key was not armed (never seen, or expired since its last touch).
+        """
+        now = time.monotonic()
+        with self._condition:
+            armed = key in self._touched
+            self._touched[key] = now
+            if not armed:
+                self._push(now + self.timeout, key)
+                if self._heap[0][1] == self._order:
+                    # The new deadline is the earliest one: wake the thread so it sleeps the right time
+                    self._condition.notify()
+            return not armed
+
+    def discard(self, key):
+        """
+        Disarms a key without expiring it (its heap entry is skipped when it comes due).
+        """
+        with self._condition:
+            self._touched.pop(key, None)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of armed keys.
+        """
+        return len(self._touched)
+
+    def _push(self, deadline: float, key):
+        self._order += 1
+        heapq.heappush(self._heap, (deadline, self._order, key))
+
+    def run(self):
+        """
+        Expires keys as their deadlines pass (blocks forever; runs in its own thread).
+        """
+        with self._condition:
+            while True:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    # Sleep at least `precision` so deadlines falling close together are handled in one wakeup
+                    self._condition.wait(max(delay, self.precision))
+                self.expire_due(time.monotonic())
+
+    def expire_due(self, now: float) -> int:
+        """
+        Expires every armed key whose deadline is at or before `now`, and moves the deadlines of keys touched since.
+
+        Returns:
+            int: The number of keys expired.
+        """
+        with self._condition:
+            expired = 0
+            while self._heap and self._heap[0][0] <= now:
+                key = self._heap[0][2]
+                touched = self._touched.get(key)
+                if touched is not None and touched + self.timeout > now:
+                    # Touched since the entry was pushed: move it in one sift instead of a pop and a push
+                    self._order += 1
+                    heapq.heapreplace(self._heap, (touched + self.timeout, self._order, key))
+                    continue
+                heapq.heappop(self._heap)
+                if touched is None:
+                    continue  # Discarded
+                del self._touched[key]
+                expired += 1
+                try:
+                    self.on_expire(key)
+                except Exception as e:
+                    print(f"Error to expire {key}: {e}")
+            self.expired += expired
+            return expired
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+# Events buffered per subscriber before the oldest ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+class EventBroadcaster():
+    """
+    Pushes new readings from the consumer threads to every Server-Sent Events subscriber.
+    Each event is encoded once, whatever the number of subscribers, and handed to the event loop
+    with one thread-safe call. Slow subscribers lose their oldest events instead of blocking ingest.
+    """
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE) -> None:
+        """
+        Initializes a broadcaster without subscribers.
+
+        Parameters:
+            queue_size (int): Events buffered per subscriber.
+        """
+        self.queue_size = queue_size
+        self.dropped = 0  # Events dropped because a subscriber was too slow
+        self._loop = None
+        self._subscribers = set()
+
+    def start(self, loop):
+        """
+        Binds the broadcaster to the event loop serving the subscribers.
+        """
+        self._loop = loop
+
+    def __len__(self) -> int:
+        """
+        Returns the number of subscribers.
+        """
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Registers a subscriber (called from the event loop).
+
+        Returns:
+            asyncio.Queue: The queue the subscriber's encoded events are put in.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """
+        Removes a subscriber (called from the event loop).
+        """
+        self._subscribers.discard(queue)
+
+    def publish(self, event: str, data: dict):
+        """
+        Sends an event to every subscriber. Safe to call from any thread.
+
+        Parameters:
+            event (str): The event type (e.g., "reading").
+            data (dict): The JSON-serializable event data.
+        """
+        if not self._subscribers or self._loop is None:
+            return
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+        try:
+            self._loop.call_soon_threadsafe(self._fan_out, message)
+        except RuntimeError:
+            # The event loop is closed (server shutting down)
+            pass
+
+    def _fan_out(self, message: bytes):
+        """
+        Puts an encoded event in every subscriber queue (runs in the event loop).
+        """
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()  # Drop the oldest event of a slow subscriber
+                self.dropped += 1
+            queue.put_nowait(message)
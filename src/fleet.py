@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import csv
+import json
+import random
+import time
+import grpc
+from concurrent import futures
+from proto import greenhouse_pb2, greenhouse_pb2_grpc
+from greenhouse import Sensor, RABBITMQ_HOST, UPDATE_PERIOD
+from publisher import get_publisher, routing_key, BatchingPublisher, CONFIRM_MODES, SENSOR_EXCHANGE
+from simulation import SensorArray
+
+# Maximum number of messages handed to the publisher in one publish_many() call
+PUBLISH_BATCH = 500
+
+# Seconds between two throughput reports
+REPORT_PERIOD = 10
+
+def load_inventory(path: str):
+    """
+    Loads the sensors of a site from an inventory file.
+    JSON files hold a list of objects and CSV files a header row, both with the fields
+    feature, sensor_id, sensor_value and sensor_unit (the same arguments as greenhouse.py),
+    plus an optional sensor_noise (standard deviation of each random-walk step).
+
+    Parameters:
+        path (str): Path to the inventory file (.json or .csv).
+
+    Returns:
+        list: The Sensor objects, one per inventory entry.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            entries = list(csv.DictReader(file))
+        else:
+            entries = json.load(file)
+
+    sensors = []
+    seen = set()
+    for entry in entries:
+        sensor_id = int(entry["sensor_id"])
+        feature_name = f"sensor_{entry['feature'].lower()}"
+        if (feature_name, sensor_id) in seen:
+            # A device is identified by its sensor name and ID, as in the gateway ("<name>:<id>")
+            raise ValueError(f"Duplicate sensor_id {sensor_id} for feature {entry['feature']} in inventory.")
+        seen.add((feature_name, sensor_id))
+        noise = float(entry.get("sensor_noise") or 0.5)
+        sensors.append(Sensor(id=sensor_id, name=feature_name, value=float(entry["sensor_value"]), unit=entry["sensor_unit"], noise=noise))
+    return sensors
+
+def actuated_sensor(request):
+    """
+    Returns the sensor name a command targets, from the actuator name the gateway sends
+    ("actuator_temperature" targets "sensor_temperature"), or None if the request does not name one.
+    """
+    if request.name.startswith("actuator_"):
+        return "sensor_" + request.name.removeprefix("actuator_")
+    return None
+
+class FleetActuator(greenhouse_pb2_grpc.ActuatorServiceServicer):
+    """
+    Serves the actuators of every sensor of the fleet from one gRPC server.
+    Commands are routed to the sensor whose name and ID match the request's actuator name and deviceId
+    (by deviceId alone for requests without an actuator name, if only one sensor has that ID).
+    """
+    def __init__(self, sensors):
+        """
+        Initializes the actuator with the fleet's sensors.
+
+        Parameters:
+            sensors (list): The sensors served by this actuator.
+        """
+        self.sensors = {(sensor.name, sensor.id): sensor for sensor in sensors}
+        self._by_id = {}  # deviceId -> sensors with that ID
+        for sensor in sensors:
+            self._by_id.setdefault(sensor.id, []).append(sensor)
+
+    def find(self, request):
+        """
+        Returns the sensor a command targets, or None if there is none (or several, without an actuator name).
+        """
+        name = actuated_sensor(request)
+        if name is not None:
+            return self.sensors.get((name, request.deviceId))
+        candidates = self._by_id.get(request.deviceId, [])
+        return candidates[0] if len(candidates) == 1 else None
+
+    async def setValue(self, request, context):
+        """
+        Receives a command to set a sensor's value via gRPC.
+
+        Parameters:
+            request (greenhouse_pb2.ActuatorRequest): The request containing the device ID and the new value.
+            context: gRPC context.
+
+        Returns:
+            greenhouse_pb2.ActuatorResponse: A response indicating success.
+        """
+        sensor = self.find(request)
+        if sensor is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Device {request.deviceId} not found.")
+        print(f"[{sensor.name}:{sensor.id}] Received command: Set value to {request.value} {sensor.unit}")
+        sensor.value = request.value  # Update the sensor's value
+        return greenhouse_pb2.ActuatorResponse(success="Success")
+
+class ArrayActuator(greenhouse_pb2_grpc.ActuatorServiceServicer):
+    """
+    Serves the actuators of a vectorized fleet from one gRPC server.
+    Setpoints are applied to the engine's value array by the index of the request's sensor name and deviceId.
+    """
+    def __init__(self, engine):
+        """
+        Initializes the actuator with the fleet's engine.
+
+        Parameters:
+            engine (SensorArray): The engine holding the sensor values.
+        """
+        self.engine = engine
+
+    async def setValue(self, request, context):
+        """
+        Receives a command to set a sensor's value via gRPC.
+
+        Parameters:
+            request (greenhouse_pb2.ActuatorRequest): The request containing the device ID and the new value.
+            context: gRPC context.
+
+        Returns:
+            greenhouse_pb2.ActuatorResponse: A response indicating success.
+        """
+        try:
+            index = self.engine.index_of(request.deviceId, actuated_sensor(request))
+        except KeyError:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Device {request.deviceId} not found.")
+        self.engine.set_values(index, request.value)  # Update the sensor's value
+        return greenhouse_pb2.ActuatorResponse(success="Success")
+
+class Fleet():
+    """
+    Runs many sensors as asyncio tasks in one event loop.
+    Readings are queued in memory and published in bulk over the process' shared broker connection.
+    """
+    def __init__(self, sensors, publisher, publish_interval: float = 2.0):
+        """
+        Initializes the fleet.
+
+        Parameters:
+            sensors (list): The sensors to run.
+            publisher (StatusPublisher): The publisher shared by all sensors.
+            publish_interval (float): Seconds between two publishes of a sensor.
+        """
+        self.sensors = sensors
+        self.publisher = publisher
+        self.exchange = getattr(publisher, "exchange", '')
+        self.publish_interval = publish_interval
+        self.published = 0  # Messages handed to the broker so far
+        self._outbox = None
+        self._executor = futures.ThreadPoolExecutor(max_workers=1)  # Serializes access to the blocking publisher
+
+    async def run_sensor(self, sensor):
+        """
+        Updates and publishes one sensor forever.
+
+        Parameters:
+            sensor (Sensor): The sensor to run.
+        """
+        loop = asyncio.get_running_loop()
+        queue_name = routing_key(sensor.name, sensor.id, self.exchange)
+
+        # Spread the sensors over the publish interval instead of waking them all at once
+        await asyncio.sleep(random.uniform(0, self.publish_interval))
+        next_update = loop.time() + UPDATE_PERIOD
+
+        while True:
+            if loop.time() >= next_update:
+                sensor.step()
+                next_update += UPDATE_PERIOD
+
+            status = greenhouse_pb2.DeviceStatus(
+                deviceId=sensor.id,
+                name=sensor.name,
+                value=sensor.value,
+                unit=sensor.unit,
+                timestamp=time.time()
+            )
+            self._outbox.put_nowait((queue_name, status.SerializeToString()))
+            await asyncio.sleep(self.publish_interval)
+
+    async def drain_outbox(self):
+        """
+        Publishes the queued readings in batches of up to PUBLISH_BATCH messages.
+        """
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._outbox.get()]
+            while len(batch) < PUBLISH_BATCH and not self._outbox.empty():
+                batch.append(self._outbox.get_nowait())
+            try:
+                await loop.run_in_executor(self._executor, self.publisher.publish_many, batch)
+                self.published += len(batch)
+            except Exception as e:
+                # Handle publish errors (the publisher already retried the connection)
+                print(f"Error to publish to RabbitMQ: {e}")
+
+    async def report(self):
+        """
+        Prints the publish throughput periodically.
+        """
+        last_count, last_time = self.published, time.perf_counter()
+        while True:
+            await asyncio.sleep(REPORT_PERIOD)
+            now = time.perf_counter()
+            rate = (self.published - last_count) / (now - last_time)
+            print(f"[FLEET] {len(self.sensors)} sensors, {rate:.0f} msg/s, {self.published} published")
+            last_count, last_time = self.published, now
+
+    async def run(self, duration: float = None):
+        """
+        Starts every sensor task and the publisher task.
+
+        Parameters:
+            duration (float): Seconds to run for. Runs forever if None.
+        """
+        self._outbox = asyncio.Queue()
+        tasks = [asyncio.create_task(self.run_sensor(sensor)) for sensor in self.sensors]
+        tasks.append(asyncio.create_task(self.drain_outbox()))
+        tasks.append(asyncio.create_task(self.report()))
+        try:
+            await asyncio.wait(tasks, timeout=duration)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+class VectorFleet():
+    """
+    Runs a fleet on the vectorized engine: one task steps every sensor at once and publishes all readings in bulk.
+    """
+    def __init__(self, engine, publisher, publish_interval: float = 2.0, tick: float = UPDATE_PERIOD):
+        """
+        Initializes the fleet.
+
+        Parameters:
+            engine (SensorArray): The engine holding the sensor values.
+            publisher (StatusPublisher): The publisher shared by all sensors.
+            publish_interval (float): Seconds between two publishes of the whole fleet.
+            tick (float): Seconds between two random-walk steps (may be sub-second).
+        """
+        self.engine = engine
+        self.publisher = publisher
+        self.publish_interval = publish_interval
+        self.tick = tick
+        self.published = 0  # Messages handed to the broker so far
+        self._executor = futures.ThreadPoolExecutor(max_workers=1)  # Serializes access to the blocking publisher
+
+    async def run_engine(self):
+        """
+        Steps the engine every tick.
+        """
+        while True:
+            self.engine.step()
+            await asyncio.sleep(self.tick)
+
+    async def publish_all(self):
+        """
+        Publishes the readings of every sensor every publish interval, in chunks of PUBLISH_BATCH messages.
+        """
+        loop = asyncio.get_running_loop()
+
+        while True:
+            started = loop.time()
+            messages = self.engine.encode()
+            for start in range(0, len(messages), PUBLISH_BATCH):
+                batch = messages[start:start + PUBLISH_BATCH]
+                try:
+                    await loop.run_in_executor(self._executor, self.publisher.publish_many, batch)
+                    self.published += len(batch)
+                except Exception as e:
+                    # Handle publish errors (the publisher already retried the connection)
+                    print(f"Error to publish to RabbitMQ: {e}")
+            await asyncio.sleep(max(0, self.publish_interval - (loop.time() - started)))
+
+    async def run(self, duration: float = None):
+        """
+        Starts the engine and publisher tasks.
+
+        Parameters:
+            duration (float): Seconds to run for. Runs forever if None.
+        """
+        tasks = [asyncio.create_task(self.run_engine()), asyncio.create_task(self.publish_all())]
+        try:
+            await asyncio.wait(tasks, timeout=duration)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+async def start_actuator_server(servicer, port: int):
+    """
+    Starts one gRPC server that serves the actuators of every sensor.
+
+    Parameters:
+        servicer (ActuatorServiceServicer): The multiplexed actuator (FleetActuator or ArrayActuator).
+        port (int): The port on which the gRPC server will listen (0 picks a free port).
+
+    Returns:
+        tuple: The started grpc.aio server and the bound port.
+    """
+    server = grpc.aio.server()
+    greenhouse_pb2_grpc.add_ActuatorServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port(f"[::]:{port}")
+    await server.start()
+    print(f"[FLEET] Actuator gRPC Server running on port {port}")
+    return server, port
+
+async def run_fleet(sensors, publisher, port: int, publish_interval: float, duration: float = None, engine: str = "tasks", tick: float = UPDATE_PERIOD):
+    """
+    Runs the fleet and its multiplexed actuator server in the current event loop.
+
+    Parameters:
+        sensors (list): The sensors to run.
+        publisher (StatusPublisher): The publisher shared by all sensors.
+        port (int): The port of the multiplexed actuator server.
+        publish_interval (float): Seconds between two publishes of a sensor.
+        duration (float): Seconds to run for. Runs forever if None.
+        engine (str): "tasks" runs one asyncio task per sensor, "vectorized" steps all sensors in one NumPy array.
+        tick (float): Seconds between two random-walk steps of the vectorized engine.
+    """
+    if engine == "vectorized":
+        array = SensorArray.from_sensors(sensors, exchange=getattr(publisher, "exchange", ''))
+        servicer, fleet = ArrayActuator(array), VectorFleet(array, publisher, publish_interval, tick)
+    else:
+        servicer, fleet = FleetActuator(sensors), Fleet(sensors, publisher, publish_interval)
+
+    server, _ = await start_actuator_server(servicer, port)
+    try:
+        await fleet.run(duration)
+    finally:
+        await server.stop(grace=None)
+
+if __name__ == "__main__":
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Run every sensor of an inventory in one process.")
+    parser.add_argument("inventory", help="Sensor inventory file (.json or .csv)")
+    parser.add_argument("actuator_port", type=int, help="Port for the multiplexed Actuator gRPC server")
+    parser.add_argument("--publish-interval", type=float, default=2.0, help="Seconds between status publishes")
+    parser.add_argument("--confirms", choices=CONFIRM_MODES, default="off", help="RabbitMQ publisher confirm mode")
+    parser.add_argument("--batch-size", type=int, default=1, help="Readings per RabbitMQ message (DeviceStatusBatch if > 1)")
+    parser.add_argument("--linger", type=float, default=1.0, help="Maximum seconds a reading waits for its batch")
+    parser.add_argument("--exchange", nargs="?", const=SENSOR_EXCHANGE, default='', help=f"Publish to a topic exchange (default {SENSOR_EXCHANGE}) instead of the feature queues")
+    parser.add_argument("--engine", choices=["tasks", "vectorized"], default="tasks", help="Simulation engine")
+    parser.add_argument("--tick", type=float, default=UPDATE_PERIOD, help="Seconds between random-walk steps (vectorized engine)")
+    args = parser.parse_args()
+
+    sensors = load_inventory(args.inventory)
+    publisher = get_publisher(RABBITMQ_HOST, confirms=args.confirms, exchange=args.exchange)
+    if args.batch_size > 1:
+        publisher = BatchingPublisher(publisher, max_batch=args.batch_size, linger=args.linger)
+    asyncio.run(run_fleet(sensors, publisher, args.actuator_port, args.publish_interval, engine=args.engine, tick=args.tick))
@@ -1,173 +1,574 @@
-from fastapi import FastAPI, HTTPException
-import pika
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from contextlib import asynccontextmanager
+import argparse
+import asyncio
+import os
 import threading
-import grpc
 import time
-from collections import deque
+import numpy as np
 from proto import greenhouse_pb2
 from proto import greenhouse_pb2_grpc
+from actuators import ActuatorChannelPool, ActuatorCommandQueue, CommandSuperseded, COMMAND_RATE
+from control import ControlEngine, ControlLoop, PIDController, HysteresisController, CONTROL_MODES, PID_GAINS, HYSTERESIS_BAND
+from deadlines import DeadlineScheduler, TIMEOUT_PRECISION
+from events import EventBroadcaster
+from metrics import MetricsRegistry, Counter, Gauge, Histogram, LAG_BUCKETS, CONTENT_TYPE
+from recording import RecordingWriter
+from ingest import IngestPipeline, ShardedConsumers, parse_message, PREFETCH_COUNT, INGEST_WORKERS, INGEST_QUEUE_SIZE, OVERFLOW_POLICIES, SAMPLE_RATE
+from responses import negotiate, PROTOBUF_TYPE
+from registry import SensorRegistry, GatewayConfig, HISTORY_SECONDS, RESPONSE_LIMIT
+from sharedstate import SharedSensorRegistry, MAX_DEVICES
+from tsdb import TimeSeriesStore, OutOfOrderReading, RETENTION_SECONDS
+from transport import open_connection
+import grpc
 import uvicorn
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Opens the actuator channels and the telemetry server when the server starts and closes them when it stops.
+    HTTP workers of a multi-worker gateway relay the stream events from shared memory instead
+    (the ingest process runs the telemetry server).
+    """
+    broadcaster.start(asyncio.get_running_loop())
+    control.start(asyncio.get_running_loop())
+    actuator_pool.warm(config.actuators.values())
+    health_checks = asyncio.create_task(actuator_pool.run_health_checks())
+    watchers = [asyncio.create_task(actuator_pool.watch_state(address, on_actuator_state)) for address in set(config.actuators.values())] if WATCH_ACTUATORS else []
+    relay = asyncio.create_task(relay_shared_events()) if SHARED_STATE else None
+    telemetry_server = await start_telemetry_server(TELEMETRY_PORT) if TELEMETRY_PORT and not SHARED_STATE else None
+    yield
+    health_checks.cancel()
+    for watcher in watchers:
+        watcher.cancel()
+    if relay is not None:
+        relay.cancel()
+    await actuator_pool.close()
+    if telemetry_server is not None:
+        await telemetry_server.stop(grace=None)
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # RabbitMQ host address
 RABBITMQ_HOST = "localhost"
 
-# List of RabbitMQ queues for sensor data
+# Default RabbitMQ queues for sensor data (one per sensor feature)
 SENSOR_QUEUES = ["queue_sensor_temperature", "queue_sensor_light", "queue_sensor_humidity"]
 
+# Topic exchange sensors publish to with "sensor.<name>.<id>" routing keys
+SENSOR_EXCHANGE = "greenhouse.sensors"
+
 # Timeout for sensor updates (in seconds)
 TIMEOUT_SENSOR = 10
 
-# Deques to store the latest sensor data (max length = 20)
-temp_sensor = deque(maxlen=20)
-light_sensor = deque(maxlen=20)
-humd_sensor = deque(maxlen=20)
-
-# Dictionary to track the last update time for each sensor
-last_update = {
-    "sensor_temperature": time.time(),
-    "sensor_light": time.time(),
-    "sensor_humidity": time.time(),
-}
-
-# Dictionary mapping actuator names to their respective gRPC server ports
-ACTUATOR_PORTS = {
-    "actuator_temperature": 50051,
-    "actuator_light": 50052,
-    "actuator_humidity": 50053,
-}
+# Seconds a sensor timeout may be detected late
+TIMEOUT_LATENESS = TIMEOUT_PRECISION
+
+# Port of the gRPC telemetry server sensors can stream readings to (0 disables it)
+TELEMETRY_PORT = 50050
+
+# Seconds between two checks of the configuration file
+CONFIG_POLL = 5
+
+# Unacknowledged messages RabbitMQ may deliver to each consumer
+PREFETCH = PREFETCH_COUNT
+
+# Threads parsing and storing messages
+WORKERS = INGEST_WORKERS
+
+# Processes consuming RabbitMQ (1 consumes in the gateway process)
+CONSUMER_PROCESSES = 1
+
+# Messages buffered for the ingest workers, and what happens to a message when they are full (one of OVERFLOW_POLICIES)
+INGEST_QUEUE = INGEST_QUEUE_SIZE
+OVERFLOW = "block"
+
+# Messages of each sensor (routing key) kept while the "sample" overflow policy sheds load (1 of SAMPLING)
+SAMPLING = SAMPLE_RATE
+
+# Print every received message
+VERBOSE = False
+
+# Seconds without events after which a comment is sent to keep idle streams open
+STREAM_KEEPALIVE = 15
+
+# uvicorn worker processes serving the HTTP API (with more than 1, the registry lives in shared memory)
+HTTP_WORKERS = 1
+
+# Devices the shared memory registry has room for (multi-worker gateway)
+SHARED_DEVICES = MAX_DEVICES
+
+# Name of the shared memory registry, set by the ingest process for its HTTP workers ('' in a single-process gateway)
+SHARED_STATE = os.environ.get("GATEWAY_SHARED_STATE", "")
+
+# Seconds between two checks of the shared memory registry for new stream events (HTTP workers)
+STREAM_RELAY_PERIOD = 0.1
+
+# Default configuration, used when no configuration file is given
+DEFAULT_CONFIG = GatewayConfig(
+    queues=SENSOR_QUEUES,
+    exchange=SENSOR_EXCHANGE,
+    actuators={
+        "actuator_temperature": "localhost:50051",
+        "actuator_light": "localhost:50052",
+        "actuator_humidity": "localhost:50053",
+    },
+)
+
+# Path to the JSON configuration file (queues, exchange and actuator addresses)
+CONFIG_PATH = os.environ.get("GATEWAY_CONFIG", "")
+
+# Current configuration
+config = GatewayConfig.load(CONFIG_PATH, DEFAULT_CONFIG)
+
+# Maximum number of commands of a batch sent at the same time
+BATCH_CONCURRENCY = 32
+
+# Long-lived gRPC channels to the actuators
+actuator_pool = ActuatorChannelPool()
+
+# Commands per second sent to each actuator device (0: no limit; HTTP workers get it from the ingest process)
+ACTUATOR_RATE = float(os.environ.get("GATEWAY_ACTUATOR_RATE", COMMAND_RATE))
+
+# Follow the actuators' state over watchState streams (opt-in: each stream holds a thread of a thread-server actuator)
+WATCH_ACTUATORS = os.environ.get("GATEWAY_WATCH_ACTUATORS", "") == "1"
+
+# Pending commands per actuator device: the latest one wins, sent at most ACTUATOR_RATE times per second
+command_queue = ActuatorCommandQueue(actuator_pool, ACTUATOR_RATE)
+
+# Commands per second sent to each actuator device by the control loops (0: no limit, one command in flight at a time)
+CONTROL_RATE = 0.0
+
+# Pending commands of the control loops, limited apart from the clients' commands so a loop reacts to every reading
+control_queue = ActuatorCommandQueue(actuator_pool, CONTROL_RATE)
+
+# Registry holding the buffers of every device seen so far (HTTP workers read the ingest process' registry)
+registry = SharedSensorRegistry.attach(SHARED_STATE) if SHARED_STATE else SensorRegistry()
+
+# Directory of the on-disk time-series store
+DATA_DIR = "data"
+
+# Durable history of every reading (opened at startup, None if disabled)
+store = None
+
+# Recording of every ingested reading, for replay.py (opened at startup with --record, None otherwise)
+recorder = None
+
+# Pushes new readings to the dashboards subscribed to /sensors/stream
+broadcaster = EventBroadcaster()
+
+# Deadlines of the devices, expired when a device sends no reading for TIMEOUT_SENSOR seconds
+timeouts = DeadlineScheduler(TIMEOUT_SENSOR, lambda device: expire_device(device), TIMEOUT_LATENESS)
+
+# Closed-loop control of actuators from the readings, sending commands over the pooled channels
+control = ControlEngine(lambda *command: send_control_command(*command))
+
+# Latest state of every actuator device, pushed by the actuators' watchState streams ("<name>:<id>" -> state)
+actuator_states = {}
+
+def buffer_occupancy() -> dict:
+    """
+    Returns the number of readings buffered per sensor name (read when /metrics is scraped).
+    """
+    samples = {}
+    for device in registry.devices():
+        samples[device.name] = samples.get(device.name, 0) + len(device.history)
+    return samples
+
+def devices_online() -> int:
+    """
+    Returns the number of devices that reported within the timeout (read when /metrics is scraped).
+    HTTP workers count them from the shared registry, as the timeouts run in the ingest process.
+    """
+    if SHARED_STATE:
+        return sum(not device.stale for device in registry.devices())
+    return len(timeouts)
+
+def queue_label(routing_key: str) -> str:
+    """
+    Returns the queue label of a message's metrics: the named queue, or "sensor.<name>" for
+    "sensor.<name>.<id>" routing keys, so the number of series does not grow with the number of devices.
+    """
+    if routing_key.startswith("sensor."):
+        return routing_key.rsplit(".", 1)[0]
+    return routing_key
+
+# Metrics exposed at /metrics
+metrics = MetricsRegistry()
+parse_seconds = metrics.register(Histogram("gateway_parse_seconds", "Protobuf parse time of a RabbitMQ message.", "queue"))
+# Messages per queue are the parse timer's observation counts, so consuming a message records a single histogram
+metrics.register(Gauge("gateway_messages_total", "RabbitMQ messages consumed.", parse_seconds.counts, "queue", kind="counter"))
+reading_lag = metrics.register(Histogram(
+    "gateway_reading_lag_seconds", "Time from a reading's sensor timestamp to its ingestion by the gateway.", buckets=LAG_BUCKETS
+))
+sensors_encode_seconds = metrics.register(Histogram("gateway_sensors_encode_seconds", "Encoding time of /sensors responses.", "media_type"))
+actuator_seconds = metrics.register(Histogram("gateway_actuator_set_value_seconds", "Latency of actuator setValue calls, retries included.", "actuator"))
+actuator_errors = metrics.register(Counter("gateway_actuator_errors_total", "Failed actuator setValue calls.", "actuator"))
+actuator_superseded = metrics.register(Counter(
+    "gateway_actuator_superseded_total", "Actuator commands replaced by a newer command before they were sent.", "actuator"
+))
+metrics.register(Gauge("gateway_actuator_pending_commands", "Actuator commands waiting to be sent.", lambda: len(command_queue) + len(control_queue)))
+control_reaction_seconds = metrics.register(Histogram(
+    "gateway_control_reaction_seconds", "Time from a reading's ingestion to the response to the control command it triggered.", "actuator"
+))
+metrics.register(Gauge("gateway_control_loops", "Configured control loops.", lambda: len(control.loops)))
+metrics.register(Gauge("gateway_devices", "Registered devices.", lambda: len(registry.devices())))
+metrics.register(Gauge("gateway_buffer_readings", "Readings held in the in-memory device buffers.", buffer_occupancy, "sensor"))
+metrics.register(Gauge("gateway_buffer_capacity_readings", "Readings each device buffer can hold.", lambda: registry.capacity))
+metrics.register(Gauge("gateway_devices_online", "Devices that reported within the timeout.", devices_online))
+metrics.register(Gauge("gateway_stream_subscribers", "Open /sensors/stream connections.", lambda: len(broadcaster)))
+metrics.register(Gauge("gateway_stream_dropped_events_total", "Events dropped for slow /sensors/stream subscribers.", lambda: broadcaster.dropped, kind="counter"))
+
+# Parse timers by routing key, so the queue label is computed once per key
+parse_timers = {}
+
+# Bounded ingest stage of the RabbitMQ consumer (set when consuming starts in this process)
+pipeline = None
+metrics.register(Gauge(
+    "gateway_store_out_of_order_total", "Readings not stored on disk because they were older than their device's newest one.",
+    lambda: store.out_of_order if store is not None else 0, kind="counter"
+))
+metrics.register(Gauge("gateway_ingest_queue_depth", "Messages waiting for an ingest worker.", lambda: pipeline.depth() if pipeline else 0))
+metrics.register(Gauge(
+    "gateway_ingest_dropped_total", "Messages dropped by the ingest overflow policy.", lambda: pipeline.dropped if pipeline else 0, kind="counter"
+))
+metrics.register(Gauge(
+    "gateway_ingest_sampled_out_total", "Messages not stored while the sample overflow policy sheds load.",
+    lambda: pipeline.sampler.skipped if pipeline else 0, kind="counter"
+))
+
+def ingest_status(status, source: str):
+    """
+    Stores one reading, whatever transport it arrived on (RabbitMQ or gRPC telemetry stream).
+
+    Parameters:
+        status (greenhouse_pb2.DeviceStatus): The reading (or an ingest.Reading forwarded by a consumer process).
+        source (str): The RabbitMQ routing key or gRPC peer the reading arrived from.
+
+    Returns:
+        SensorDevice: The device the reading was stored in.
+    """
+    # Readings carry the time they were taken; older senders without one get the reception time
+    now = time.time()
+    timestamp = status.timestamp or now
+    reading_lag.observe(now - timestamp)
+
+    # Store the reading in its device buffer (registered on first message)
+    device = registry.record(status, source, timestamp)
+
+    # Push back the device's timeout; a stale device that reports again is back online
+    if timeouts.touch(device) and device.stale:
+        registry.set_stale(device, False)
+        print(f"[GATEWAY] {device.key} is back online")
+        broadcaster.publish("online", {"key": device.key, "seq": device.stale_seq})
+
+    # Run the device's control loop, if any (the command is sent without waiting for it)
+    control.on_reading(status.name, status.deviceId, status.value, timestamp)
+
+    # Persist the reading on disk (readings older than the device's newest stored one are only counted)
+    if store is not None:
+        try:
+            store.append(status.name, status.deviceId, timestamp, status.value)
+        except OutOfOrderReading as e:
+            if VERBOSE:
+                print(f"[WARNING] Not stored on disk for {device.key}: {e}")
+
+    # Record the reading for replay
+    if recorder is not None:
+        recorder.write(status, timestamp)
+
+    # Push the reading to the subscribed dashboards
+    broadcaster.publish("reading", {
+        "key": device.key,
+        "seq": device.last_seq,
+        "name": device.name,
+        "id": device.device_id,
+        "unit": device.unit,
+        "timestamp": timestamp,
+        "value": round(status.value, 2),
+    })
+    return device
+
+class TelemetryServicer(greenhouse_pb2_grpc.TelemetryServiceServicer):
+    """
+    Receives continuous streams of readings from sensors over gRPC, without a broker.
+    Each sensor keeps one HTTP/2 stream open and HTTP/2 flow control paces it.
+    """
+    async def streamStatus(self, request_iterator, context):
+        """
+        Ingests every reading of a client stream.
+
+        Parameters:
+            request_iterator: The stream of greenhouse_pb2.DeviceStatus messages.
+            context: gRPC context.
+
+        Returns:
+            greenhouse_pb2.TelemetryAck: The number of readings received when the sensor closes the stream.
+        """
+        source = f"grpc:{context.peer()}"
+        received = 0
+        async for status in request_iterator:
+            ingest_status(status, source)
+            received += 1
+        return greenhouse_pb2.TelemetryAck(received=received)
+
+async def start_telemetry_server(port: int):
+    """
+    Starts the gRPC telemetry server in the running event loop.
+
+    Parameters:
+        port (int): The port on which the server will listen.
+
+    Returns:
+        grpc.aio.Server: The started server.
+    """
+    server = grpc.aio.server()
+    greenhouse_pb2_grpc.add_TelemetryServiceServicer_to_server(TelemetryServicer(), server)
+    server.add_insecure_port(f"[::]:{port}")
+    await server.start()
+    print(f"[GATEWAY] Telemetry gRPC Server running on port {port}")
+    return server
+
+async def serve_telemetry(port: int):
+    """
+    Runs the gRPC telemetry server until the process exits (in the ingest process of a multi-worker gateway,
+    which has no event loop of its own).
+    """
+    server = await start_telemetry_server(port)
+    await server.wait_for_termination()
+
+def handle_message(routing_key: str, properties, body: bytes) -> int:
+    """
+    Parses a RabbitMQ message (one reading or a batch) and stores its readings.
+    Runs on the ingest workers, off the consumer thread.
+
+    Parameters:
+        routing_key (str): The queue or routing key the message arrived on.
+        properties: Message properties.
+        body (bytes): The message body (serialized protobuf).
+
+    Returns:
+        int: The number of readings stored.
+    """
+    start = time.perf_counter()
+    readings = parse_message(properties, body)
+    timer = parse_timers.get(routing_key)
+    if timer is None:
+        timer = parse_timers[routing_key] = parse_seconds.labels(queue_label(routing_key))
+    timer.observe(time.perf_counter() - start)
+    if VERBOSE:
+        # Print the received message (costly at high rates, so off by default)
+        print(f"[GATEWAY] Message received from queue {routing_key}:")
+        for status in readings:
+            print(f"  - ID: {status.deviceId}")
+            print(f"  - Name: {status.name}")
+            print(f"  - Value: {round(status.value, 2)} {status.unit}")
+
+    # Store the readings
+    for status in readings:
+        ingest_status(status, routing_key)
+    return len(readings)
 
 def consume_sensors():
     """
     Consumes messages from RabbitMQ queues and updates the sensor data.
-    This function runs in a separate thread.
+    This function runs in a separate thread. The consumer thread only hands messages to the ingest
+    workers through a bounded queue, and acknowledges them in batches once they are stored (or dropped
+    by the overflow policy).
     """
+    global pipeline
+
+    if CONSUMER_PROCESSES > 1:
+        # Shard the queues across consumer processes; readings are stored in this process
+        consumers = ShardedConsumers(ingest_status, CONSUMER_PROCESSES, RABBITMQ_HOST, config.queues, config.exchange, PREFETCH)
+        if OVERFLOW != "block":
+            print(f"[WARNING] The {OVERFLOW} overflow policy only applies to the in-process consumer; consumer processes block when the gateway falls behind")
+        print(f"[GATEWAY] Listening for sensor updates with {CONSUMER_PROCESSES} consumer processes...")
+        consumers.run()
+        return
+
     try:
         # Connect to RabbitMQ
-        connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
+        connection = open_connection(RABBITMQ_HOST)
         channel = connection.channel()
-        
-        def callback(ch, method, properties, body):
+
+        # Limit the unacknowledged messages in flight to this consumer
+        channel.basic_qos(prefetch_count=PREFETCH)
+        if OVERFLOW == "block" and not PREFETCH:
+            print("[WARNING] The block overflow policy relies on the prefetch count; with --prefetch 0 the ingest queues are unbounded")
+        pipeline = IngestPipeline(handle_message, workers=WORKERS, queue_size=INGEST_QUEUE, policy=OVERFLOW, sample_rate=SAMPLING)
+        pipeline.attach(connection, channel)
+        callback = pipeline.on_message
+
+        subscribed = set()
+
+        def subscribe(queues):
+            """
+            Declares and consumes the named queues that are not consumed yet.
             """
-            Callback function to process messages received from RabbitMQ.
+            for queue in queues:
+                if queue not in subscribed:
+                    channel.queue_declare(queue=queue, durable=False)
+                    channel.basic_consume(queue=queue, on_message_callback=callback)
+                    subscribed.add(queue)
 
-            Parameters:
-                ch: The channel object.
-                method: The method frame.
-                properties: Message properties.
-                body: The message body (serialized protobuf).
+        def reload_config(mtime=None):
             """
-            status = greenhouse_pb2.DeviceStatus()
+            Re-reads the configuration file when it changes and subscribes to newly listed queues.
+            Runs on the consumer thread through the connection's timer.
+            """
+            global config
+
             try:
-                # Parse the message body into a DeviceStatus protobuf object
-                status.ParseFromString(body)
-
-                # Print the received message
-                print(f"[GATEWAY] Message received from queue {method.routing_key}:")
-                print(f"  - ID: {status.deviceId}")
-                print(f"  - Name: {status.name}")
-                print(f"  - Value: {round(status.value, 2)} {status.unit}")
-
-                # Create a dictionary with the sensor data
-                sensor_info = {
-                    "id": status.deviceId,
-                    "value": f"{round(status.value, 2)}",
-                    "unit":  f"{status.unit}",
-                    "name": status.name
-                }
-
-                # Update the last update time for the sensor
-                last_update[status.name] = time.time()
-
-                # Append the sensor data to the appropriate deque
-                if status.name == "sensor_temperature":
-                    temp_sensor.append(sensor_info)
-                elif status.name == "sensor_light":
-                    light_sensor.append(sensor_info)
-                elif status.name == "sensor_humidity":
-                    humd_sensor.append(sensor_info)
-
-            except Exception as e:
-                # Handle errors during message parsing
-                print(f"Error parsing message: {e}")
-        
-        # Declare and consume messages from each queue
-        for queue in SENSOR_QUEUES:
-            channel.queue_declare(queue=queue, durable=False)
-            channel.basic_consume(queue=queue, on_message_callback=callback, auto_ack=True)
-        
-        print("[GATEWAY] Listening for sensor updates...")
+                current = os.path.getmtime(CONFIG_PATH)
+                if mtime is not None and current != mtime:
+                    config = GatewayConfig.load(CONFIG_PATH, DEFAULT_CONFIG)
+                    subscribe(config.queues)
+                    print(f"[GATEWAY] Reloaded configuration from {CONFIG_PATH}")
+                mtime = current
+            except (OSError, ValueError) as e:
+                print(f"Error to reload configuration: {e}")
+            connection.call_later(CONFIG_POLL, lambda: reload_config(mtime))
+
+        # Declare and consume messages from each configured queue
+        subscribe(config.queues)
+
+        # Consume every sensor publishing to the topic exchange, whatever its name or ID
+        if config.exchange:
+            channel.exchange_declare(exchange=config.exchange, exchange_type="topic")
+            result = channel.queue_declare(queue="", exclusive=True)
+            channel.queue_bind(exchange=config.exchange, queue=result.method.queue, routing_key="sensor.#")
+            channel.basic_consume(queue=result.method.queue, on_message_callback=callback)
+
+        if CONFIG_PATH:
+            reload_config()
+
+        pipeline.start()
+        threading.Thread(target=pipeline.report, daemon=True).start()
+        print(f"[GATEWAY] Listening for sensor updates with {WORKERS} ingest workers ({INGEST_QUEUE} queued at most, {OVERFLOW} when full)...")
         channel.start_consuming()  # Start consuming messages
     except Exception as e:
         # Handle RabbitMQ connection errors
         print(f"Error to connect to RabbitMQ: {e}")
 
-def monitor_last_update():
+def expire_device(device):
     """
-    Monitors the last update time for each sensor and clears the data if a timeout occurs.
-    This function runs in a separate thread.
+    Marks a device that stopped reporting as stale and tells the dashboards. Its readings are kept.
+    Called by the timeout scheduler at most TIMEOUT_LATENESS seconds after the device's deadline.
     """
-    global last_update
+    print(f"[WARNING] {device.key} except timeout: {TIMEOUT_SENSOR}sec")
+    registry.set_stale(device, True)
+    broadcaster.publish("stale", {"key": device.key, "seq": device.stale_seq, "last_update": device.last_update})
 
-    while True:
-        for sensor_name, last_time in last_update.items():
-            # Check if the sensor has timed out
-            if time.time() - last_time > TIMEOUT_SENSOR:
-                print(f"[WARNING] {sensor_name} except timeout: {TIMEOUT_SENSOR}sec")
-                # Clear the sensor data if a timeout occurs
-                if sensor_name == "sensor_temperature":
-                    temp_sensor.clear()
-                elif sensor_name == "sensor_light":
-                    light_sensor.clear()
-                elif sensor_name == "sensor_humidity":
-                    humd_sensor.clear()
-                
-                # Reset the last update time
-                last_update[sensor_name] = time.time()
-
-        # Wait 10 seconds before the next check
-        time.sleep(10)
-
-def send_actuator_command(actuator_name: str, value: float):
-    """
-    Sends a command to an actuator via gRPC.
+class ActuatorCommand(BaseModel):
+    """
+    One command of a batch, with the fields of ActuatorRequest.
+    """
+    actuator: str
+    deviceId: int = 0
+    value: float
+    active: bool = True
+
+async def send_actuator_command(actuator_name: str, value: float, device_id: int = 0, active: bool = True, queue: ActuatorCommandQueue = None):
+    """
+    Sends a command to an actuator via gRPC, over the actuator's pooled channel.
+    Commands to one actuator device are sent one at a time; a command still waiting when a newer one
+    arrives is dropped in favor of the newer one.
 
     Parameters:
         actuator_name (str): The name of the actuator (e.g., "actuator_temperature").
         value (float): The value to set on the actuator.
+        device_id (int): The device the command targets (used by multiplexed actuator servers).
+        active (bool): Whether the actuator should be active.
+        queue (ActuatorCommandQueue): The queue the command goes through (the clients' command_queue by default).
 
     Returns:
         str: A success message or an error message.
+
+    Raises:
+        CommandSuperseded: If a newer command to the same device replaced this one before it was sent.
     """
-    if actuator_name not in ACTUATOR_PORTS:
+    if actuator_name not in config.actuators:
         raise ValueError(f"Actuator '{actuator_name}' not found.")
 
-    port = ACTUATOR_PORTS[actuator_name]
+    address = config.actuators[actuator_name]
 
     try:
-        # Connect to the gRPC server
-        with grpc.insecure_channel(f"localhost:{port}") as channel:
-            stub = greenhouse_pb2_grpc.ActuatorServiceStub(channel)
-            # Create a gRPC request
-            request = greenhouse_pb2.ActuatorRequest(value=value)
-            # Call the setValue method on the actuator
-            response = stub.setValue(request)
-            return response.success
+        # Create a gRPC request
+        request = greenhouse_pb2.ActuatorRequest(name=actuator_name, deviceId=device_id, value=value, active=active)
+        # Call the setValue method on the actuator (with deadline and retries), unless a newer command replaces it
+        start = time.perf_counter()
+        try:
+            response = await (command_queue if queue is None else queue).submit(address, request)
+        finally:
+            actuator_seconds.labels(actuator_name).observe(time.perf_counter() - start)
+        return response.success
+
+    except CommandSuperseded:
+        actuator_superseded.labels(actuator_name).inc()
+        raise
 
     except Exception as e:
         # Handle gRPC communication errors
+        actuator_errors.labels(actuator_name).inc()
         print(f"Error to send command to {actuator_name}: {e}")
         return "Error to communicate with actuator"
 
-def handle_client_request(actuator_name: str, value: float):
+async def send_control_command(actuator_name: str, device_id: int, value: float, active: bool, received: float):
+    """
+    Sends a command decided by a control loop, and records the time since the reading that triggered it.
+
+    Parameters:
+        actuator_name (str): The name of the actuator.
+        device_id (int): The device the command targets.
+        value (float): The value to set on the actuator.
+        active (bool): Whether the actuator should be active.
+        received (float): The perf_counter() time the triggering reading was ingested.
+
+    Returns:
+        str: A success message or an error message.
+    """
+    try:
+        result = await send_actuator_command(actuator_name, value, device_id, active, control_queue)
+    except CommandSuperseded:
+        return "Superseded"  # The loop already sent a newer command
+    except ValueError as e:
+        print(f"Error to send control command: {e}")
+        return str(e)
+    control_reaction_seconds.labels(actuator_name).observe(time.perf_counter() - received)
+    return result
+
+def on_actuator_state(address: str, state):
+    """
+    Records a state pushed by an actuator and publishes it as an "actuator" stream event.
+
+    Parameters:
+        address (str): The actuator's gRPC address.
+        state (greenhouse_pb2.ActuatorState): The actuator's new state.
+    """
+    data = {
+        "key": f"{state.name}:{state.deviceId}",
+        "actuators": [name for name, actuator_address in config.actuators.items() if actuator_address == address],
+        "value": round(state.value, 2),
+        "active": state.active,
+        "version": state.version,
+        "timestamp": state.timestamp,
+    }
+    actuator_states[data["key"]] = data
+    broadcaster.publish("actuator", data)
+
+async def handle_client_request(actuator_name: str, value: float, device_id: int = 0, active: bool = True):
     """
     Handles a client request to control an actuator.
 
     Parameters:
         actuator_name (str): The name of the actuator.
         value (float): The value to set on the actuator.
+        device_id (int): The device the command targets.
+        active (bool): Whether the actuator should be active.
 
     Returns:
         dict: A dictionary containing the status or an error message.
@@ -177,49 +578,432 @@ def handle_client_request(actuator_name: str, value: float):
     
     try:
         # Send the command to the actuator
-        result = send_actuator_command(actuator_name, value)
+        result = await send_actuator_command(actuator_name, value, device_id, active)
         return {"status": result}
+    except CommandSuperseded as e:
+        # Another command to the same device arrived before this one was sent, and was sent instead
+        return {"status": "Superseded", "superseded_by": {"value": round(e.newer.value, 2), "active": e.newer.active}}
     except ValueError as e:
         return {"error": str(e)}
     except Exception as e:
         return {"error": f"Intern Error to process request. {e}"}
 
+def entity_tag(sequence: int, media_type: str) -> str:
+    """
+    Returns the ETag of a /sensors response (each media type has its own).
+    """
+    return f'"{sequence}.pb"' if media_type == PROTOBUF_TYPE else f'"{sequence}"'
+
+def sensor_headers(sequence: int, media_type: str) -> dict:
+    """
+    Returns the caching headers of a /sensors response.
+    """
+    return {"ETag": entity_tag(sequence, media_type), "X-Sequence": str(sequence), "Vary": "Accept"}
+
 @app.get("/sensors")
-def get_sensors():
+def get_sensors(request: Request, limit: int = RESPONSE_LIMIT, since: int = None):
     """
-    Returns the latest sensor data.
+    Returns the latest data of every registered device, or only what changed after a sequence number.
+    Responses are JSON, or a serialized SensorSnapshot if the Accept header asks for application/x-protobuf.
+    Every reading gets a sequence number when it is ingested. The response carries the registry's
+    sequence number in its ETag and X-Sequence headers: clients pass it back as "since" to get the
+    next delta, or as If-None-Match to get a 304 when nothing changed.
+
+    Parameters:
+        request (Request): The HTTP request (for the Accept and If-None-Match headers).
+        limit (int): Number of most recent readings returned per device.
+        since (int): If given, only the devices and readings newer than this sequence number are returned.
 
     Returns:
-        dict: A dictionary containing the latest data for each sensor.
+        Response: A JSON object mapping "<name>:<id>" to the device's unit, last update time, sequence number
+                  and latest readings (as "timestamps" and "values" columns), or the same as a SensorSnapshot.
+                  Delta responses also tell whether each device's history was cleared ("reset").
     """
-    return {
-            "temperature_sensor": list(temp_sensor),
-            "light_sensor": list(light_sensor),
-            "humidity_sensor": list(humd_sensor)
-    }
+    if limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive.")
+
+    media_type = negotiate(request.headers.get("accept"))
+    if request.headers.get("if-none-match") == entity_tag(registry.sequence, media_type):
+        return Response(status_code=304, headers=sensor_headers(registry.sequence, media_type))
+
+    # Readings ingested while the response is built are left for the next request
+    start = time.perf_counter()
+    sequence, body = registry.encode(limit, since, media_type)
+    sensors_encode_seconds.labels(media_type).observe(time.perf_counter() - start)
+    return Response(body, media_type=media_type, headers=sensor_headers(sequence, media_type))
+
+@app.get("/sensors/stream")
+async def stream_sensors(request: Request):
+    """
+    Pushes every new reading as a Server-Sent Event, as soon as the gateway receives it.
+    Dashboards fetch /sensors once, then apply the events of this stream, so the gateway's load grows
+    with the rate of readings instead of the number of polling viewers:
+        "connected": sent first, with the registry sequence number at subscription time.
+        "reading": a new reading of a device.
+        "stale" / "online": a device stopped reporting within its timeout, or reported again.
+        "actuator": a setpoint change pushed by an actuator.
+
+    Parameters:
+        request (Request): The HTTP request (used to detect disconnected clients).
+
+    Returns:
+        StreamingResponse: A text/event-stream response that stays open until the client disconnects.
+    """
+    async def events():
+        queue = broadcaster.subscribe()
+        try:
+            # Tell the client it is subscribed, so it can fetch what it missed with /sensors?since=
+            yield f"event: connected\ndata: {{\"seq\": {registry.sequence}}}\n\n".encode()
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+async def relay_shared_events():
+    """
+    Publishes the readings and stale/online changes the ingest process wrote to the shared registry
+    as stream events (in HTTP workers, which do not run ingest_status or the timeouts).
+    Checks the registry every STREAM_RELAY_PERIOD seconds while this worker has subscribers.
+    """
+    relayed = registry.sequence
+    while True:
+        await asyncio.sleep(STREAM_RELAY_PERIOD)
+        sequence = registry.sequence
+        if not len(broadcaster) or sequence == relayed:
+            relayed = sequence
+            continue
+        for device in registry.devices():
+            if not device.changed_since(relayed):
+                continue
+            data = device.to_dict(None, relayed, sequence)
+            if relayed < device.stale_seq <= sequence:
+                broadcaster.publish("stale" if data["stale"] else "online", {"key": device.key, "seq": device.stale_seq, "last_update": data["last_update"]})
+            for timestamp, value in zip(data["timestamps"], data["values"]):
+                broadcaster.publish("reading", {
+                    "key": device.key,
+                    "seq": data["seq"],
+                    "name": device.name,
+                    "id": device.device_id,
+                    "unit": device.unit,
+                    "timestamp": timestamp,
+                    "value": value,
+                })
+        relayed = sequence
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Returns the gateway's metrics in the Prometheus text format.
+
+    Returns:
+        Response: Counters of consumed messages and actuator errors, latency histograms
+                  (parsing, sensor-to-gateway lag, /sensors encoding, actuator calls) and buffer occupancy.
+    """
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/sensors/{name}/rollup")
+def get_sensor_rollup(name: str, window: str = "1m", start: float = None, end: float = None, device_id: int = None):
+    """
+    Returns the precomputed aggregates of a sensor over fixed windows, without reading raw samples.
+    Buckets are updated with every ingested reading, so long ranges cost one lookup per bucket.
+
+    Parameters:
+        name (str): The name of the sensor (e.g., "sensor_temperature").
+        window (str): The bucket width ("1m" or "1h").
+        start (float): Start of the range, in seconds since the epoch (default: the oldest kept bucket).
+        end (float): End of the range (default: now).
+        device_id (int): The device to return. Returns every device of the sensor if None.
+
+    Returns:
+        dict: A dictionary mapping "<name>:<id>" to the "start", "count", "min", "max" and "mean" columns
+              of each device's buckets, oldest first, and the window's bucket width ("resolution").
+    """
+    if window not in registry.rollup_windows:
+        raise HTTPException(status_code=400, detail=f"Unknown window '{window}'. Use one of {list(registry.rollup_windows)}.")
+    resolution, capacity = registry.rollup_windows[window]
+    end = time.time() if end is None else end
+    start = end - resolution * capacity if start is None else start
+    if start >= end:
+        raise HTTPException(status_code=400, detail="Invalid range.")
+
+    devices = registry.named(name) if device_id is None else [registry.get(name, device_id)]
+    rollups = {}
+    for device in devices:
+        if device is not None:
+            buckets = device.rollup(window, start, end)
+            rollups[device.key] = {
+                "resolution": resolution,
+                "start": buckets["start"].tolist(),
+                "count": buckets["count"].tolist(),
+                "min": np.round(buckets["min"], 2).tolist(),
+                "max": np.round(buckets["max"], 2).tolist(),
+                "mean": np.round(buckets["mean"], 2).tolist(),
+            }
+    if not rollups:
+        raise HTTPException(status_code=404, detail=f"No device for sensor '{name}'.")
+    return rollups
+
+@app.get("/sensors/{name}/history")
+def get_sensor_history(name: str, start: float = None, end: float = None, step: float = None, device_id: int = None):
+    """
+    Returns the stored readings of a sensor in a time range.
+
+    Parameters:
+        name (str): The name of the sensor (e.g., "sensor_temperature").
+        start (float): Start of the range, in seconds since the epoch (default: one hour before end).
+        end (float): End of the range (default: now).
+        step (float): If given, readings are averaged over buckets of this many seconds.
+        device_id (int): The device to return. Returns every device of the sensor if None.
+
+    Returns:
+        dict: A dictionary mapping "<name>:<id>" to the "timestamps" and "values" of each device.
+    """
+    if SHARED_STATE:
+        raise HTTPException(status_code=503, detail="History is only served by single-process gateways (--http-workers 1).")
+    if store is None:
+        raise HTTPException(status_code=503, detail="History storage is disabled.")
+    end = time.time() if end is None else end
+    start = end - 3600 if start is None else start
+    if start >= end or (step is not None and step <= 0):
+        raise HTTPException(status_code=400, detail="Invalid range or step.")
+
+    device_ids = store.device_ids(name) if device_id is None else [device_id]
+    history = {}
+    for current_id in device_ids:
+        result = store.query(name, current_id, start, end, step)
+        if result is not None:
+            timestamps, values = result
+            history[f"{name}:{current_id}"] = {
+                "timestamps": timestamps.tolist(),
+                "values": np.round(values.astype(np.float64), 2).tolist(),
+            }
+    if not history:
+        raise HTTPException(status_code=404, detail=f"No history for sensor '{name}'.")
+    return history
+
+class ControlSettings(BaseModel):
+    """
+    Settings of a control loop: the actuator it commands and its controller.
+    """
+    actuator: str
+    deviceId: int = None  # Defaults to the ID of the sensor device
+    mode: str = "pid"
+    setpoint: float
+    kp: float = PID_GAINS[0]
+    ki: float = PID_GAINS[1]
+    kd: float = PID_GAINS[2]
+    output_min: float = None
+    output_max: float = None
+    band: float = HYSTERESIS_BAND
+    reverse: bool = False
+
+def check_control_available():
+    """
+    Rejects control requests in HTTP workers: the loops run in the ingest process.
+    """
+    if SHARED_STATE:
+        raise HTTPException(status_code=503, detail="Control loops are only configurable in single-process gateways (--http-workers 1).")
+
+@app.get("/control")
+def get_control_loops():
+    """
+    Returns the control loops.
+
+    Returns:
+        dict: A dictionary mapping "<name>:<id>" to the loop's actuator, controller settings and state,
+              and the number and time of the commands it sent.
+    """
+    check_control_available()
+    return control.to_dict()
+
+@app.put("/control/{name}/{device_id}")
+def set_control_loop(name: str, device_id: int, settings: ControlSettings):
+    """
+    Creates or replaces the control loop of a sensor device. The loop runs on every reading of the device.
+
+    Parameters:
+        name (str): The name of the sensor (e.g., "sensor_temperature").
+        device_id (int): The ID of the device.
+        settings (ControlSettings): The actuator and controller ("pid" gains and output limits, or "hysteresis" band).
+
+    Returns:
+        dict: The loop.
+    """
+    check_control_available()
+    if settings.mode not in CONTROL_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{settings.mode}'. Use one of {list(CONTROL_MODES)}.")
+    if settings.actuator not in config.actuators:
+        raise HTTPException(status_code=400, detail=f"Actuator '{settings.actuator}' not found.")
+    if settings.mode == "pid":
+        controller = PIDController(settings.setpoint, settings.kp, settings.ki, settings.kd, settings.output_min, settings.output_max)
+    else:
+        controller = HysteresisController(settings.setpoint, settings.band, settings.reverse)
+    control_loop = ControlLoop(controller, settings.actuator, device_id if settings.deviceId is None else settings.deviceId)
+    control.set_loop(name, device_id, control_loop)
+    print(f"[GATEWAY] Controlling {name}:{device_id} with {settings.actuator} ({settings.mode}, setpoint {settings.setpoint})")
+    return control_loop.to_dict()
+
+@app.post("/control/{name}/{device_id}/setpoint")
+def set_control_setpoint(name: str, device_id: int, value: float):
+    """
+    Changes the setpoint of a control loop, keeping its state (e.g., the PID integral).
+
+    Parameters:
+        name (str): The name of the sensor.
+        device_id (int): The ID of the device.
+        value (float): The new setpoint.
+
+    Returns:
+        dict: The loop.
+    """
+    check_control_available()
+    control_loop = control.loops.get((name, device_id))
+    if control_loop is None:
+        raise HTTPException(status_code=404, detail=f"No control loop for {name}:{device_id}.")
+    control_loop.controller.setpoint = value
+    return control_loop.to_dict()
+
+@app.delete("/control/{name}/{device_id}")
+def delete_control_loop(name: str, device_id: int):
+    """
+    Stops the control loop of a sensor device.
+    """
+    check_control_available()
+    if not control.remove_loop(name, device_id):
+        raise HTTPException(status_code=404, detail=f"No control loop for {name}:{device_id}.")
+    return {"status": "Removed"}
+
+@app.get("/actuators/state")
+def get_actuator_states():
+    """
+    Handles a GET request for the latest state of the actuators, as pushed by their watchState streams.
+
+    Returns:
+        dict: A dictionary mapping "<sensor name>:<id>" to the actuator names, setpoint, active flag,
+              state version and time of the latest change.
+    """
+    return actuator_states
+
+@app.post("/actuators/batch")
+async def control_actuators(commands: list[ActuatorCommand], concurrency: int = BATCH_CONCURRENCY):
+    """
+    Handles a POST request with many actuator commands, sent concurrently.
+
+    Parameters:
+        commands (list): The commands (actuator, deviceId, value, active).
+        concurrency (int): Maximum number of commands in flight at the same time.
+
+    Returns:
+        dict: The result and duration of every command, in request order, and the total duration.
+    """
+    if concurrency <= 0:
+        raise HTTPException(status_code=400, detail="concurrency must be positive.")
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run(command: ActuatorCommand):
+        async with limit:
+            start = time.perf_counter()
+            response = await handle_client_request(command.actuator, command.value, command.deviceId, command.active)
+            return {
+                "actuator": command.actuator,
+                "deviceId": command.deviceId,
+                **response,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run(command) for command in commands))
+    return {"results": results, "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
 
 @app.post("/actuators/{actuator_name}")
-def control_actuator(actuator_name: str, value: float):
+async def control_actuator(actuator_name: str, value: float, device_id: int = 0, active: bool = True):
     """
     Handles a POST request to control an actuator.
 
     Parameters:
         actuator_name (str): The name of the actuator.
         value (float): The value to set on the actuator.
+        device_id (int): The device the command targets.
+        active (bool): Whether the actuator should be active.
 
     Returns:
         dict: A dictionary containing the status or an error message.
     """
-    response = handle_client_request(actuator_name, value)
+    response = await handle_client_request(actuator_name, value, device_id, active)
     if "error" in response:
         raise HTTPException(status_code=400, detail=response["error"])
     return response
 
 
 if __name__ == "__main__":
-    # Start threads for consuming sensor data and monitoring timeouts
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Run the greenhouse gateway.")
+    parser.add_argument("--config", default=CONFIG_PATH, help="JSON configuration file (queues, exchange, actuators)")
+    parser.add_argument("--history-hours", type=float, default=HISTORY_SECONDS / 3600, help="Hours of history kept per device")
+    parser.add_argument("--telemetry-port", type=int, default=TELEMETRY_PORT, help="Port of the gRPC telemetry server (0 disables it)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory of the on-disk history ('' disables it)")
+    parser.add_argument("--record", default='', help="Append every ingested reading to this length-delimited file (replay it with replay.py)")
+    parser.add_argument("--retention-days", type=float, default=RETENTION_SECONDS / 86400, help="Days of history kept on disk")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_SENSOR, help="Seconds without readings after which a device is stale")
+    parser.add_argument("--timeout-precision", type=float, default=TIMEOUT_LATENESS, help="Seconds a stale device may be detected late")
+    parser.add_argument("--prefetch", type=int, default=PREFETCH, help="Unacknowledged messages delivered to each consumer")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Threads parsing and storing messages")
+    parser.add_argument("--consumer-processes", type=int, default=CONSUMER_PROCESSES, help="Processes consuming RabbitMQ, sharing the queues")
+    parser.add_argument("--ingest-queue", type=int, default=INGEST_QUEUE, help="Messages buffered for the ingest workers")
+    parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default=OVERFLOW, help="What happens to a message when the ingest queue is full")
+    parser.add_argument("--sample-rate", type=int, default=SAMPLING, help="Messages of each sensor (routing key) kept while the sample policy sheds load (1 of N)")
+    parser.add_argument("--verbose", action="store_true", help="Print every received message")
+    parser.add_argument("--control-rate", type=float, default=CONTROL_RATE, help="Commands per second the control loops send to each actuator device (0: no limit)")
+    parser.add_argument("--watch-actuators", action="store_true", help="Follow the actuators' state over watchState streams (GET /actuators/state)")
+    parser.add_argument("--actuator-rate", type=float, default=ACTUATOR_RATE, help="Commands per second sent to each actuator device (0: no limit)")
+    parser.add_argument("--http-workers", type=int, default=HTTP_WORKERS, help="Processes serving the HTTP API, reading the registry from shared memory")
+    parser.add_argument("--max-devices", type=int, default=SHARED_DEVICES, help="Devices the shared memory registry has room for (with --http-workers)")
+    args = parser.parse_args()
+
+    CONFIG_PATH = args.config
+    TIMEOUT_SENSOR, TIMEOUT_LATENESS = args.timeout, args.timeout_precision
+    timeouts = DeadlineScheduler(TIMEOUT_SENSOR, expire_device, TIMEOUT_LATENESS)
+    TELEMETRY_PORT = args.telemetry_port
+    PREFETCH, WORKERS, CONSUMER_PROCESSES, VERBOSE = args.prefetch, args.workers, args.consumer_processes, args.verbose
+    HTTP_WORKERS, SHARED_DEVICES = args.http_workers, args.max_devices
+    INGEST_QUEUE, OVERFLOW, SAMPLING = args.ingest_queue, args.overflow, args.sample_rate
+    ACTUATOR_RATE, WATCH_ACTUATORS = args.actuator_rate, args.watch_actuators
+    command_queue = ActuatorCommandQueue(actuator_pool, ACTUATOR_RATE)
+    CONTROL_RATE = args.control_rate
+    control_queue = ActuatorCommandQueue(actuator_pool, CONTROL_RATE)
+    config = GatewayConfig.load(CONFIG_PATH, DEFAULT_CONFIG)
+    if HTTP_WORKERS > 1:
+        registry = SharedSensorRegistry.create(history_seconds=args.history_hours * 3600, max_devices=SHARED_DEVICES)
+    else:
+        registry = SensorRegistry(history_seconds=args.history_hours * 3600)
+    if args.data_dir:
+        store = TimeSeriesStore(args.data_dir, retention_seconds=args.retention_days * 86400)
+    if args.record:
+        recorder = RecordingWriter(args.record)
+        print(f"[GATEWAY] Recording readings to {args.record}")
+
+    # Start threads for consuming sensor data and detecting timeouts
     threading.Thread(target=consume_sensors).start()
-    threading.Thread(target=monitor_last_update).start()
-
-    # Start the FastAPI server
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    threading.Thread(target=timeouts.run, daemon=True).start()
+
+    if HTTP_WORKERS > 1:
+        # This process ingests; the workers import the gateway module and attach to the shared registry
+        os.environ["GATEWAY_SHARED_STATE"] = registry.name
+        os.environ["GATEWAY_CONFIG"] = CONFIG_PATH
+        os.environ["GATEWAY_ACTUATOR_RATE"] = str(ACTUATOR_RATE)
+        os.environ["GATEWAY_WATCH_ACTUATORS"] = "1" if WATCH_ACTUATORS else ""
+        if TELEMETRY_PORT:
+            threading.Thread(target=asyncio.run, args=(serve_telemetry(TELEMETRY_PORT),), daemon=True).start()
+        print(f"[GATEWAY] Serving the HTTP API with {HTTP_WORKERS} workers from shared memory {registry.name}")
+        try:
+            uvicorn.run("gateway:app", host="0.0.0.0", port=8001, workers=HTTP_WORKERS)
+        finally:
+            registry.unlink()
+    else:
+        # Start the FastAPI server
+        uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
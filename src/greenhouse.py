@@ -1,21 +1,38 @@
 import argparse
-import pika
+import asyncio
 import time
 import threading
 import random
 import grpc
 from concurrent import futures
 from proto import greenhouse_pb2, greenhouse_pb2_grpc
+from publisher import get_publisher, routing_key, BatchingPublisher, CONFIRM_MODES, SENSOR_EXCHANGE, FLOW_WAIT
 
 # RabbitMQ host address
 RABBITMQ_HOST = 'localhost'
 
+# Seconds between two random-walk updates of a sensor
+UPDATE_PERIOD = 5
+
+# Concurrent RPCs served by the grpc.aio actuator server (open watchState streams included)
+ACTUATOR_CONCURRENCY = 100
+
+# State changes buffered per watchState stream before the oldest ones are dropped
+WATCH_QUEUE_SIZE = 100
+
+# watchState streams the thread server serves at once, each on a worker thread of its own
+# (beyond the command workers, so an open stream never leaves setValue without a thread)
+WATCH_STREAMS = 1
+
+# Seconds a watchState stream of the thread server waits for a change before checking its client is still connected
+WATCH_POLL_PERIOD = 1.0
+
 class Sensor():
     """
     Represents a sensor in the greenhouse system.
     Simulates sensor behavior by updating its value randomly and publishing its status to a RabbitMQ queue.
     """
-    def __init__(self, id: int, name: str, value: float, unit: str) -> None:
+    def __init__(self, id: int, name: str, value: float, unit: str, noise: float = 0.5) -> None:
         """
         Initializes a sensor with an ID, name, initial value, and unit of measurement.
 
@@ -24,70 +41,176 @@ class Sensor():
             name (str): The name of the sensor (e.g., "sensor_temperature").
             value (float): The initial value of the sensor.
             unit (str): The unit of measurement for the sensor (e.g., "°C").
+            noise (float): Standard deviation of each random-walk step.
         """
         self.id = id
         self.name = name
         self.value = value
         self.unit = unit
+        self.noise = noise
+        self.lock = threading.Lock()  # Serializes the random walk and the actuator's setpoints
 
     def update_values(self):
         """
-        Continuously updates the sensor's value by adding a random normal variate (mean=0, standard deviation=0.5) every 5 seconds.
+        Continuously updates the sensor's value by adding a random normal variate (mean=0, standard deviation=noise) every 5 seconds.
         This simulates real-world sensor behavior.
         """
         while True:
-            self.value += random.normalvariate(0, 0.5)  # Add random noise to the value
+            self.step()
+            time.sleep(UPDATE_PERIOD)  # Wait before the next update
+
+    def step(self):
+        """
+        Advances the sensor's value by one random-walk step.
+        """
+        with self.lock:
+            self.value += random.normalvariate(0, self.noise)  # Add random noise to the value
             self.value = round(self.value, 2)  # Round to 2 decimal places
-            time.sleep(5)  # Wait 5 seconds before the next update
 
-    def publish_status(self, queue_name: str):
+    def set_value(self, value: float):
+        """
+        Sets the sensor's value, without racing a random-walk step that would overwrite it.
+
+        Parameters:
+            value (float): The new value.
+        """
+        with self.lock:
+            self.value = value
+
+    def publish_status(self, queue_name: str, interval: float = 2.0, publisher=None):
         """
-        Publishes the sensor's status to a RabbitMQ queue every 2 seconds.
+        Publishes the sensor's status to a RabbitMQ queue at a fixed interval.
+        All sensors of the process share one long-lived connection and channel.
+        While the broker blocks publishing (flow control), a reading waits for the publisher's flow_wait, then is skipped.
 
         Parameters:
             queue_name (str): The name of the RabbitMQ queue to publish the status to.
+            interval (float): Seconds between two publishes.
+            publisher (StatusPublisher): The publisher to use. Defaults to the process-wide publisher.
         """
+        publisher = publisher or get_publisher(RABBITMQ_HOST)
+
         while True:
             try:
-                # Connect to RabbitMQ
-                connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-                channel = connection.channel()
-                channel.queue_declare(queue=queue_name)  # Declare the queue
-
                 # Create a DeviceStatus message
                 status = greenhouse_pb2.DeviceStatus(
                     deviceId=self.id,
                     name=self.name,
                     value=self.value,
-                    unit=self.unit
+                    unit=self.unit,
+                    timestamp=time.time()
                 )
                 
                 # Publish the status to the queue
-                channel.basic_publish(exchange='', routing_key=queue_name, body=status.SerializeToString())
+                publisher.publish(queue_name, status.SerializeToString())
                 print(f"[{self.name}] Sent Status:\n{status}{queue_name=}\n\n")
 
-                # Close the connection
-                connection.close()
-                time.sleep(2)  # Wait 2 seconds before the next publish
-
             except Exception as e:
-                # Handle connection errors
-                print(f"Error to connect to RabbitMQ: {e}")
-                time.sleep(10)  # Wait 10 seconds before retrying
+                # Handle publish errors (the publisher already retried the connection)
+                print(f"Error to publish to RabbitMQ: {e}")
+
+            time.sleep(interval)  # Wait before the next publish
+
+    def stream_status(self, target: str, interval: float = 2.0, max_backoff: float = 30.0):
+        """
+        Streams the sensor's status straight to the gateway over one gRPC client stream, without a broker.
+        The stream is reopened with exponential backoff if the gateway goes away.
 
-class Actuator(greenhouse_pb2_grpc.ActuatorService):
+        Parameters:
+            target (str): The gateway's telemetry address ("host:port").
+            interval (float): Seconds between two readings.
+            max_backoff (float): Upper bound (in seconds) for the wait between reconnection attempts.
+        """
+        def readings():
+            while True:
+                # Create a DeviceStatus message
+                yield greenhouse_pb2.DeviceStatus(
+                    deviceId=self.id,
+                    name=self.name,
+                    value=self.value,
+                    unit=self.unit,
+                    timestamp=time.time()
+                )
+                time.sleep(interval)  # Wait before the next reading
+
+        backoff = 1.0
+        while True:
+            try:
+                with grpc.insecure_channel(target) as channel:
+                    grpc.channel_ready_future(channel).result(timeout=10)
+                    print(f"[{self.name}] Streaming status to {target}")
+                    backoff = 1.0
+                    stub = greenhouse_pb2_grpc.TelemetryServiceStub(channel)
+                    stub.streamStatus(readings())
+            except (grpc.RpcError, grpc.FutureTimeoutError) as e:
+                # Handle gateway connection errors
+                print(f"Error to stream to gateway: {e}. Retrying in {backoff:.0f}sec")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, max_backoff)
+
+class Actuator(greenhouse_pb2_grpc.ActuatorServiceServicer):
     """
     Represents an actuator in the greenhouse system.
-    Implements the gRPC service to receive commands and update the sensor's value.
+    Implements the gRPC service to receive commands and update the sensor's value,
+    and streams its state (the latest setpoint) to watchers, so clients do not need to poll it.
     """
-    def __init__(self, sensor):
+    def __init__(self, sensor, max_watchers: int = None):
         """
         Initializes the actuator with a sensor.
 
         Parameters:
             sensor (Sensor): The sensor associated with this actuator.
+            max_watchers (int): watchState streams open at once (further ones are rejected), None for no limit.
         """
         self.sensor = sensor
+        self.setpoint = sensor.value  # Latest commanded value
+        self.active = True
+        self.version = 0  # Setpoints applied
+        self.changed = threading.Condition()  # Guards the state, notified on every setpoint
+        self.max_watchers = max_watchers
+        self.watching = 0  # Open watchState streams
+
+    def state(self):
+        """
+        Returns the actuator's state (call with self.changed held for a consistent snapshot).
+
+        Returns:
+            greenhouse_pb2.ActuatorState: The latest setpoint, whether the actuator is active, and the state version.
+        """
+        return greenhouse_pb2.ActuatorState(
+            name=self.sensor.name,
+            deviceId=self.sensor.id,
+            value=self.setpoint,
+            active=self.active,
+            version=self.version,
+            timestamp=time.time()
+        )
+
+    def apply(self, request):
+        """
+        Applies a command atomically: the sensor's value, the setpoint, the active flag and the version
+        change together, and no random-walk step can overwrite the new value.
+
+        Parameters:
+            request (greenhouse_pb2.ActuatorRequest): The command.
+
+        Returns:
+            greenhouse_pb2.ActuatorState: The new state.
+        """
+        with self.changed:
+            self.sensor.set_value(request.value)  # Update the sensor's value
+            self.setpoint = request.value
+            self.active = request.active
+            self.version += 1
+            state = self.state()
+            self.changed.notify_all()
+        return state
+
+    def check_device(self, device_id: int) -> bool:
+        """
+        Returns True if a request's deviceId targets this actuator (0 targets it too).
+        """
+        return device_id in (0, self.sensor.id)
 
     def setValue(self, request, context):
         """
@@ -101,20 +224,120 @@ class Actuator(greenhouse_pb2_grpc.ActuatorService):
             greenhouse_pb2.ActuatorResponse: A response indicating success or failure.
         """
         print(f"[{self.sensor.name}] Received command: Set value to {request.value} {self.sensor.unit}")
-        self.sensor.value = request.value  # Update the sensor's value
+        self.apply(request)
         return greenhouse_pb2.ActuatorResponse(success="Success")  # Return success response
-    
-def run_actuator_server(actuator, port: int):
+
+    def watchState(self, request, context):
+        """
+        Streams the actuator's state via gRPC: the current state, then every change.
+        A watcher slower than the changes receives the latest state (the version tells it how many it skipped).
+        Each open stream holds one worker thread of the server, so streams beyond max_watchers are rejected
+        with RESOURCE_EXHAUSTED instead of taking the threads of the commands.
+
+        Parameters:
+            request (greenhouse_pb2.WatchStateRequest): The device to watch (0 for this actuator's device).
+            context: gRPC context.
+
+        Yields:
+            greenhouse_pb2.ActuatorState: The state after each change.
+        """
+        if not self.check_device(request.deviceId):
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Device {request.deviceId} not found.")
+        with self.changed:
+            full = self.max_watchers is not None and self.watching >= self.max_watchers
+            if not full:
+                self.watching += 1
+        if full:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"{self.max_watchers} watchState streams already open.")
+        try:
+            version = None
+            while context.is_active():
+                with self.changed:
+                    if self.version == version:
+                        self.changed.wait(WATCH_POLL_PERIOD)
+                    if self.version == version:
+                        continue
+                    state = self.state()
+                    version = self.version
+                yield state
+        finally:
+            with self.changed:
+                self.watching -= 1
+
+class AsyncActuator(Actuator):
+    """
+    Actuator served by the grpc.aio server: commands and watchState streams run as tasks of one event loop,
+    so slow clients and open streams do not hold threads, and a change is pushed to every watcher's queue.
+    """
+    def __init__(self, sensor, queue_size: int = WATCH_QUEUE_SIZE):
+        """
+        Initializes the actuator with a sensor.
+
+        Parameters:
+            sensor (Sensor): The sensor associated with this actuator.
+            queue_size (int): State changes buffered per watcher.
+        """
+        super().__init__(sensor)
+        self.queue_size = queue_size
+        self.watchers = set()
+
+    async def setValue(self, request, context):
+        """
+        Receives a command to set the sensor's value via gRPC, and pushes the new state to the watchers.
+
+        Parameters:
+            request (greenhouse_pb2.ActuatorRequest): The request containing the new value.
+            context: gRPC context.
+
+        Returns:
+            greenhouse_pb2.ActuatorResponse: A response indicating success or failure.
+        """
+        print(f"[{self.sensor.name}] Received command: Set value to {request.value} {self.sensor.unit}")
+        state = self.apply(request)
+        for queue in self.watchers:
+            if queue.full():
+                queue.get_nowait()  # Drop the oldest change of a slow watcher
+            queue.put_nowait(state)
+        return greenhouse_pb2.ActuatorResponse(success="Success")
+
+    async def watchState(self, request, context):
+        """
+        Streams the actuator's state via gRPC: the current state, then every change.
+        A watcher that falls queue_size changes behind loses the oldest ones (see the version).
+
+        Parameters:
+            request (greenhouse_pb2.WatchStateRequest): The device to watch (0 for this actuator's device).
+            context: gRPC context.
+
+        Yields:
+            greenhouse_pb2.ActuatorState: The state after each change.
+        """
+        if not self.check_device(request.deviceId):
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Device {request.deviceId} not found.")
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self.changed:
+            queue.put_nowait(self.state())
+        self.watchers.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.watchers.discard(queue)
+
+def run_actuator_server(actuator, port: int, workers: int = 1, watch_streams: int = WATCH_STREAMS):
     """
     Starts a gRPC server for the actuator.
 
     Parameters:
         actuator (Actuator): The actuator to be served.
         port (int): The port on which the gRPC server will listen.
+        workers (int): Threads serving the commands.
+        watch_streams (int): watchState streams served at once, each on an extra thread (0 rejects every stream).
     """
     try:
-        # Create a gRPC server
-        server = grpc.server(futures.ThreadPoolExecutor(max_workers=1))
+        # Create a gRPC server, with a thread of its own for each watchState stream
+        actuator.max_watchers = watch_streams
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers + watch_streams))
         # Add the actuator service to the server
         greenhouse_pb2_grpc.add_ActuatorServiceServicer_to_server(actuator, server)
         # Bind the server to the specified port
@@ -128,6 +351,38 @@ def run_actuator_server(actuator, port: int):
         # Handle server errors
         print(f"Error starting gRPC server: {e}")
 
+async def serve_actuator_async(actuator, port: int, concurrency: int = ACTUATOR_CONCURRENCY):
+    """
+    Serves the actuator from a grpc.aio server in the current event loop, until the server stops.
+
+    Parameters:
+        actuator (AsyncActuator): The actuator to be served.
+        port (int): The port on which the gRPC server will listen.
+        concurrency (int): Maximum RPCs in progress (open watchState streams included); further RPCs are
+                           rejected with RESOURCE_EXHAUSTED.
+    """
+    server = grpc.aio.server(maximum_concurrent_rpcs=concurrency)
+    greenhouse_pb2_grpc.add_ActuatorServiceServicer_to_server(actuator, server)
+    server.add_insecure_port(f"[::]:{port}")
+    await server.start()
+    print(f"[{actuator.sensor.name}] Actuator gRPC Server (aio) running on port {port}")
+    await server.wait_for_termination()
+
+def run_async_actuator_server(actuator, port: int, concurrency: int = ACTUATOR_CONCURRENCY):
+    """
+    Runs the grpc.aio actuator server in its own event loop (target of the actuator server thread).
+
+    Parameters:
+        actuator (AsyncActuator): The actuator to be served.
+        port (int): The port on which the gRPC server will listen.
+        concurrency (int): Maximum RPCs in progress.
+    """
+    try:
+        asyncio.run(serve_actuator_async(actuator, port, concurrency))
+    except Exception as e:
+        # Handle server errors
+        print(f"Error starting gRPC server: {e}")
+
 if __name__ == "__main__":
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description="Create a greenhouse feature.")
@@ -136,18 +391,39 @@ if __name__ == "__main__":
     parser.add_argument("sensor_value", type=float, help="Initial Sensor Value")
     parser.add_argument("sensor_unit", type=str, help="Unit of measurement")
     parser.add_argument("actuator_port", type=int, help="Port for Actuator gRPC")
+    parser.add_argument("--transport", choices=["rabbitmq", "grpc"], default="rabbitmq", help="Send readings through RabbitMQ or stream them to the gateway over gRPC")
+    parser.add_argument("--gateway", default="localhost:50050", help="Gateway telemetry address (gRPC transport)")
+    parser.add_argument("--publish-interval", type=float, default=2.0, help="Seconds between status publishes")
+    parser.add_argument("--confirms", choices=CONFIRM_MODES, default="off", help="RabbitMQ publisher confirm mode")
+    parser.add_argument("--batch-size", type=int, default=1, help="Readings per RabbitMQ message (DeviceStatusBatch if > 1)")
+    parser.add_argument("--flow-wait", type=float, default=FLOW_WAIT, help="Seconds a reading waits while RabbitMQ blocks publishing before it is skipped")
+    parser.add_argument("--linger", type=float, default=1.0, help="Maximum seconds a reading waits for its batch")
+    parser.add_argument("--actuator-server", choices=["thread", "aio"], default="thread", help="Serve the actuator from a thread-pool gRPC server or a grpc.aio server")
+    parser.add_argument("--concurrency", type=int, help=f"Actuator worker threads (thread server, default 1) or concurrent RPCs (aio server, default {ACTUATOR_CONCURRENCY})")
+    parser.add_argument("--watch-streams", type=int, default=WATCH_STREAMS, help="watchState streams the thread server serves at once, on threads of their own")
+    parser.add_argument("--exchange", nargs="?", const=SENSOR_EXCHANGE, default='', help=f"Publish to a topic exchange (default {SENSOR_EXCHANGE}) instead of the feature queue")
     args = parser.parse_args()
 
     # Create the sensor and actuator
     feature_name = f"sensor_{args.feature.lower()}"
     
     sensor = Sensor(id=args.sensor_id, name=feature_name, value=args.sensor_value, unit=args.sensor_unit)
-    actuator = Actuator(sensor)
+    actuator = AsyncActuator(sensor) if args.actuator_server == "aio" else Actuator(sensor)
 
     # Start threads for sensor updates, status publishing, and gRPC server
     threading.Thread(target=sensor.update_values, daemon=True).start()  # Update sensor values
-    threading.Thread(target=sensor.publish_status, args=(f"queue_{feature_name}",), daemon=True).start()  # Publish status to RabbitMQ
-    threading.Thread(target=run_actuator_server, args=(actuator, args.actuator_port), daemon=True).start()  # Start gRPC server
+    if args.transport == "grpc":
+        threading.Thread(target=sensor.stream_status, args=(args.gateway, args.publish_interval), daemon=True).start()  # Stream status to the gateway
+    else:
+        publisher = get_publisher(RABBITMQ_HOST, confirms=args.confirms, exchange=args.exchange, flow_wait=args.flow_wait)
+        if args.batch_size > 1:
+            publisher = BatchingPublisher(publisher, max_batch=args.batch_size, linger=args.linger)
+        queue_name = routing_key(feature_name, args.sensor_id, args.exchange)
+        threading.Thread(target=sensor.publish_status, args=(queue_name, args.publish_interval, publisher), daemon=True).start()  # Publish status to RabbitMQ
+    if args.actuator_server == "aio":
+        threading.Thread(target=run_async_actuator_server, args=(actuator, args.actuator_port, args.concurrency or ACTUATOR_CONCURRENCY), daemon=True).start()  # Start gRPC server
+    else:
+        threading.Thread(target=run_actuator_server, args=(actuator, args.actuator_port, args.concurrency or 1, args.watch_streams), daemon=True).start()  # Start gRPC server
 
     # Keep the main program running
     while True:
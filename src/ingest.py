@@ -0,0 +1,489 @@
+import multiprocessing
+import queue
+import threading
+import time
+import zlib
+from typing import NamedTuple
+from metrics import ThreadShards
+from proto import greenhouse_pb2
+from publisher import BATCH_TYPE
+from transport import open_connection
+
+# Unacknowledged messages the broker may deliver to one consumer
+PREFETCH_COUNT = 500
+
+# Parse/store worker threads
+INGEST_WORKERS = 4
+
+# What the consumer does with a message when the ingest queue of its worker is full
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest", "sample")
+
+# Messages buffered between the consumer thread and the ingest workers (split evenly across the workers).
+# Keep it below the prefetch count: the drop and sample policies only shed load once a queue fills up.
+INGEST_QUEUE_SIZE = 200
+
+# The "sample" policy keeps one of every SAMPLE_RATE messages of each routing key while a queue is over its watermark
+SAMPLE_RATE = 10
+
+# Fill ratio of a worker's queue above which the "sample" policy starts sampling
+SAMPLE_WATERMARK = 0.5
+
+# Number of contiguous stored messages acknowledged with one basic_ack
+ACK_BATCH = 100
+
+# Maximum seconds a stored message waits for its acknowledgement
+ACK_INTERVAL = 0.5
+
+# Seconds between two throughput reports
+REPORT_PERIOD = 10
+
+# Queue shared by the consumer processes to receive the topic exchange's "sensor.#" messages
+SHARED_QUEUE = "gateway.sensors"
+
+class Reading(NamedTuple):
+    """
+    A parsed reading, with the fields of DeviceStatus, sent between processes.
+    """
+    deviceId: int
+    name: str
+    value: float
+    unit: str
+    timestamp: float
+
+def parse_message(properties, body: bytes):
+    """
+    Parses a RabbitMQ message body into readings.
+
+    Parameters:
+        properties: The message properties (a DeviceStatusBatch if their type is BATCH_TYPE).
+        body (bytes): The serialized DeviceStatus or DeviceStatusBatch.
+
+    Returns:
+        list: The greenhouse_pb2.DeviceStatus readings of the message.
+    """
+    if properties.type == BATCH_TYPE:
+        batch = greenhouse_pb2.DeviceStatusBatch()
+        batch.ParseFromString(body)
+        return list(batch.readings)
+    status = greenhouse_pb2.DeviceStatus()
+    status.ParseFromString(body)
+    return [status]
+
+class AckTracker():
+    """
+    Tracks the delivery tags of one channel that were fully processed, possibly out of order,
+    and exposes the highest tag below which every message is done (the watermark).
+    """
+    def __init__(self) -> None:
+        self.watermark = 0  # Delivery tags start at 1 on a new channel
+        self._done = set()
+        self._lock = threading.Lock()
+
+    def done(self, tag: int) -> int:
+        """
+        Marks a delivery tag as processed.
+
+        Returns:
+            int: The new watermark.
+        """
+        with self._lock:
+            if tag != self.watermark + 1:
+                self._done.add(tag)
+                return self.watermark
+            self.watermark = tag
+            while self.watermark + 1 in self._done:
+                self.watermark += 1
+                self._done.remove(self.watermark)
+            return self.watermark
+
+class BatchedAcker():
+    """
+    Acknowledges processed messages in batches: one basic_ack(multiple=True) covers every message up to the watermark.
+    Messages are only acknowledged once processed, so the broker redelivers them if the gateway crashes before.
+    Acknowledgements are sent from the connection's thread, as pika requires.
+    """
+    def __init__(self, connection, channel, batch: int = ACK_BATCH, interval: float = ACK_INTERVAL) -> None:
+        """
+        Initializes the acknowledgements of one channel.
+
+        Parameters:
+            connection (pika.BlockingConnection): The connection of the channel.
+            channel: The channel the messages were delivered on.
+            batch (int): Number of processed messages that triggers an acknowledgement.
+            interval (float): Maximum seconds between a message being processed and acknowledged.
+        """
+        self.connection = connection
+        self.channel = channel
+        self.batch = batch
+        self.interval = interval
+        self.acked = 0
+        self._tracker = AckTracker()
+        self._flush_pending = False
+
+    def start(self):
+        """
+        Starts the periodic flush (call from the connection's thread).
+        """
+        self.connection.call_later(self.interval, self._tick)
+
+    def complete(self, tag: int):
+        """
+        Marks a message as processed. Safe to call from any thread.
+        """
+        watermark = self._tracker.done(tag)
+        if watermark - self.acked >= self.batch and not self._flush_pending:
+            self._flush_pending = True
+            self.connection.add_callback_threadsafe(self.flush)
+
+    def flush(self):
+        """
+        Acknowledges every message up to the watermark (runs on the connection's thread).
+        """
+        self._flush_pending = False
+        watermark = self._tracker.watermark
+        if watermark > self.acked:
+            self.channel.basic_ack(delivery_tag=watermark, multiple=True)
+            self.acked = watermark
+
+    def _tick(self):
+        self.flush()
+        self.connection.call_later(self.interval, self._tick)
+
+class IngestQueue():
+    """
+    Bounded hand-off queue between the consumer thread and one ingest worker, with an overflow policy:
+    "block" keeps queuing past the capacity without acknowledging, so the broker stops delivering once the
+    prefetch count of messages is unacknowledged (the backlog stays in the broker), "drop_newest" rejects the
+    incoming message, and "drop_oldest" and "sample" evict the oldest queued message (the pipeline samples before that),
+    so memory and queueing delay stay bounded whatever the burst. The consumer thread never waits here: it must keep
+    serving the connection (heartbeats, acknowledgements). Only the consumer thread puts, so checking the size before
+    putting is enough to respect the capacity, and the common case costs one size check over the unbounded queue.
+    """
+    def __init__(self, capacity: int, policy: str = "block") -> None:
+        """
+        Initializes an empty queue.
+
+        Parameters:
+            capacity (int): Messages the queue holds.
+            policy (str): The overflow policy (one of OVERFLOW_POLICIES).
+
+        Raises:
+            ValueError: If the policy is unknown.
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}'.")
+        self.capacity = max(1, capacity)
+        self.policy = policy
+        self._queue = queue.SimpleQueue()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def put(self, item):
+        """
+        Adds an item, applying the overflow policy if the queue is full (call from one thread only).
+
+        Returns:
+            The item dropped to respect the capacity (the incoming one or the oldest), or None.
+        """
+        dropped = None
+        if self._queue.qsize() >= self.capacity and self.policy != "block":
+            if self.policy == "drop_newest":
+                return item
+            else:
+                try:
+                    dropped = self._queue.get_nowait()
+                except queue.Empty:
+                    pass  # The worker took it meanwhile
+        self._queue.put(item)
+        return dropped
+
+    def get(self):
+        """
+        Removes and returns the oldest item, waiting for one if the queue is empty.
+        """
+        return self._queue.get()
+
+    def sampling(self) -> bool:
+        """
+        Tells whether incoming messages should be sampled ("sample" policy above its watermark).
+        """
+        return self.policy == "sample" and self._queue.qsize() >= self.capacity * SAMPLE_WATERMARK
+
+class MessageSampler():
+    """
+    Keeps one of every `rate` messages of each routing key, so that under overload every sensor still reports,
+    at a lower rate, instead of the busiest ones crowding out the others. On the topic exchange a routing key
+    is one sensor ("sensor.<name>.<id>"); on the per-feature queues, it is the queue.
+    """
+    def __init__(self, rate: int = SAMPLE_RATE) -> None:
+        """
+        Parameters:
+            rate (int): One message of every `rate` is kept.
+        """
+        self.rate = max(1, rate)
+        self.skipped = 0  # Messages not stored
+        self._counts = {}  # Routing key -> messages seen while sampling
+
+    def keep(self, key: str) -> bool:
+        """
+        Tells whether a message should be stored (call from one thread only).
+        """
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.rate == 0:
+            return True
+        self.skipped += 1
+        return False
+
+class IngestPipeline():
+    """
+    Moves parsing and storage out of the pika callback: the consumer thread only hands each message
+    to one of N worker threads, and acknowledges it in a batch once stored.
+    Messages are assigned to workers by routing key, so the readings of a device are stored in order.
+    The hand-off queues are bounded (queue_size messages in all) and apply the overflow policy when full.
+    Messages are acknowledged only once stored or dropped, so the broker never has more than the prefetch
+    count of messages in flight per consumer (which bounds the "block" policy's queues).
+    The counters are sharded per thread, as the workers and the consumer thread update them at the same time.
+    """
+    def __init__(self, handler, workers: int = INGEST_WORKERS, ack_batch: int = ACK_BATCH, ack_interval: float = ACK_INTERVAL,
+                 queue_size: int = INGEST_QUEUE_SIZE, policy: str = "block", sample_rate: int = SAMPLE_RATE) -> None:
+        """
+        Initializes the pipeline.
+
+        Parameters:
+            handler: Called as handler(routing_key, properties, body) by the workers to parse and store a message.
+                     Returns the number of readings stored.
+            workers (int): Number of worker threads.
+            ack_batch (int): Number of stored messages acknowledged at once.
+            ack_interval (float): Maximum seconds a stored message waits for its acknowledgement.
+            queue_size (int): Messages buffered for the workers, split evenly across them.
+            policy (str): The overflow policy of the queues (one of OVERFLOW_POLICIES).
+            sample_rate (int): One message of every sample_rate is stored per routing key while sampling.
+
+        Raises:
+            ValueError: If the policy is unknown.
+        """
+        self.handler = handler
+        self.ack_batch = ack_batch
+        self.ack_interval = ack_interval
+        self.policy = policy
+        self._counts = ThreadShards(4)  # Messages processed, readings stored, failed and dropped messages, per thread
+        self.sampler = MessageSampler(sample_rate)
+        self._queues = [IngestQueue(queue_size // workers, policy) for _ in range(workers)]
+        self._acker = None
+
+    @property
+    def messages(self) -> int:
+        """
+        Returns the number of messages processed.
+        """
+        return self._counts.total()[0]
+
+    @property
+    def readings(self) -> int:
+        """
+        Returns the number of readings stored.
+        """
+        return self._counts.total()[1]
+
+    @property
+    def failed(self) -> int:
+        """
+        Returns the number of messages that could not be parsed or stored (acknowledged anyway, not retried).
+        """
+        return self._counts.total()[2]
+
+    @property
+    def dropped(self) -> int:
+        """
+        Returns the number of messages dropped by the overflow policy (acknowledged, not stored).
+        """
+        return self._counts.total()[3]
+
+    def attach(self, connection, channel):
+        """
+        Binds the pipeline to the channel it consumes from (delivery tags and acknowledgements are per channel).
+        """
+        self._acker = BatchedAcker(connection, channel, self.ack_batch, self.ack_interval)
+
+    def start(self):
+        """
+        Starts the worker threads and the periodic acknowledgements (call from the connection's thread).
+        """
+        for work_queue in self._queues:
+            threading.Thread(target=self._work, args=(work_queue,), daemon=True).start()
+        self._acker.start()
+
+    def on_message(self, ch, method, properties, body):
+        """
+        pika callback: hands the message to its worker.
+        """
+        work_queue = self._queues[zlib.crc32(method.routing_key.encode()) % len(self._queues)]
+        if work_queue.sampling() and not self.sampler.keep(method.routing_key):
+            self.complete(method.delivery_tag)
+            return
+        dropped = work_queue.put((method.delivery_tag, method.routing_key, properties, body))
+        if dropped is not None:
+            self._counts.get()[3] += 1
+            self.complete(dropped[0])
+
+    def depth(self) -> int:
+        """
+        Returns the number of messages waiting for a worker.
+        """
+        return sum(work_queue.qsize() for work_queue in self._queues)
+
+    def complete(self, tag: int):
+        """
+        Marks a message as stored, so it is acknowledged with the next batch.
+        """
+        self._acker.complete(tag)
+
+    def _work(self, work_queue: IngestQueue):
+        counts = self._counts.get()  # This worker's counters
+        while True:
+            tag, routing_key, properties, body = work_queue.get()
+            try:
+                counts[1] += self.handler(routing_key, properties, body)
+            except Exception as e:
+                # A message that cannot be parsed or stored is dropped, as it would fail again if redelivered
+                print(f"Error to ingest message from {routing_key}: {e}")
+                counts[2] += 1
+            counts[0] += 1
+            self.complete(tag)
+
+    def report(self, label: str = "[GATEWAY]"):
+        """
+        Prints the throughput periodically (runs in its own thread).
+        """
+        last_count, last_time = self.messages, time.perf_counter()
+        while True:
+            time.sleep(REPORT_PERIOD)
+            now = time.perf_counter()
+            rate = (self.messages - last_count) / (now - last_time)
+            print(
+                f"{label} Ingested {rate:.0f} msg/s, {self.readings} readings, {self.depth()} queued, {self.failed} failed, "
+                f"{self.dropped} dropped, {self.sampler.skipped} sampled out"
+            )
+            last_count, last_time = self.messages, now
+
+def shard_queues(queues, count: int):
+    """
+    Splits named queues across consumer processes.
+
+    Returns:
+        list: One list of queues per process.
+    """
+    return [list(queues[index::count]) for index in range(count)]
+
+def consume_shard(index: int, host: str, queues, exchange: str, prefetch: int, forward, confirmations):
+    """
+    Runs in a consumer process: consumes a shard of the queues (and the shared exchange queue),
+    parses every message and forwards its readings to the gateway process.
+    A message is acknowledged once the gateway process confirms its readings were stored.
+
+    Parameters:
+        index (int): The index of the process.
+        host (str): The RabbitMQ host.
+        queues (list): The named queues of this shard.
+        exchange (str): Topic exchange consumed through SHARED_QUEUE by every process ('' to skip it).
+        prefetch (int): Unacknowledged messages the broker may deliver to this process.
+        forward (multiprocessing.Queue): Receives (index, delivery tag, routing key, readings) tuples.
+        confirmations (multiprocessing.Queue): Receives lists of stored delivery tags from the gateway process.
+    """
+    connection = open_connection(host)
+    channel = connection.channel()
+    channel.basic_qos(prefetch_count=prefetch)
+    acker = BatchedAcker(connection, channel)
+
+    def callback(ch, method, properties, body):
+        try:
+            readings = [
+                Reading(status.deviceId, status.name, status.value, status.unit, status.timestamp)
+                for status in parse_message(properties, body)
+            ]
+        except Exception as e:
+            print(f"Error parsing message: {e}")
+            acker.complete(method.delivery_tag)
+            return
+        forward.put((index, method.delivery_tag, method.routing_key, readings))
+
+    def confirm():
+        while True:
+            for tag in confirmations.get():
+                acker.complete(tag)
+
+    for name in queues:
+        channel.queue_declare(queue=name, durable=False)
+        channel.basic_consume(queue=name, on_message_callback=callback)
+    if exchange:
+        channel.exchange_declare(exchange=exchange, exchange_type="topic")
+        channel.queue_declare(queue=SHARED_QUEUE, durable=False)
+        channel.queue_bind(exchange=exchange, queue=SHARED_QUEUE, routing_key="sensor.#")
+        channel.basic_consume(queue=SHARED_QUEUE, on_message_callback=callback)
+
+    threading.Thread(target=confirm, daemon=True).start()
+    acker.start()
+    print(f"[GATEWAY] Consumer process {index} listening on {queues + ([SHARED_QUEUE] if exchange else [])}")
+    channel.start_consuming()
+
+class ShardedConsumers():
+    """
+    Consumes the sensor queues from several processes, so AMQP framing and protobuf parsing run in parallel.
+    The gateway process stores the forwarded readings and confirms them back, and only then are they acknowledged.
+    """
+    def __init__(self, ingest, processes: int, host: str, queues, exchange: str, prefetch: int = PREFETCH_COUNT) -> None:
+        """
+        Initializes the consumers.
+
+        Parameters:
+            ingest: Called as ingest(reading, source) to store each reading in the gateway process.
+            processes (int): Number of consumer processes.
+            host (str): The RabbitMQ host.
+            queues (list): The named queues, split across the processes.
+            exchange (str): Topic exchange consumed by every process through SHARED_QUEUE ('' to skip it).
+            prefetch (int): Unacknowledged messages per process.
+        """
+        self.ingest = ingest
+        self.messages = 0
+        # Processes are spawned rather than forked, as the gateway process runs other threads
+        context = multiprocessing.get_context("spawn")
+        self._forward = context.Queue(maxsize=processes * prefetch)
+        self._confirmations = [context.Queue() for _ in range(processes)]
+        self._processes = [
+            context.Process(
+                target=consume_shard,
+                args=(index, host, shard, exchange, prefetch, self._forward, self._confirmations[index]),
+                daemon=True,
+            )
+            for index, shard in enumerate(shard_queues(queues, processes))
+        ]
+
+    def run(self, batch: int = ACK_BATCH):
+        """
+        Starts the consumer processes, then stores forwarded readings and confirms them (blocks forever).
+        Forwarded messages are stored in batches of up to `batch`, with one confirmation per process and batch.
+        """
+        for process in self._processes:
+            process.start()
+        while True:
+            items = [self._forward.get()]
+            while len(items) < batch:
+                try:
+                    items.append(self._forward.get_nowait())
+                except queue.Empty:
+                    break
+
+            stored = {}
+            for index, tag, routing_key, readings in items:
+                for reading in readings:
+                    try:
+                        self.ingest(reading, routing_key)
+                    except Exception as e:
+                        # Confirmed anyway, as it would fail again if redelivered
+                        print(f"Error to store reading from {routing_key}: {e}")
+                stored.setdefault(index, []).append(tag)
+            self.messages += len(items)
+            for index, tags in stored.items():
+                self._confirmations[index].put(tags)
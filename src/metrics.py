@@ -0,0 +1,260 @@
+import abc
+import bisect
+import threading
+
+# Upper bounds (seconds) of the latency histogram buckets, from 1 µs to 10 s
+LATENCY_BUCKETS = (
+    0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+# Upper bounds (seconds) of the sensor-to-gateway lag histogram buckets
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Media type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class ThreadShards():
+    """
+    Gives every thread its own list of numbers, so hot paths update metrics without locks or contention.
+    Readers add up the lists of every thread; a list outlives its thread, so totals never go down.
+    """
+    def __init__(self, size: int) -> None:
+        """
+        Initializes the shards.
+
+        Parameters:
+            size (int): Number of values in each thread's list.
+        """
+        self.size = size
+        self.local = threading.local()  # The calling thread's list, as local.values
+        self._shards = []
+        self._lock = threading.Lock()  # Only taken the first time a thread updates the metric
+
+    def get(self) -> list:
+        """
+        Returns the calling thread's list.
+        """
+        try:
+            return self.local.values
+        except AttributeError:
+            values = self.local.values = [0] * self.size
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def total(self) -> list:
+        """
+        Returns the element-wise sum of every thread's list.
+        """
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(values) for values in zip(*shards)] if shards else [0] * self.size
+
+class Metric(abc.ABC):
+    """
+    Base of the metrics: a name, a help text, and optionally one label with one child metric per label value.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label: str = None) -> None:
+        """
+        Initializes the metric.
+
+        Parameters:
+            name (str): The metric name (e.g., "gateway_messages_total").
+            documentation (str): The help text.
+            label (str): Name of the label telling the children apart (None for an unlabeled metric).
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, value: str) -> "Metric":
+        """
+        Returns the child metric of a label value, created on first use by the subclass' _child()
+        (counters and histograms; a gauge's label values come from its collect function).
+        Callers on hot paths can keep the child instead of looking it up each time.
+        """
+        child = self._children.get(value)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(value, self._child())
+        return child
+
+    def samples(self):
+        """
+        Returns the metric's samples as (suffix, labels, value) tuples, for every label value.
+        """
+        if self.label is None:
+            return self._samples({})
+        samples = []
+        for value, child in sorted(self._children.items()):
+            samples.extend(child._samples({self.label: value}))
+        return samples
+
+    @abc.abstractmethod
+    def _samples(self, labels: dict):
+        """
+        Returns this metric's samples as (suffix, labels, value) tuples, with the given labels.
+        """
+
+class Counter(Metric):
+    """
+    A monotonically increasing count, sharded per thread.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label: str = None) -> None:
+        super().__init__(name, documentation, label)
+        self._shards = ThreadShards(1)
+        self._local = self._shards.local  # Read directly on the hot path, saving a method call
+
+    def _child(self) -> "Counter":
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1):
+        """
+        Adds to the count (lock-free: only touches the calling thread's shard).
+        """
+        try:
+            self._local.values[0] += amount
+        except AttributeError:
+            self._shards.get()[0] += amount
+
+    def value(self) -> float:
+        """
+        Returns the count over every thread.
+        """
+        return self._shards.total()[0]
+
+    def _samples(self, labels: dict):
+        return [("", labels, self.value())]
+
+class Histogram(Metric):
+    """
+    Counts observations in fixed buckets, preallocated per thread: an observation is one binary search
+    over the bucket bounds and two additions, without allocation or locking.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label: str = None, buckets=LATENCY_BUCKETS) -> None:
+        """
+        Initializes the histogram.
+
+        Parameters:
+            buckets (tuple): Sorted upper bounds of the buckets (an implicit +Inf bucket is added).
+        """
+        super().__init__(name, documentation, label)
+        self.buckets = tuple(buckets)
+        self._shards = ThreadShards(len(self.buckets) + 2)  # Bucket counts, +Inf count, then the sum
+        self._local = self._shards.local
+
+    def _child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float):
+        """
+        Records one observation (lock-free: only touches the calling thread's shard).
+        """
+        try:
+            values = self._local.values
+        except AttributeError:
+            values = self._shards.get()
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def counts(self) -> dict:
+        """
+        Returns the number of observations per label value (or under None for an unlabeled histogram).
+        """
+        if self.label is None:
+            return {None: sum(self._shards.total()[:-1])}
+        return {value: sum(child._shards.total()[:-1]) for value, child in self._children.items()}
+
+    def _samples(self, labels: dict):
+        totals = self._shards.total()
+        samples, cumulative = [], 0
+        for bound, count in zip(self.buckets + ("+Inf",), totals[:-1]):
+            cumulative += count
+            samples.append(("_bucket", {**labels, "le": format_value(bound)}, cumulative))
+        samples.append(("_sum", labels, totals[-1]))
+        samples.append(("_count", labels, cumulative))
+        return samples
+
+class Gauge(Metric):
+    """
+    A value read when the metrics are scraped, so the hot paths pay nothing for it.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect, label: str = None, kind: str = "gauge") -> None:
+        """
+        Initializes the gauge.
+
+        Parameters:
+            collect: Called at scrape time. Returns the value, or a dictionary mapping label values to values.
+            kind (str): "gauge", or "counter" for a count kept elsewhere (e.g., a histogram's observations).
+        """
+        super().__init__(name, documentation, label)
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self):
+        return self._samples({})
+
+    def _samples(self, labels: dict):
+        values = self.collect()
+        if self.label is None:
+            return [("", labels, values)]
+        return [("", {**labels, self.label: key}, value) for key, value in sorted(values.items())]
+
+class MetricsRegistry():
+    """
+    Holds the gateway's metrics and renders them in the Prometheus text exposition format.
+    """
+    def __init__(self) -> None:
+        self._metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Adds a metric to the exposition and returns it.
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Returns every metric in the Prometheus text format.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+def format_labels(labels: dict) -> str:
+    """
+    Formats labels as {name="value",...}, escaping the values ('' when there are none).
+    """
+    if not labels:
+        return ""
+    escaped = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+def format_value(value) -> str:
+    """
+    Formats a sample value or bucket bound (integers without a decimal point).
+    """
+    if isinstance(value, str):
+        return value
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
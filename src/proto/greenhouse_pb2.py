@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10greenhouse.proto\x12\ngreenhouse\"P\n\x0f\x41\x63tuatorRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x10\n\x08\x64\x65viceId\x18\x02 \x01(\x03\x12\r\n\x05value\x18\x03 \x01(\x02\x12\x0e\n\x06\x61\x63tive\x18\x04 \x01(\x08\"#\n\x10\x41\x63tuatorResponse\x12\x0f\n\x07success\x18\x02 \x01(\t\"K\n\x0c\x44\x65viceStatus\x12\x10\n\x08\x64\x65viceId\x18\x01 \x01(\x03\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\r\n\x05value\x18\x03 \x01(\x02\x12\x0c\n\x04unit\x18\x04 \x01(\t2X\n\x0f\x41\x63tuatorService\x12\x45\n\x08setValue\x12\x1b.greenhouse.ActuatorRequest\x1a\x1c.greenhouse.ActuatorResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10greenhouse.proto\x12\ngreenhouse\"P\n\x0f\x41\x63tuatorRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x10\n\x08\x64\x65viceId\x18\x02 \x01(\x03\x12\r\n\x05value\x18\x03 \x01(\x02\x12\x0e\n\x06\x61\x63tive\x18\x04 \x01(\x08\"#\n\x10\x41\x63tuatorResponse\x12\x0f\n\x07success\x18\x02 \x01(\t\"%\n\x11WatchStateRequest\x12\x10\n\x08\x64\x65viceId\x18\x01 \x01(\x03\"r\n\rActuatorState\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x10\n\x08\x64\x65viceId\x18\x02 \x01(\x03\x12\r\n\x05value\x18\x03 \x01(\x02\x12\x0e\n\x06\x61\x63tive\x18\x04 \x01(\x08\x12\x0f\n\x07version\x18\x05 \x01(\x03\x12\x11\n\ttimestamp\x18\x06 \x01(\x01\"^\n\x0c\x44\x65viceStatus\x12\x10\n\x08\x64\x65viceId\x18\x01 \x01(\x03\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\r\n\x05value\x18\x03 \x01(\x02\x12\x0c\n\x04unit\x18\x04 \x01(\t\x12\x11\n\ttimestamp\x18\x05 \x01(\x01\"?\n\x11\x44\x65viceStatusBatch\x12*\n\x08readings\x18\x01 \x03(\x0b\x32\x18.greenhouse.DeviceStatus\" \n\x0cTelemetryAck\x12\x10\n\x08received\x18\x01 \x01(\x03\"\xbc\x01\n\rDeviceHistory\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x10\n\x08\x64\x65viceId\x18\x03 \x01(\x03\x12\x0c\n\x04unit\x18\x04 \x01(\t\x12\r\n\x05queue\x18\x05 \x01(\t\x12\x12\n\nlastUpdate\x18\x06 \x01(\x01\x12\x0b\n\x03seq\x18\x07 \x01(\x03\x12\x12\n\ntimestamps\x18\x08 \x03(\x01\x12\x0e\n\x06values\x18\t \x03(\x02\x12\r\n\x05reset\x18\n \x01(\x08\x12\r\n\x05stale\x18\x0b \x01(\x08\"<\n\x0eSensorSnapshot\x12*\n\x07\x64\x65vices\x18\x01 \x03(\x0b\x32\x19.greenhouse.DeviceHistory2\xa2\x01\n\x0f\x41\x63tuatorService\x12\x45\n\x08setValue\x12\x1b.greenhouse.ActuatorRequest\x1a\x1c.greenhouse.ActuatorResponse\x12H\n\nwatchState\x12\x1d.greenhouse.WatchStateRequest\x1a\x19.greenhouse.ActuatorState0\x01\x32X\n\x10TelemetryService\x12\x44\n\x0cstreamStatus\x12\x18.greenhouse.DeviceStatus\x1a\x18.greenhouse.TelemetryAck(\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -35,8 +35,22 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_ACTUATORREQUEST']._serialized_end=112
   _globals['_ACTUATORRESPONSE']._serialized_start=114
   _globals['_ACTUATORRESPONSE']._serialized_end=149
-  _globals['_DEVICESTATUS']._serialized_start=151
-  _globals['_DEVICESTATUS']._serialized_end=226
-  _globals['_ACTUATORSERVICE']._serialized_start=228
-  _globals['_ACTUATORSERVICE']._serialized_end=316
+  _globals['_WATCHSTATEREQUEST']._serialized_start=151
+  _globals['_WATCHSTATEREQUEST']._serialized_end=188
+  _globals['_ACTUATORSTATE']._serialized_start=190
+  _globals['_ACTUATORSTATE']._serialized_end=304
+  _globals['_DEVICESTATUS']._serialized_start=306
+  _globals['_DEVICESTATUS']._serialized_end=400
+  _globals['_DEVICESTATUSBATCH']._serialized_start=402
+  _globals['_DEVICESTATUSBATCH']._serialized_end=465
+  _globals['_TELEMETRYACK']._serialized_start=467
+  _globals['_TELEMETRYACK']._serialized_end=499
+  _globals['_DEVICEHISTORY']._serialized_start=502
+  _globals['_DEVICEHISTORY']._serialized_end=690
+  _globals['_SENSORSNAPSHOT']._serialized_start=692
+  _globals['_SENSORSNAPSHOT']._serialized_end=752
+  _globals['_ACTUATORSERVICE']._serialized_start=755
+  _globals['_ACTUATORSERVICE']._serialized_end=917
+  _globals['_TELEMETRYSERVICE']._serialized_start=919
+  _globals['_TELEMETRYSERVICE']._serialized_end=1007
 # @@protoc_insertion_point(module_scope)
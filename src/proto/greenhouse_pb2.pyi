@@ -4,7 +4,9 @@ isort:skip_file
 """
 
 import builtins
+import collections.abc
 import google.protobuf.descriptor
+import google.protobuf.internal.containers
 import google.protobuf.message
 import typing
 
@@ -49,6 +51,51 @@ class ActuatorResponse(google.protobuf.message.Message):
 
 global___ActuatorResponse = ActuatorResponse
 
+@typing.final
+class WatchStateRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    DEVICEID_FIELD_NUMBER: builtins.int
+    deviceId: builtins.int
+    def __init__(
+        self,
+        *,
+        deviceId: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["deviceId", b"deviceId"]) -> None: ...
+
+global___WatchStateRequest = WatchStateRequest
+
+@typing.final
+class ActuatorState(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    NAME_FIELD_NUMBER: builtins.int
+    DEVICEID_FIELD_NUMBER: builtins.int
+    VALUE_FIELD_NUMBER: builtins.int
+    ACTIVE_FIELD_NUMBER: builtins.int
+    VERSION_FIELD_NUMBER: builtins.int
+    TIMESTAMP_FIELD_NUMBER: builtins.int
+    name: builtins.str
+    deviceId: builtins.int
+    value: builtins.float
+    active: builtins.bool
+    version: builtins.int
+    timestamp: builtins.float
+    def __init__(
+        self,
+        *,
+        name: builtins.str = ...,
+        deviceId: builtins.int = ...,
+        value: builtins.float = ...,
+        active: builtins.bool = ...,
+        version: builtins.int = ...,
+        timestamp: builtins.float = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["active", b"active", "deviceId", b"deviceId", "name", b"name", "timestamp", b"timestamp", "value", b"value", "version", b"version"]) -> None: ...
+
+global___ActuatorState = ActuatorState
+
 @typing.final
 class DeviceStatus(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
@@ -57,10 +104,12 @@ class DeviceStatus(google.protobuf.message.Message):
     NAME_FIELD_NUMBER: builtins.int
     VALUE_FIELD_NUMBER: builtins.int
     UNIT_FIELD_NUMBER: builtins.int
+    TIMESTAMP_FIELD_NUMBER: builtins.int
     deviceId: builtins.int
     name: builtins.str
     value: builtins.float
     unit: builtins.str
+    timestamp: builtins.float
     def __init__(
         self,
         *,
@@ -68,7 +117,102 @@ class DeviceStatus(google.protobuf.message.Message):
         name: builtins.str = ...,
         value: builtins.float = ...,
         unit: builtins.str = ...,
+        timestamp: builtins.float = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["deviceId", b"deviceId", "name", b"name", "unit", b"unit", "value", b"value"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["deviceId", b"deviceId", "name", b"name", "timestamp", b"timestamp", "unit", b"unit", "value", b"value"]) -> None: ...
 
 global___DeviceStatus = DeviceStatus
+
+@typing.final
+class DeviceStatusBatch(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    READINGS_FIELD_NUMBER: builtins.int
+    @property
+    def readings(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___DeviceStatus]: ...
+    def __init__(
+        self,
+        *,
+        readings: collections.abc.Iterable[global___DeviceStatus] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["readings", b"readings"]) -> None: ...
+
+global___DeviceStatusBatch = DeviceStatusBatch
+
+@typing.final
+class TelemetryAck(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    RECEIVED_FIELD_NUMBER: builtins.int
+    received: builtins.int
+    def __init__(
+        self,
+        *,
+        received: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["received", b"received"]) -> None: ...
+
+global___TelemetryAck = TelemetryAck
+
+@typing.final
+class DeviceHistory(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    KEY_FIELD_NUMBER: builtins.int
+    NAME_FIELD_NUMBER: builtins.int
+    DEVICEID_FIELD_NUMBER: builtins.int
+    UNIT_FIELD_NUMBER: builtins.int
+    QUEUE_FIELD_NUMBER: builtins.int
+    LASTUPDATE_FIELD_NUMBER: builtins.int
+    SEQ_FIELD_NUMBER: builtins.int
+    TIMESTAMPS_FIELD_NUMBER: builtins.int
+    VALUES_FIELD_NUMBER: builtins.int
+    RESET_FIELD_NUMBER: builtins.int
+    STALE_FIELD_NUMBER: builtins.int
+    key: builtins.str
+    name: builtins.str
+    deviceId: builtins.int
+    unit: builtins.str
+    queue: builtins.str
+    lastUpdate: builtins.float
+    seq: builtins.int
+    reset: builtins.bool
+    stale: builtins.bool
+    @property
+    def timestamps(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.float]: ...
+    @property
+    def values(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.float]: ...
+    def __init__(
+        self,
+        *,
+        key: builtins.str = ...,
+        name: builtins.str = ...,
+        deviceId: builtins.int = ...,
+        unit: builtins.str = ...,
+        queue: builtins.str = ...,
+        lastUpdate: builtins.float = ...,
+        seq: builtins.int = ...,
+        timestamps: collections.abc.Iterable[builtins.float] | None = ...,
+        values: collections.abc.Iterable[builtins.float] | None = ...,
+        reset: builtins.bool = ...,
+        stale: builtins.bool = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["deviceId", b"deviceId", "key", b"key", "lastUpdate", b"lastUpdate", "name", b"name", "queue", b"queue", "reset", b"reset", "seq", b"seq", "stale", b"stale", "timestamps", b"timestamps", "unit", b"unit", "values", b"values"]) -> None: ...
+
+global___DeviceHistory = DeviceHistory
+
+@typing.final
+class SensorSnapshot(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    DEVICES_FIELD_NUMBER: builtins.int
+    @property
+    def devices(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___DeviceHistory]: ...
+    def __init__(
+        self,
+        *,
+        devices: collections.abc.Iterable[global___DeviceHistory] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["devices", b"devices"]) -> None: ...
+
+global___SensorSnapshot = SensorSnapshot
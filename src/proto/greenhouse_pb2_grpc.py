@@ -39,6 +39,11 @@ class ActuatorServiceStub(object):
                 request_serializer=greenhouse__pb2.ActuatorRequest.SerializeToString,
                 response_deserializer=greenhouse__pb2.ActuatorResponse.FromString,
                 _registered_method=True)
+        self.watchState = channel.unary_stream(
+                '/greenhouse.ActuatorService/watchState',
+                request_serializer=greenhouse__pb2.WatchStateRequest.SerializeToString,
+                response_deserializer=greenhouse__pb2.ActuatorState.FromString,
+                _registered_method=True)
 
 
 class ActuatorServiceServicer(object):
@@ -50,6 +55,12 @@ class ActuatorServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def watchState(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_ActuatorServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +69,11 @@ def add_ActuatorServiceServicer_to_server(servicer, server):
                     request_deserializer=greenhouse__pb2.ActuatorRequest.FromString,
                     response_serializer=greenhouse__pb2.ActuatorResponse.SerializeToString,
             ),
+            'watchState': grpc.unary_stream_rpc_method_handler(
+                    servicer.watchState,
+                    request_deserializer=greenhouse__pb2.WatchStateRequest.FromString,
+                    response_serializer=greenhouse__pb2.ActuatorState.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'greenhouse.ActuatorService', rpc_method_handlers)
@@ -95,3 +111,102 @@ class ActuatorService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def watchState(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/greenhouse.ActuatorService/watchState',
+            greenhouse__pb2.WatchStateRequest.SerializeToString,
+            greenhouse__pb2.ActuatorState.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+
+class TelemetryServiceStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.streamStatus = channel.stream_unary(
+                '/greenhouse.TelemetryService/streamStatus',
+                request_serializer=greenhouse__pb2.DeviceStatus.SerializeToString,
+                response_deserializer=greenhouse__pb2.TelemetryAck.FromString,
+                _registered_method=True)
+
+
+class TelemetryServiceServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def streamStatus(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_TelemetryServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'streamStatus': grpc.stream_unary_rpc_method_handler(
+                    servicer.streamStatus,
+                    request_deserializer=greenhouse__pb2.DeviceStatus.FromString,
+                    response_serializer=greenhouse__pb2.TelemetryAck.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'greenhouse.TelemetryService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('greenhouse.TelemetryService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class TelemetryService(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def streamStatus(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/greenhouse.TelemetryService/streamStatus',
+            greenhouse__pb2.DeviceStatus.SerializeToString,
+            greenhouse__pb2.TelemetryAck.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,442 @@
+import collections
+import threading
+import time
+import pika
+from transport import open_connection, select_confirms, windowed_confirms_supported
+
+# RabbitMQ host address
+RABBITMQ_HOST = 'localhost'
+
+# Supported publisher confirm modes
+CONFIRM_MODES = ("off", "each", "batch")
+
+# Messages published in "batch" confirm mode before the publisher waits for the broker's confirms
+CONFIRM_BATCH = 100
+
+# Seconds the oldest unconfirmed message of a "batch" window may wait before the next publish waits for the confirms
+CONFIRM_INTERVAL = 0.1
+
+# Seconds the publisher waits for the confirms of a window before it reconnects and publishes the window again
+CONFIRM_TIMEOUT = 10.0
+
+# Topic exchange sensors may publish to instead of their per-feature queue
+SENSOR_EXCHANGE = "greenhouse.sensors"
+
+# AMQP "type" property of messages carrying a DeviceStatusBatch instead of a single DeviceStatus
+BATCH_TYPE = "greenhouse.DeviceStatusBatch"
+
+# Seconds a publish waits for the broker to lift flow control (Connection.Blocked) before its messages are dropped
+FLOW_WAIT = 1.0
+
+# Seconds the broker may keep a connection blocked before pika closes it (the publisher then reconnects)
+BLOCKED_TIMEOUT = 300
+
+# Protobuf tag of DeviceStatusBatch.readings (field 1, wire type 2 = length-delimited)
+READINGS_TAG = bytes([1 << 3 | 2])
+
+def encode_varint(value: int) -> bytes:
+    """
+    Encodes a non-negative integer as a protobuf varint.
+    """
+    encoded = bytearray()
+    while value > 0x7F:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+def encode_batch(bodies) -> bytes:
+    """
+    Builds a serialized DeviceStatusBatch from already serialized DeviceStatus messages,
+    without parsing them again (a repeated message field is a sequence of tagged, length-prefixed messages).
+
+    Parameters:
+        bodies (list): Serialized DeviceStatus messages.
+
+    Returns:
+        bytes: The serialized DeviceStatusBatch.
+    """
+    return b"".join(READINGS_TAG + encode_varint(len(body)) + body for body in bodies)
+
+def routing_key(name: str, device_id: int, exchange: str = '') -> str:
+    """
+    Returns the routing key a sensor publishes with.
+
+    Parameters:
+        name (str): The name of the sensor (e.g., "sensor_temperature").
+        device_id (int): The ID of the sensor.
+        exchange (str): The topic exchange, or '' to publish straight to the sensor's queue.
+
+    Returns:
+        str: "sensor.<name>.<id>" on a topic exchange, "queue_<name>" otherwise.
+    """
+    if exchange:
+        return f"sensor.{name}.{device_id}"
+    return f"queue_{name}"
+
+class PublisherBlocked(Exception):
+    """
+    Raised when the broker blocked publishing (flow control) for longer than the publisher waits.
+    The messages of the call were not published.
+    """
+
+class StatusPublisher():
+    """
+    Long-lived RabbitMQ publisher shared by every sensor of a process.
+    Keeps one connection and one channel open and reconnects with exponential backoff when the broker goes away.
+    Honors the broker's flow control: while the connection is blocked (e.g., RabbitMQ's memory alarm),
+    publishes wait up to flow_wait seconds, then drop their messages instead of piling them up in the client.
+    """
+    def __init__(self, host: str = RABBITMQ_HOST, confirms: str = "off", max_backoff: float = 30.0, exchange: str = '', flow_wait: float = FLOW_WAIT,
+                 confirm_batch: int = CONFIRM_BATCH, confirm_interval: float = CONFIRM_INTERVAL) -> None:
+        """
+        Initializes the publisher. The connection is opened lazily on the first publish.
+
+        Parameters:
+            host (str): The RabbitMQ host address.
+            confirms (str): Publisher confirm mode:
+                "off" publishes without confirmation,
+                "each" waits for a broker confirm after every message,
+                "batch" enables publisher confirms but waits for them once per window of confirm_batch messages,
+                        or when the window's oldest message waited confirm_interval seconds. Unconfirmed messages
+                        are published again after a reconnection or a Basic.Nack (at least once).
+            max_backoff (float): Upper bound (in seconds) for the wait between reconnection attempts.
+            exchange (str): Topic exchange to publish to. If empty, messages go to the queue named by their routing key.
+            flow_wait (float): Seconds a publish waits while the broker blocks the connection.
+            confirm_batch (int): Messages per confirm window ("batch" mode).
+            confirm_interval (float): Seconds after which a publish waits for the confirms of the window ("batch" mode).
+        """
+        if confirms not in CONFIRM_MODES:
+            raise ValueError(f"Unknown confirm mode '{confirms}'.")
+        if confirms == "batch" and not windowed_confirms_supported(host):
+            raise ValueError(f"Confirm mode 'batch' is not supported with pika {pika.__version__}, use 'each'.")
+
+        self.host = host
+        self.confirms = confirms
+        self.max_backoff = max_backoff
+        self.exchange = exchange
+        self.flow_wait = flow_wait
+        self.confirm_batch = confirm_batch
+        self.confirm_interval = confirm_interval
+        self.blocked = False  # The broker blocked the connection (Connection.Blocked received)
+
+        # Counters used by the benchmarks and for diagnostics
+        self.connections_opened = 0
+        self.messages_published = 0  # Messages the broker received (confirmed ones in "batch" mode)
+        self.messages_dropped = 0  # Messages not published because the broker kept the connection blocked
+        self.confirm_waits = 0  # Waits for the confirms of a window ("batch" mode)
+
+        self._connection = None
+        self._channel = None
+        self._declared = set()  # Queues (or the exchange) declared on the current channel
+        self._lock = threading.Lock()  # pika connections are not thread-safe
+
+        # "batch" confirm mode: messages to publish, and the published ones the broker has not confirmed yet
+        self._outbox = collections.deque()  # (routing key, body, properties)
+        self._window = {}  # Delivery tag -> (routing key, body, properties)
+        self._window_start = None
+        self._delivery_tag = 0
+
+    def _connect(self):
+        """
+        Opens the connection and channel, retrying with exponential backoff until the broker is reachable.
+        """
+        backoff = 1.0
+        while True:
+            try:
+                self._connection = open_connection(self.host, BLOCKED_TIMEOUT)
+                self._connection.add_on_connection_blocked_callback(self._on_blocked)
+                self._connection.add_on_connection_unblocked_callback(self._on_unblocked)
+                self.blocked = False
+                self._channel = self._connection.channel()
+                if self.confirms == "each":
+                    self._channel.confirm_delivery()
+                elif self.confirms == "batch":
+                    select_confirms(self._channel, self._on_confirm)
+                    self._delivery_tag = 0
+                self._declared = set()
+                self.connections_opened += 1
+                return
+            except pika.exceptions.AMQPError as e:
+                # Handle connection errors
+                print(f"Error to connect to RabbitMQ: {e}. Retrying in {backoff:.0f}sec")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def _on_blocked(self, connection, method_frame):
+        print(f"[PUBLISHER] Broker blocked publishing: {method_frame.method.reason}")
+        self.blocked = True
+
+    def _on_unblocked(self, connection, method_frame):
+        print("[PUBLISHER] Broker unblocked publishing")
+        self.blocked = False
+
+    def _on_confirm(self, method_frame):
+        """
+        Removes the messages a Basic.Ack or Basic.Nack confirms from the window; acked ones are counted, nacked ones
+        are published again.
+        """
+        method = method_frame.method
+        if method.multiple:
+            tags = [tag for tag in self._window if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag] if method.delivery_tag in self._window else []
+        confirmed = [self._window.pop(tag) for tag in tags]
+        if not self._window:
+            self._window_start = None
+        if not isinstance(method, pika.spec.Basic.Nack):
+            self.messages_published += len(confirmed)  # Counted once, however many times it was published
+        elif confirmed:
+            print(f"[PUBLISHER] Broker nacked {len(confirmed)} messages, publishing them again")
+            self._outbox.extend(confirmed)
+
+    def _wait_for_confirms(self):
+        """
+        Waits until the broker confirmed every message of the window. Must be called with the lock held.
+
+        Raises:
+            pika.exceptions.AMQPError: If the confirms did not arrive within CONFIRM_TIMEOUT seconds.
+        """
+        self.confirm_waits += 1
+        deadline = time.monotonic() + CONFIRM_TIMEOUT
+        while self._window:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise pika.exceptions.AMQPError(f"{len(self._window)} messages unconfirmed after {CONFIRM_TIMEOUT}sec")
+            self._connection.process_data_events(time_limit=min(remaining, 0.1))
+        self._window_start = None
+
+    def _wait_for_flow(self) -> bool:
+        """
+        Lets the connection deliver a pending Connection.Blocked or Unblocked, then waits up to flow_wait seconds
+        while the connection is blocked. Must be called with the lock held.
+
+        Returns:
+            bool: True if publishing is allowed.
+        """
+        self._connection.process_data_events(time_limit=0)
+        deadline = time.monotonic() + self.flow_wait
+        while self.blocked:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._connection.process_data_events(time_limit=min(remaining, 0.1))
+        return True
+
+    def _reset(self):
+        """
+        Drops the current connection so the next publish reconnects.
+        """
+        try:
+            if self._connection is not None and self._connection.is_open:
+                self._connection.close()
+        except pika.exceptions.AMQPError:
+            pass
+        self._connection = None
+        self._channel = None
+        # The broker may not have received the unconfirmed messages: publish them again first
+        self._outbox.extendleft(reversed(list(self._window.values())))
+        self._window.clear()
+        self._window_start = None
+
+    def _publish_locked(self, messages, properties):
+        """
+        Publishes the messages on the current channel. Must be called with the lock held.
+        """
+        if self._channel is None or not self._channel.is_open:
+            self._connect()
+
+        if not self._wait_for_flow():
+            self.messages_dropped += len(messages)
+            raise PublisherBlocked(f"Broker blocked publishing for {self.flow_wait}sec, {len(messages)} messages dropped")
+
+        if self.exchange and self.exchange not in self._declared:
+            self._channel.exchange_declare(exchange=self.exchange, exchange_type="topic")  # Declare the exchange once per channel
+            self._declared.add(self.exchange)
+
+        if self.confirms == "batch":
+            self._outbox.extend((key, body, properties) for key, body in messages)
+            self._publish_window()
+            return
+
+        for key, body in messages:
+            self._declare_queue(key)
+            self._channel.basic_publish(exchange=self.exchange, routing_key=key, body=body, properties=properties)
+
+        self.messages_published += len(messages)
+
+    def _declare_queue(self, key: str):
+        """
+        Declares the queue of a routing key once per channel (when publishing without an exchange).
+        """
+        if not self.exchange and key not in self._declared:
+            self._channel.queue_declare(queue=key)
+            self._declared.add(key)
+
+    def _publish_window(self):
+        """
+        Publishes the outbox into the confirm window, and waits for the window's confirms once it holds
+        confirm_batch messages or its oldest message waited confirm_interval seconds. Must be called with the lock held.
+        """
+        while self._outbox:
+            key, body, properties = self._outbox[0]
+            self._declare_queue(key)
+            if self._window_start is None:
+                self._window_start = time.monotonic()
+            self._delivery_tag += 1
+            self._window[self._delivery_tag] = self._outbox.popleft()
+            self._channel.basic_publish(exchange=self.exchange, routing_key=key, body=body, properties=properties)
+            if len(self._window) >= self.confirm_batch:
+                self._wait_for_confirms()
+        if self._window_start is not None and time.monotonic() - self._window_start >= self.confirm_interval:
+            self._wait_for_confirms()
+
+    def publish_many(self, messages, properties=None):
+        """
+        Publishes several messages over the shared channel.
+        If the connection is lost, it reconnects and retries the batch once before giving up.
+
+        Parameters:
+            messages (list): A list of (routing_key, body) tuples. The routing key is the queue name unless an exchange is set.
+            properties (pika.BasicProperties): AMQP properties of every message (e.g., the batch type).
+        """
+        with self._lock:
+            try:
+                self._publish_locked(messages, properties)
+            except pika.exceptions.AMQPError:
+                # The broker went away: reconnect and retry once (in "batch" mode, the messages are in the outbox already)
+                self._reset()
+                self._publish_locked([] if self.confirms == "batch" else messages, properties)
+
+    def publish(self, queue_name: str, body: bytes):
+        """
+        Publishes one message over the shared channel.
+
+        Parameters:
+            queue_name (str): The name of the RabbitMQ queue (or the routing key if an exchange is set).
+            body (bytes): The serialized message.
+        """
+        self.publish_many([(queue_name, body)])
+
+    def close(self):
+        """
+        Waits for the confirms of the last window ("batch" mode), then closes the connection.
+        """
+        with self._lock:
+            if self._window and self._connection is not None:
+                try:
+                    self._wait_for_confirms()
+                except pika.exceptions.AMQPError as e:
+                    print(f"Error to confirm {len(self._window)} messages: {e}")
+            self._reset()
+
+class BatchingPublisher():
+    """
+    Accumulates serialized DeviceStatus messages per routing key and publishes them as one DeviceStatusBatch
+    when a batch is full or its oldest reading has waited for the linger time.
+    Has the same publish()/publish_many() interface as StatusPublisher, so sensors can use either.
+    """
+    def __init__(self, publisher, max_batch: int = 100, linger: float = 1.0) -> None:
+        """
+        Initializes the batching publisher and starts its linger thread.
+
+        Parameters:
+            publisher (StatusPublisher): The publisher the batches are sent through.
+            max_batch (int): Readings per batch.
+            linger (float): Maximum seconds a reading waits for its batch to fill.
+        """
+        self.publisher = publisher
+        self.max_batch = max_batch
+        self.linger = linger
+        self.exchange = getattr(publisher, "exchange", '')
+        self.properties = pika.BasicProperties(type=BATCH_TYPE)
+        self._batches = {}  # Routing key -> (time of the oldest reading, serialized readings)
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run_linger, daemon=True).start()
+
+    def _send(self, batches):
+        """
+        Publishes full or expired batches (called without the lock held).
+        """
+        if batches:
+            self.publisher.publish_many([(key, encode_batch(bodies)) for key, bodies in batches], properties=self.properties)
+
+    def publish_many(self, messages):
+        """
+        Adds several readings to their batches and sends the batches that are full.
+
+        Parameters:
+            messages (list): A list of (routing_key, body) tuples, body being a serialized DeviceStatus.
+        """
+        full = []
+        with self._lock:
+            now = time.monotonic()
+            for key, body in messages:
+                started, bodies = self._batches.setdefault(key, (now, []))
+                bodies.append(body)
+                if len(bodies) >= self.max_batch:
+                    full.append((key, bodies))
+                    del self._batches[key]
+        self._send(full)
+
+    def publish(self, queue_name: str, body: bytes):
+        """
+        Adds one reading to its batch.
+
+        Parameters:
+            queue_name (str): The name of the RabbitMQ queue (or the routing key if an exchange is set).
+            body (bytes): The serialized DeviceStatus.
+        """
+        self.publish_many([(queue_name, body)])
+
+    def flush(self, older_than: float = None):
+        """
+        Sends the pending batches.
+
+        Parameters:
+            older_than (float): Only send the batches whose oldest reading waited at least this many seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            expired = [
+                key for key, (started, _) in self._batches.items()
+                if older_than is None or now - started >= older_than
+            ]
+            batches = [(key, self._batches.pop(key)[1]) for key in expired]
+        self._send(batches)
+
+    def _run_linger(self):
+        """
+        Sends the batches whose oldest reading has waited for the linger time.
+        """
+        while True:
+            time.sleep(self.linger / 4)
+            try:
+                self.flush(older_than=self.linger)
+            except Exception as e:
+                # Handle publish errors (the publisher already retried the connection)
+                print(f"Error to publish to RabbitMQ: {e}")
+
+# Publishers shared by every sensor of the process, one per set of get_publisher() arguments
+_shared_publishers = {}
+_shared_lock = threading.Lock()
+
+def get_publisher(host: str = RABBITMQ_HOST, confirms: str = "off", exchange: str = '', flow_wait: float = FLOW_WAIT) -> StatusPublisher:
+    """
+    Returns the process-wide publisher for these arguments, creating it on first use
+    (a call with other arguments gets a publisher, and a connection, of its own).
+
+    Parameters:
+        host (str): The RabbitMQ host address.
+        confirms (str): Publisher confirm mode (see StatusPublisher).
+        exchange (str): Topic exchange to publish to (see StatusPublisher).
+        flow_wait (float): Seconds a publish waits while the broker blocks the connection (see StatusPublisher).
+
+    Returns:
+        StatusPublisher: The shared publisher.
+    """
+    key = (host, confirms, exchange, flow_wait)
+    with _shared_lock:
+        if key not in _shared_publishers:
+            _shared_publishers[key] = StatusPublisher(host=host, confirms=confirms, exchange=exchange, flow_wait=flow_wait)
+        return _shared_publishers[key]
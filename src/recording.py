@@ -0,0 +1,116 @@
+import threading
+import time
+from proto import greenhouse_pb2
+from publisher import encode_varint
+
+# Bytes read from a recording at a time
+READ_CHUNK = 1 << 20
+
+# Bytes buffered by the recorder before they are written to the file
+WRITE_BUFFER = 1 << 20
+
+# Seconds between two flushes of the recorder's buffer (bounds what a crash loses)
+FLUSH_INTERVAL = 1.0
+
+def decode_varint(data, offset: int):
+    """
+    Decodes a protobuf varint.
+
+    Parameters:
+        data (bytes): The buffer.
+        offset (int): Position of the varint's first byte.
+
+    Returns:
+        tuple: The value and the position after the varint, or None if the buffer ends inside the varint.
+    """
+    value, shift = 0, 0
+    while offset < len(data):
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+    return None
+
+def read_recording(path: str):
+    """
+    Reads a recording: serialized DeviceStatus messages, each preceded by its length as a varint
+    (the length-delimited format of protobuf's writeDelimitedTo/parseDelimitedFrom).
+
+    Parameters:
+        path (str): Path to the recording.
+
+    Yields:
+        tuple: The greenhouse_pb2.DeviceStatus and its serialized bytes, in file order.
+               A partial message at the end (a recorder that did not close the file) is skipped.
+    """
+    with open(path, "rb") as file:
+        buffer, offset = b"", 0
+        while True:
+            chunk = file.read(READ_CHUNK)
+            if not chunk:
+                break
+            buffer = buffer[offset:] + chunk
+            offset = 0
+            while True:
+                header = decode_varint(buffer, offset)
+                if header is None or header[1] + header[0] > len(buffer):
+                    break  # The message continues in the next chunk
+                length, start = header
+                body = buffer[start:start + length]
+                status = greenhouse_pb2.DeviceStatus()
+                status.ParseFromString(body)
+                yield status, body
+                offset = start + length
+        if offset < len(buffer):
+            print(f"[WARNING] Ignored {len(buffer) - offset} bytes of a partial message at the end of {path}")
+
+class RecordingWriter():
+    """
+    Appends readings to a length-delimited recording that replay.py can publish again.
+    Safe to call from the ingest workers: each reading is written with one call to the buffered file,
+    and the buffer is flushed every FLUSH_INTERVAL seconds and on close.
+    """
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL) -> None:
+        """
+        Opens the recording for appending and starts the flush thread.
+
+        Parameters:
+            path (str): Path to the recording (created if it does not exist).
+            flush_interval (float): Seconds between two flushes.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.recorded = 0  # Readings written
+        self._file = open(path, "ab", buffering=WRITE_BUFFER)
+        self._closed = threading.Event()
+        threading.Thread(target=self._run_flush, daemon=True).start()
+
+    def write(self, status, timestamp: float = None):
+        """
+        Appends one reading.
+
+        Parameters:
+            status (greenhouse_pb2.DeviceStatus): The reading (or an ingest.Reading forwarded by a consumer process).
+            timestamp (float): The reading's time, if the reading has none (e.g., the reception time).
+        """
+        if not isinstance(status, greenhouse_pb2.DeviceStatus) or (timestamp and not status.timestamp):
+            status = greenhouse_pb2.DeviceStatus(
+                deviceId=status.deviceId, name=status.name, value=status.value, unit=status.unit,
+                timestamp=status.timestamp or timestamp or time.time()
+            )
+        body = status.SerializeToString()
+        self._file.write(encode_varint(len(body)) + body)
+        self.recorded += 1
+
+    def _run_flush(self):
+        while not self._closed.wait(self.flush_interval):
+            self._file.flush()
+
+    def close(self):
+        """
+        Flushes and closes the recording.
+        """
+        self._closed.set()
+        self._file.close()
@@ -0,0 +1,307 @@
+import json
+import threading
+import time
+import numpy as np
+from ringbuffer import RingBuffer
+from rollups import Rollups, ROLLUP_WINDOWS
+from responses import encode_section, join_sections
+
+# Seconds of history kept per device
+HISTORY_SECONDS = 2 * 3600
+
+# Expected seconds between two readings of a device (sizes the history buffers)
+SAMPLE_PERIOD = 2
+
+# Number of readings returned per device when no limit is given
+RESPONSE_LIMIT = 20
+
+# Encoded sections kept per device (one per limit and media type requested)
+SECTION_CACHE_SIZE = 4
+
+class SensorDevice():
+    """
+    Buffers the readings of one device, identified by its sensor name and device ID.
+    """
+    def __init__(self, name: str, device_id: int, unit: str, queue: str, capacity: int, rollup_windows: dict = ROLLUP_WINDOWS) -> None:
+        """
+        Initializes an empty device buffer.
+
+        Parameters:
+            name (str): The name of the sensor (e.g., "sensor_temperature").
+            device_id (int): The ID of the device.
+            unit (str): The unit of measurement.
+            queue (str): The RabbitMQ queue or routing key the device was first seen on.
+            capacity (int): Number of readings to keep.
+            rollup_windows (dict): Rollup windows kept (see rollups.ROLLUP_WINDOWS).
+        """
+        self.name = name
+        self.device_id = device_id
+        self.unit = unit
+        self.queue = queue
+        self.history = RingBuffer(capacity)
+        self.rollups = Rollups(rollup_windows)  # Per-minute and per-hour aggregates, updated with each reading
+        self.last_update = time.time()  # Reception time of the latest reading
+        self.last_seq = 0  # Sequence number of the latest reading
+        self.reset_seq = 0  # Sequence number at which the history was last cleared
+        self.stale = False  # True once the device stopped reporting, until its next reading
+        self.stale_seq = 0  # Sequence number at which the device last went stale or came back online
+        self._sections = {}  # Encoded sections by (limit, media type): (version, bytes)
+
+    @property
+    def key(self) -> str:
+        """
+        Returns the key of the device in API responses ("<name>:<id>").
+        """
+        return f"{self.name}:{self.device_id}"
+
+    def changed_since(self, since: int) -> bool:
+        """
+        Returns True if the device got readings, was cleared or went stale after the given sequence number.
+        """
+        return self.last_seq > since or self.reset_seq > since or self.stale_seq > since
+
+    def to_dict(self, limit: int = RESPONSE_LIMIT, since: int = None, until: int = None) -> dict:
+        """
+        Returns the device and its latest readings as a JSON-serializable dictionary.
+        Readings are returned as two columns instead of one dictionary per sample.
+
+        Parameters:
+            limit (int): Number of most recent readings to return (None for the whole history).
+            since (int): If given, only the readings with a greater sequence number are returned,
+                         and "reset" tells whether the history was cleared since then.
+            until (int): If given, readings with a greater sequence number are left out,
+                         so a response matches the registry sequence number it is tagged with.
+        """
+        if since is None and until is None:
+            timestamps, values = self.history.latest(limit)
+        else:
+            after = -1 if since is None else since
+            until = self.last_seq if until is None else until
+            timestamps, values = self.history.between(after, until, limit)
+        data = {
+            "name": self.name,
+            "id": self.device_id,
+            "unit": self.unit,
+            "queue": self.queue,
+            "last_update": self.last_update,
+            "stale": self.stale,
+            "seq": self.last_seq if until is None else min(self.last_seq, until),
+            "timestamps": timestamps.tolist(),
+            "values": np.round(values.astype(np.float64), 2).tolist(),
+        }
+        if since is not None:
+            data["reset"] = self.reset_seq > since
+        return data
+
+    def rollup(self, window: str, start: float, end: float) -> dict:
+        """
+        Returns the buckets of a rollup window overlapping [start, end) (see RollupWindow.query).
+        """
+        return self.rollups.windows[window].query(start, end)
+
+    def section(self, limit: int, until: int, media_type: str) -> bytes:
+        """
+        Returns the encoded section of the device in full /sensors responses.
+        The section is encoded once and reused by every request until the device gets a new reading.
+
+        Parameters:
+            limit (int): Number of most recent readings in the section.
+            until (int): Sequence number of the response (newer readings are left out).
+            media_type (str): The media type of the response.
+        """
+        if self.last_seq > until:
+            # The device changed after the response was tagged: encode its older state without caching it
+            return encode_section(self.key, self.to_dict(limit, None, until), media_type)
+        version = (self.last_seq, self.reset_seq, self.stale_seq)
+        cached = self._sections.get((limit, media_type))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        section = encode_section(self.key, self.to_dict(limit, None, until), media_type)
+        if len(self._sections) >= SECTION_CACHE_SIZE:
+            self._sections.clear()
+        self._sections[(limit, media_type)] = (version, section)
+        return section
+
+    def invalidate(self):
+        """
+        Drops the encoded sections (called when the device gets a new reading, is cleared or goes stale).
+        The version stored with each section also discards sections rebuilt concurrently from older data.
+        """
+        self._sections = {}
+
+class SensorRegistry():
+    """
+    Creates device buffers on the first message of each device and dispatches readings to them
+    with one dictionary lookup on (name, deviceId), whatever the number of devices.
+    """
+    def __init__(self, history_seconds: float = HISTORY_SECONDS, sample_period: float = SAMPLE_PERIOD, rollup_windows: dict = ROLLUP_WINDOWS) -> None:
+        """
+        Initializes an empty registry.
+
+        Parameters:
+            history_seconds (float): Seconds of history kept per device.
+            sample_period (float): Expected seconds between two readings of a device.
+            rollup_windows (dict): Rollup windows kept per device (see rollups.ROLLUP_WINDOWS).
+        """
+        self.capacity = max(1, int(history_seconds / sample_period))
+        self.rollup_windows = dict(rollup_windows)
+        self.sequence = 0  # Sequence number of the latest change (reading, cleared history or stale/online change)
+        self._devices = {}
+        self._lock = threading.Lock()  # Guards device creation against concurrent readers
+        self._sequence_lock = threading.Lock()  # Keeps sequence numbers in append order across ingest threads
+        self._responses = {}  # Full response bodies by (limit, media type): (sequence, bytes)
+
+    def record(self, status, queue: str, timestamp: float) -> SensorDevice:
+        """
+        Stores one reading, registering its device if it was never seen before.
+
+        Parameters:
+            status (greenhouse_pb2.DeviceStatus): The reading.
+            queue (str): The RabbitMQ queue or routing key the reading arrived on.
+            timestamp (float): The time of the reading (seconds since the epoch).
+
+        Returns:
+            SensorDevice: The device the reading was stored in.
+        """
+        device = self._register(status, queue)
+        device.last_update = time.time()
+        with self._sequence_lock:
+            sequence = self.sequence + 1
+            device.history.append(timestamp, status.value, sequence)
+            device.last_seq = sequence
+            self.sequence = sequence
+            device.rollups.add(timestamp, status.value)
+        device.invalidate()
+        return device
+
+    def _register(self, status, queue: str) -> SensorDevice:
+        """
+        Returns the device of a reading, registering it on its first reading.
+        """
+        key = (status.name, status.deviceId)
+        device = self._devices.get(key)
+        if device is None:
+            with self._lock:
+                device = self._devices.get(key)
+                if device is None:
+                    device = self._new_device(status, queue)
+                    self._devices[key] = device
+                    print(f"[GATEWAY] Registered device {device.key} from {queue}")
+        return device
+
+    def _new_device(self, status, queue: str) -> SensorDevice:
+        """
+        Creates the buffers of a new device (called with the registry lock held).
+        """
+        return SensorDevice(status.name, status.deviceId, status.unit, queue, self.capacity, self.rollup_windows)
+
+    def clear(self, device: SensorDevice):
+        """
+        Drops the readings of a device. Clearing counts as a change, so clients polling with "since" see it.
+        """
+        with self._sequence_lock:
+            self.sequence += 1
+            device.history.clear()
+            device.reset_seq = self.sequence
+        device.invalidate()
+
+    def set_stale(self, device: SensorDevice, stale: bool):
+        """
+        Marks a device as stale (it stopped reporting) or back online, keeping its readings.
+        The change counts as a change of the device, so clients polling with "since" see it.
+        """
+        with self._sequence_lock:
+            self.sequence += 1
+            device.stale = stale
+            device.stale_seq = self.sequence
+        device.invalidate()
+
+    def encode(self, limit: int, since: int, media_type: str):
+        """
+        Encodes a /sensors response.
+        Full responses are joined from the cached device sections, and the whole body is reused
+        until the next reading. Delta responses only encode the devices that changed.
+
+        Parameters:
+            limit (int): Number of most recent readings per device.
+            since (int): If given, only the devices and readings newer than this sequence number are encoded.
+            media_type (str): The media type of the response.
+
+        Returns:
+            tuple: The sequence number the response is consistent with, and the response body.
+        """
+        sequence = self.sequence
+        if since is not None:
+            sections = [
+                encode_section(device.key, device.to_dict(limit, since, sequence), media_type)
+                for device in self.devices() if device.changed_since(since)
+            ]
+            return sequence, join_sections(sections, media_type)
+
+        cached = self._responses.get((limit, media_type))
+        if cached is not None and cached[0] == sequence:
+            return cached
+        body = join_sections([device.section(limit, sequence, media_type) for device in self.devices()], media_type)
+        if len(self._responses) >= SECTION_CACHE_SIZE:
+            self._responses.clear()
+        self._responses[(limit, media_type)] = (sequence, body)
+        return sequence, body
+
+    def get(self, name: str, device_id: int):
+        """
+        Returns a device, or None if it is not registered.
+        """
+        return self._devices.get((name, device_id))
+
+    def named(self, name: str):
+        """
+        Returns the devices of a sensor, sorted by ID.
+        """
+        return sorted((device for device in self.devices() if device.name == name), key=lambda device: device.device_id)
+
+    def devices(self):
+        """
+        Returns a snapshot of every registered device.
+        """
+        with self._lock:
+            return list(self._devices.values())
+
+class GatewayConfig():
+    """
+    Queues, topic exchange and actuator addresses the gateway works with.
+    Loaded from a JSON file so new sensors and actuators can be added without redeploying the gateway.
+    """
+    def __init__(self, queues, exchange: str, actuators: dict) -> None:
+        """
+        Initializes the configuration.
+
+        Parameters:
+            queues (list): Named RabbitMQ queues to consume (one per sensor feature).
+            exchange (str): Topic exchange to consume every "sensor.#" routing key from ('' disables it).
+            actuators (dict): Maps actuator names to their gRPC addresses ("host:port").
+        """
+        self.queues = list(queues)
+        self.exchange = exchange
+        self.actuators = dict(actuators)
+
+    @classmethod
+    def load(cls, path: str, default: "GatewayConfig") -> "GatewayConfig":
+        """
+        Loads the configuration from a JSON file. Missing keys keep the default values.
+
+        Parameters:
+            path (str): Path to the JSON file, or '' to use the default configuration.
+            default (GatewayConfig): The configuration to fall back on.
+
+        Returns:
+            GatewayConfig: The loaded configuration.
+        """
+        if not path:
+            return default
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        return cls(
+            queues=data.get("queues", default.queues),
+            exchange=data.get("exchange", default.exchange),
+            actuators=data.get("actuators", default.actuators),
+        )
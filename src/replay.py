@@ -0,0 +1,121 @@
+import argparse
+import json
+import time
+from publisher import StatusPublisher, BatchingPublisher, routing_key, CONFIRM_MODES, SENSOR_EXCHANGE
+from recording import read_recording
+
+# RabbitMQ host address
+RABBITMQ_HOST = 'localhost'
+
+# Maximum number of messages handed to the publisher in one publish_many() call
+PUBLISH_BATCH = 500
+
+# Seconds between two throughput reports
+REPORT_PERIOD = 10
+
+# Shortest wait worth sleeping for before the next readings are due (earlier readings are published late instead)
+MIN_SLEEP = 0.001
+
+def parse_speed(value: str) -> float:
+    """
+    Parses a replay speed: a multiple of real time, or "max" (as fast as possible, returned as 0).
+    """
+    if value == "max":
+        return 0.0
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'.")
+    return speed
+
+def replay(readings, publisher, speed: float = 1.0, exchange: str = '', retime: bool = True, publish_batch: int = PUBLISH_BATCH,
+           report_period: float = REPORT_PERIOD, max_gap: float = None) -> dict:
+    """
+    Publishes recorded readings again, paced by their timestamps.
+
+    Parameters:
+        readings: Iterable of (greenhouse_pb2.DeviceStatus, serialized bytes), in time order (see recording.read_recording).
+        publisher (StatusPublisher | BatchingPublisher): The publisher the readings are sent through, publish_batch at a time.
+        speed (float): Multiple of real time (1 replays at the recorded pace), 0 for as fast as possible.
+        exchange (str): Topic exchange the gateway consumes ('' publishes to the per-feature queues).
+        retime (bool): Shift the timestamps so the recording starts now (compressed by the speed), instead of
+                       keeping the recorded times (which the gateway would store as history in the past).
+        publish_batch (int): Maximum readings handed to the publisher at once.
+        report_period (float): Seconds between two progress reports (0 disables them).
+        max_gap (float): Recorded seconds without readings replayed at most (longer gaps, e.g., outages, are cut short).
+
+    Returns:
+        dict: The readings published, the elapsed seconds, the achieved readings per second, and how late
+              the paced readings were published at worst (seconds).
+    """
+    pending, published, max_late = [], 0, 0.0
+    first = start = wall_start = previous = None
+    skipped = 0.0  # Recorded seconds cut from gaps longer than max_gap
+    last_report = last_count = 0
+
+    def flush():
+        nonlocal pending, published
+        if pending:
+            publisher.publish_many(pending)
+            published += len(pending)
+            pending = []
+
+    for status, body in readings:
+        if first is None:
+            first = previous = status.timestamp
+            start, wall_start = time.perf_counter(), time.time()
+            last_report = start
+        if max_gap is not None and status.timestamp - previous > max_gap:
+            skipped += status.timestamp - previous - max_gap
+        previous = max(previous, status.timestamp)
+        offset = (status.timestamp - first - skipped) / speed if speed else None
+        if offset is not None:
+            delay = start + offset - time.perf_counter()
+            if delay >= MIN_SLEEP:
+                flush()  # Publish what is due before waiting
+                time.sleep(delay)
+            else:
+                max_late = max(max_late, -delay)
+        if retime:
+            status.timestamp = wall_start + offset if offset is not None else time.time()
+            body = status.SerializeToString()
+        pending.append((routing_key(status.name, status.deviceId, exchange), body))
+        if len(pending) >= publish_batch:
+            flush()
+
+        now = time.perf_counter()
+        if report_period and now - last_report >= report_period:
+            print(f"[REPLAY] Published {published} readings ({(published - last_count) / (now - last_report):.0f}/s)")
+            last_report, last_count = now, published
+
+    flush()
+    if isinstance(publisher, BatchingPublisher):
+        publisher.flush()
+    elapsed = time.perf_counter() - start if start is not None else 0.0
+    return {
+        "readings": published,
+        "seconds": round(elapsed, 3),
+        "readings_per_sec": round(published / elapsed, 1) if elapsed else 0.0,
+        "max_late_ms": round(max_late * 1000, 3),
+    }
+
+if __name__ == "__main__":
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Replay a recording of sensor readings into the gateway's broker.")
+    parser.add_argument("recording", help="Length-delimited DeviceStatus file (e.g., written by gateway.py --record)")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="Multiple of real time, or 'max' to publish as fast as possible")
+    parser.add_argument("--host", default=RABBITMQ_HOST, help="RabbitMQ host ('memory' for the in-process broker)")
+    parser.add_argument("--exchange", nargs="?", const=SENSOR_EXCHANGE, default='', help=f"Publish to a topic exchange (default {SENSOR_EXCHANGE}) instead of the feature queues")
+    parser.add_argument("--confirms", choices=CONFIRM_MODES, default="off", help="RabbitMQ publisher confirm mode")
+    parser.add_argument("--publish-batch", type=int, default=PUBLISH_BATCH, help="Readings per publish_many() call")
+    parser.add_argument("--batch-size", type=int, default=1, help="Readings per RabbitMQ message (DeviceStatusBatch if > 1)")
+    parser.add_argument("--linger", type=float, default=1.0, help="Maximum seconds a reading waits for its batch")
+    parser.add_argument("--max-gap", type=float, help="Replay gaps without readings longer than this many recorded seconds as this long")
+    parser.add_argument("--original-timestamps", action="store_true", help="Keep the recorded timestamps instead of shifting them to now (the gateway's on-disk store skips readings older than the ones it holds)")
+    args = parser.parse_args()
+
+    publisher = StatusPublisher(host=args.host, confirms=args.confirms, exchange=args.exchange)
+    if args.batch_size > 1:
+        publisher = BatchingPublisher(publisher, max_batch=args.batch_size, linger=args.linger)
+    print(f"[REPLAY] Replaying {args.recording} at {'max' if not args.speed else f'{args.speed}x'} speed")
+    result = replay(read_recording(args.recording), publisher, args.speed, args.exchange, not args.original_timestamps, args.publish_batch, max_gap=args.max_gap)
+    print(f"[REPLAY] {json.dumps(result)}")
@@ -0,0 +1,67 @@
+import json
+from proto import greenhouse_pb2
+from publisher import encode_varint
+
+# Media types of /sensors responses, chosen with the Accept header
+JSON_TYPE = "application/json"
+PROTOBUF_TYPE = "application/x-protobuf"
+
+# Key of the "devices" field of SensorSnapshot (field 1, length-delimited)
+DEVICES_TAG = bytes([1 << 3 | 2])
+
+def negotiate(accept: str) -> str:
+    """
+    Returns the media type of a response: protobuf if the client accepts it, JSON otherwise.
+
+    Parameters:
+        accept (str): The request's Accept header (may be None).
+    """
+    if accept and PROTOBUF_TYPE in accept:
+        return PROTOBUF_TYPE
+    return JSON_TYPE
+
+def encode_section(key: str, data: dict, media_type: str) -> bytes:
+    """
+    Encodes the section of one device, ready to be joined with the other sections of a response.
+    JSON sections are '"<key>": {...}' members; protobuf sections are tagged SensorSnapshot.devices entries.
+
+    Parameters:
+        key (str): The key of the device ("<name>:<id>").
+        data (dict): The device, as returned by SensorDevice.to_dict.
+        media_type (str): JSON_TYPE or PROTOBUF_TYPE.
+
+    Returns:
+        bytes: The encoded section.
+    """
+    if media_type == PROTOBUF_TYPE:
+        message = greenhouse_pb2.DeviceHistory(
+            key=key,
+            name=data["name"],
+            deviceId=data["id"],
+            unit=data["unit"],
+            queue=data["queue"],
+            lastUpdate=data["last_update"],
+            seq=data["seq"],
+            timestamps=data["timestamps"],
+            values=data["values"],
+            reset=data.get("reset", False),
+            stale=data["stale"],
+        )
+        body = message.SerializeToString()
+        return DEVICES_TAG + encode_varint(len(body)) + body
+    return json.dumps(key, ensure_ascii=False).encode() + b":" + json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+def join_sections(sections, media_type: str) -> bytes:
+    """
+    Builds a whole response body from encoded device sections, without encoding them again.
+
+    Parameters:
+        sections (list): The encoded sections.
+        media_type (str): JSON_TYPE (a JSON object) or PROTOBUF_TYPE (a serialized SensorSnapshot).
+
+    Returns:
+        bytes: The response body.
+    """
+    if media_type == PROTOBUF_TYPE:
+        return b"".join(sections)
+    return b"{" + b",".join(sections) + b"}"
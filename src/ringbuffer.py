@@ -0,0 +1,140 @@
+import numpy as np
+
+class RingBuffer():
+    """
+    Fixed-capacity history of one sensor, stored as preallocated columns
+    (float64 timestamps, float32 values and int64 sequence numbers) instead of one Python object per sample.
+    """
+    def __init__(self, capacity: int) -> None:
+        """
+        Allocates an empty buffer.
+
+        Parameters:
+            capacity (int): Maximum number of samples kept. Older samples are overwritten.
+        """
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive.")
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.sequences = np.zeros(capacity, dtype=np.int64)
+        self._written = 0  # Total number of samples ever appended
+
+    def __len__(self) -> int:
+        return min(self._written, self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory used by the sample columns.
+        """
+        return self.timestamps.nbytes + self.values.nbytes + self.sequences.nbytes
+
+    def append(self, timestamp: float, value: float, sequence: int = 0):
+        """
+        Appends one sample, overwriting the oldest one when the buffer is full.
+
+        Parameters:
+            timestamp (float): The time the reading was taken (seconds since the epoch), or its reception time
+                               for senders that send none.
+            value (float): The sensor value.
+            sequence (int): The sequence number of the sample (increasing across appends).
+        """
+        index = self._written % self.capacity
+        self.timestamps[index] = timestamp
+        self.values[index] = value
+        self.sequences[index] = sequence
+        self._written += 1
+
+    def clear(self):
+        """
+        Drops every sample.
+        """
+        self._written = 0
+
+    def count_after(self, sequence: int) -> int:
+        """
+        Returns the number of samples with a sequence number greater than the given one.
+        """
+        return self._count_after(sequence, self._written)
+
+    def _count_after(self, sequence: int, written: int) -> int:
+        """
+        Counts the samples newer than a sequence number among the first `written` appends.
+        Sequence numbers increase across appends, so this is a binary search over the (at most two) slices.
+        """
+        count = min(written, self.capacity)
+        end = written % self.capacity or self.capacity
+        start = end - count
+        slices = [self.sequences[start:end]] if start >= 0 else [self.sequences[start:], self.sequences[:end]]
+        return sum(len(part) - int(np.searchsorted(part, sequence, side="right")) for part in slices)
+
+    def between(self, after: int, until: int, last: int = None):
+        """
+        Returns copies of the samples with after < sequence <= until, oldest first.
+
+        Parameters:
+            after (int): Exclusive lower bound of the sequence numbers.
+            until (int): Inclusive upper bound of the sequence numbers.
+            last (int): Maximum number of samples to return (the most recent ones are kept).
+
+        Returns:
+            tuple: The timestamps and values arrays.
+        """
+        written = self._written
+        newer = self._count_after(until, written)
+        count = self._count_after(after, written) - newer
+        if last is not None:
+            count = min(count, last)
+        if count <= 0:
+            return self.timestamps[:0].copy(), self.values[:0].copy()
+        indices = np.arange(written - newer - count, written - newer) % self.capacity
+        return self.timestamps[indices], self.values[indices]
+
+    def segments(self, last: int = None):
+        """
+        Returns the most recent samples as zero-copy views, oldest first.
+        The samples span at most two slices of the columns when the buffer has wrapped around.
+
+        Parameters:
+            last (int): Number of most recent samples to return. Returns every sample if None.
+
+        Returns:
+            list: Up to two (timestamps, values) tuples of array views.
+        """
+        written = self._written
+        count = min(written, self.capacity)
+        if last is not None:
+            count = min(count, last)
+        if count <= 0:
+            return []
+
+        end = written % self.capacity or self.capacity  # One past the newest sample
+        start = end - count
+        if start >= 0:
+            return [(self.timestamps[start:end], self.values[start:end])]
+        return [
+            (self.timestamps[start:], self.values[start:]),
+            (self.timestamps[:end], self.values[:end]),
+        ]
+
+    def latest(self, last: int = None):
+        """
+        Returns the most recent samples as two contiguous arrays, oldest first.
+        The arrays are views when the samples do not wrap around the end of the buffer, and copies otherwise.
+
+        Parameters:
+            last (int): Number of most recent samples to return. Returns every sample if None.
+
+        Returns:
+            tuple: The timestamps and values arrays.
+        """
+        segments = self.segments(last)
+        if not segments:
+            return self.timestamps[:0], self.values[:0]
+        if len(segments) == 1:
+            return segments[0]
+        return (
+            np.concatenate([timestamps for timestamps, _ in segments]),
+            np.concatenate([values for _, values in segments]),
+        )
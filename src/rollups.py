@@ -0,0 +1,124 @@
+from array import array
+import numpy as np
+
+# Columns of a rollup window, in storage order
+ROLLUP_COLUMNS = ("index", "count", "total", "low", "high")
+
+# Rollup windows kept per device: name -> (bucket width in seconds, number of buckets kept)
+ROLLUP_WINDOWS = {
+    "1m": (60, 24 * 60),  # One day of minutes
+    "1h": (3600, 7 * 24),  # One week of hours
+}
+
+class RollupWindow():
+    """
+    Fixed-width time buckets holding the count, sum, minimum and maximum of the readings that fell in them.
+    Buckets live in a ring indexed by bucket number, so adding a reading is O(1) and old buckets are overwritten
+    in place. Columns are flat arrays (8 bytes per value), so queries read them as NumPy arrays without copying.
+    """
+    def __init__(self, resolution: float, capacity: int, columns: dict = None) -> None:
+        """
+        Initializes empty buckets.
+
+        Parameters:
+            resolution (float): Width of a bucket in seconds.
+            capacity (int): Number of most recent buckets kept.
+            columns (dict): Existing storage for the columns (see ROLLUP_COLUMNS), e.g., memoryviews of shared memory
+                            cast to "q" (index, count) and "d" (total, low, high). They are used as they are, not cleared.
+        """
+        self.resolution = resolution
+        self.capacity = capacity
+        if columns is not None:
+            self.index, self.count, self.total, self.low, self.high = (columns[column] for column in ROLLUP_COLUMNS)
+            return
+        self.index = array("q", [-1]) * capacity  # Bucket number held by each slot (-1: empty)
+        self.count = array("q", [0]) * capacity
+        self.total = array("d", [0.0]) * capacity
+        self.low = array("d", [0.0]) * capacity
+        self.high = array("d", [0.0]) * capacity
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory used by the buckets.
+        """
+        return 5 * 8 * self.capacity
+
+    def add(self, timestamp: float, value: float):
+        """
+        Adds one reading to its bucket. Readings older than the oldest kept bucket are ignored.
+        """
+        bucket = int(timestamp // self.resolution)
+        slot = bucket % self.capacity
+        current = self.index[slot]
+        if current == bucket:
+            self.count[slot] += 1
+            self.total[slot] += value
+            if value < self.low[slot]:
+                self.low[slot] = value
+            elif value > self.high[slot]:
+                self.high[slot] = value
+        elif current < bucket:
+            # First reading of a new bucket: reuse the slot of the bucket `capacity` widths older
+            self.index[slot] = bucket
+            self.count[slot] = 1
+            self.total[slot] = self.low[slot] = self.high[slot] = value
+
+    def query(self, start: float, end: float) -> dict:
+        """
+        Returns the buckets overlapping [start, end), oldest first.
+
+        Returns:
+            dict: "start" (bucket start times), "count", "min", "max" and "mean" arrays.
+        """
+        index = np.frombuffer(self.index, dtype=np.int64)
+        first, last = int(start // self.resolution), int(np.ceil(end / self.resolution)) - 1
+        slots = np.nonzero((index >= first) & (index <= last))[0]
+        slots = slots[np.argsort(index[slots])]
+        count = np.frombuffer(self.count, dtype=np.int64)[slots]
+        return {
+            "start": index[slots] * self.resolution,
+            "count": count,
+            "min": np.frombuffer(self.low, dtype=np.float64)[slots],
+            "max": np.frombuffer(self.high, dtype=np.float64)[slots],
+            "mean": np.frombuffer(self.total, dtype=np.float64)[slots] / count,
+        }
+
+    def clear(self):
+        """
+        Drops every bucket.
+        """
+        self.index[:] = array("q", [-1]) * self.capacity  # In place, so shared columns stay shared
+
+class Rollups():
+    """
+    The rollup windows of one device, updated together with each reading.
+    """
+    def __init__(self, windows: dict = ROLLUP_WINDOWS, columns: dict = None) -> None:
+        """
+        Initializes the windows.
+
+        Parameters:
+            windows (dict): Maps window names (e.g., "1m") to (bucket width in seconds, number of buckets kept).
+            columns (dict): Existing column storage of each window, by window name (see RollupWindow).
+        """
+        columns = columns or {}
+        self.windows = {
+            name: RollupWindow(resolution, capacity, columns.get(name))
+            for name, (resolution, capacity) in windows.items()
+        }
+        self._all = list(self.windows.values())
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory used by every window.
+        """
+        return sum(window.nbytes for window in self._all)
+
+    def add(self, timestamp: float, value: float):
+        """
+        Adds one reading to every window (O(1) per window).
+        """
+        for window in self._all:
+            window.add(timestamp, value)
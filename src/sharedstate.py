@@ -0,0 +1,373 @@
+import json
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from ringbuffer import RingBuffer
+from rollups import Rollups, ROLLUP_COLUMNS, ROLLUP_WINDOWS
+from registry import SensorDevice, SensorRegistry, HISTORY_SECONDS, SAMPLE_PERIOD, RESPONSE_LIMIT
+
+# Devices the shared memory segment has room for (each takes about 140 KB with the default history and rollups)
+MAX_DEVICES = 256
+
+# Bytes before the first device: the registry counters, then the layout as JSON
+HEADER_SIZE = 4096
+
+# Offset of the JSON layout in the header
+LAYOUT_OFFSET = 64
+
+# Bytes holding the name, ID, unit and queue of a device (as JSON)
+TEXT_SIZE = 256
+
+# Registry counters (int64) at the start of the header
+DEVICE_COUNT, SEQUENCE = 0, 1
+
+# Fields (int64, LAST_UPDATE is a float64) at the start of each device
+LOCK, LAST_SEQ, RESET_SEQ, STALE, STALE_SEQ, WRITTEN, LAST_UPDATE = range(7)
+FIELDS = 8
+
+# Alignment of each device in the segment
+DEVICE_ALIGNMENT = 64
+
+def device_layout(capacity: int, rollup_windows: dict):
+    """
+    Returns the offsets of a device's columns from the start of the device, and the bytes a device takes.
+    8-byte columns come first so every column is aligned to its item size.
+
+    Parameters:
+        capacity (int): Number of readings kept per device.
+        rollup_windows (dict): Rollup windows kept per device (see rollups.ROLLUP_WINDOWS).
+
+    Returns:
+        tuple: The offsets by column ("timestamps", "sequences", "values", or (window, rollup column)), and the size.
+    """
+    columns = [("timestamps", 8 * capacity), ("sequences", 8 * capacity)]
+    for window, (_, buckets) in rollup_windows.items():
+        columns += [((window, column), 8 * buckets) for column in ROLLUP_COLUMNS]
+    columns.append(("values", 4 * capacity))
+
+    offsets, offset = {}, FIELDS * 8 + TEXT_SIZE
+    for column, size in columns:
+        offsets[column] = offset
+        offset += size
+    return offsets, -(-offset // DEVICE_ALIGNMENT) * DEVICE_ALIGNMENT
+
+class SharedSegment(shared_memory.SharedMemory):
+    """
+    A shared memory segment mapped for the life of the process.
+    """
+    def __del__(self):
+        # Device columns are NumPy views of the mapping until exit, where closing it would fail:
+        # the OS unmaps it with the process instead
+        pass
+
+class SharedRingBuffer(RingBuffer):
+    """
+    A RingBuffer whose columns and write count live in shared memory.
+    """
+    def __init__(self, capacity: int, timestamps, values, sequences, fields) -> None:
+        """
+        Wraps existing columns (the samples they hold are kept).
+
+        Parameters:
+            capacity (int): Number of samples the columns hold.
+            timestamps, values, sequences: The float64, float32 and int64 column arrays.
+            fields (memoryview): The int64 fields of the device (the write count is fields[WRITTEN]).
+        """
+        self.capacity = capacity
+        self.timestamps = timestamps
+        self.values = values
+        self.sequences = sequences
+        self._fields = fields
+
+    @property
+    def _written(self) -> int:
+        return self._fields[WRITTEN]
+
+    @_written.setter
+    def _written(self, written: int):
+        self._fields[WRITTEN] = written
+
+class SharedSensorDevice(SensorDevice):
+    """
+    A SensorDevice stored in a shared memory segment: the ingest process writes it, and other processes read it
+    without locks through a seqlock. The writer makes the lock counter odd before changing the device and even
+    again afterwards. Readers copy what they need and retry if the counter was odd or changed meanwhile.
+    CPython reads and writes the counter and the columns in program order, and x86 does not reorder
+    stores with stores or loads with loads, so a reader never keeps a torn copy.
+    """
+    def __init__(self, block: memoryview, capacity: int, rollup_windows: dict, offsets: dict) -> None:
+        """
+        Wraps a device already written to the segment.
+
+        Parameters:
+            block (memoryview): The bytes of the device in the segment.
+            capacity (int): Number of readings kept.
+            rollup_windows (dict): Rollup windows kept (see rollups.ROLLUP_WINDOWS).
+            offsets (dict): Offsets of the columns in the block (see device_layout).
+        """
+        self._fields = block[:FIELDS * 8].cast("q")
+        self._times = block[:FIELDS * 8].cast("d")
+        self.name, self.device_id, self.unit, self.queue = json.loads(bytes(block[FIELDS * 8:offsets["timestamps"]]).rstrip(b"\0"))
+
+        def column(name, dtype, count):
+            return np.frombuffer(block, dtype=dtype, count=count, offset=offsets[name])
+
+        self.history = SharedRingBuffer(
+            capacity,
+            column("timestamps", np.float64, capacity),
+            column("values", np.float32, capacity),
+            column("sequences", np.int64, capacity),
+            self._fields,
+        )
+        self.rollups = Rollups(rollup_windows, {
+            window: {
+                name: block[offsets[(window, name)]:offsets[(window, name)] + 8 * buckets].cast("q" if name in ("index", "count") else "d")
+                for name in ROLLUP_COLUMNS
+            }
+            for window, (_, buckets) in rollup_windows.items()
+        })
+        self._sections = {}
+
+    @staticmethod
+    def write_text(block: memoryview, name: str, device_id: int, unit: str, queue: str):
+        """
+        Writes the name, ID, unit and queue of a new device (the queue is shortened if it does not fit).
+        """
+        text = json.dumps([name, device_id, unit, queue]).encode()
+        if len(text) > TEXT_SIZE:
+            text = json.dumps([name, device_id, unit, ""]).encode()
+        block[FIELDS * 8:FIELDS * 8 + len(text)] = text
+
+    @property
+    def last_update(self) -> float:
+        return self._times[LAST_UPDATE]
+
+    @last_update.setter
+    def last_update(self, timestamp: float):
+        self._times[LAST_UPDATE] = timestamp
+
+    @property
+    def last_seq(self) -> int:
+        return self._fields[LAST_SEQ]
+
+    @last_seq.setter
+    def last_seq(self, sequence: int):
+        self._fields[LAST_SEQ] = sequence
+
+    @property
+    def reset_seq(self) -> int:
+        return self._fields[RESET_SEQ]
+
+    @reset_seq.setter
+    def reset_seq(self, sequence: int):
+        self._fields[RESET_SEQ] = sequence
+
+    @property
+    def stale(self) -> bool:
+        return bool(self._fields[STALE])
+
+    @stale.setter
+    def stale(self, stale: bool):
+        self._fields[STALE] = int(stale)
+
+    @property
+    def stale_seq(self) -> int:
+        return self._fields[STALE_SEQ]
+
+    @stale_seq.setter
+    def stale_seq(self, sequence: int):
+        self._fields[STALE_SEQ] = sequence
+
+    def begin_write(self):
+        """
+        Marks the device as being changed (readers retry until end_write()). Only one thread may write at a time.
+        """
+        self._fields[LOCK] += 1
+
+    def end_write(self):
+        """
+        Marks the end of a change.
+        """
+        self._fields[LOCK] += 1
+
+    def read(self, function):
+        """
+        Calls a function reading the device until it ran without a concurrent change, and returns its result.
+        The function must copy what it reads (its result may not hold views of the columns).
+        """
+        fields = self._fields
+        while True:
+            version = fields[LOCK]
+            if not version & 1:
+                result = function()
+                if fields[LOCK] == version:
+                    return result
+            time.sleep(0)  # Let the writer finish
+
+    def to_dict(self, limit: int = RESPONSE_LIMIT, since: int = None, until: int = None) -> dict:
+        return self.read(lambda: SensorDevice.to_dict(self, limit, since, until))
+
+    def rollup(self, window: str, start: float, end: float) -> dict:
+        return self.read(lambda: SensorDevice.rollup(self, window, start, end))
+
+class SharedSensorRegistry(SensorRegistry):
+    """
+    A SensorRegistry kept in a shared memory segment, so several processes serve the same devices.
+    The ingest process creates the segment and records the readings; HTTP workers attach to it by name
+    and read the devices without locks (see SharedSensorDevice). The segment holds a fixed number of devices.
+    """
+    def __init__(self, segment: SharedSegment, owner: bool) -> None:
+        """
+        Wraps a segment (use create() or attach()).
+
+        Parameters:
+            segment (SharedSegment): The segment, with its layout already written.
+            owner (bool): True in the process that created the segment (the only one writing it).
+        """
+        layout = json.loads(bytes(segment.buf[LAYOUT_OFFSET:HEADER_SIZE]).rstrip(b"\0"))
+        self.segment = segment
+        self.owner = owner
+        self.capacity = layout["capacity"]
+        self.max_devices = layout["max_devices"]
+        self.rollup_windows = {window: tuple(spec) for window, spec in layout["rollup_windows"].items()}
+        self._offsets, self._device_size = device_layout(self.capacity, self.rollup_windows)
+        self._counters = segment.buf[:LAYOUT_OFFSET].cast("q")
+        self._slots = []  # Devices in segment order
+        self._devices = {}
+        self._lock = threading.Lock()  # Guards device creation and attachment in this process
+        self._sequence_lock = threading.Lock()  # Serializes the writes of the ingest threads
+        self._responses = {}
+
+    @classmethod
+    def create(cls, history_seconds: float = HISTORY_SECONDS, sample_period: float = SAMPLE_PERIOD,
+               rollup_windows: dict = ROLLUP_WINDOWS, max_devices: int = MAX_DEVICES) -> "SharedSensorRegistry":
+        """
+        Creates an empty registry in a new shared memory segment.
+
+        Parameters:
+            history_seconds (float): Seconds of history kept per device.
+            sample_period (float): Expected seconds between two readings of a device.
+            rollup_windows (dict): Rollup windows kept per device (see rollups.ROLLUP_WINDOWS).
+            max_devices (int): Number of devices the segment has room for.
+
+        Returns:
+            SharedSensorRegistry: The registry, owning the segment (see unlink()).
+        """
+        capacity = max(1, int(history_seconds / sample_period))
+        _, device_size = device_layout(capacity, rollup_windows)
+        segment = SharedSegment(create=True, size=HEADER_SIZE + max_devices * device_size)
+        layout = json.dumps({"capacity": capacity, "max_devices": max_devices, "rollup_windows": rollup_windows}).encode()
+        segment.buf[LAYOUT_OFFSET:LAYOUT_OFFSET + len(layout)] = layout
+        return cls(segment, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedSensorRegistry":
+        """
+        Attaches to the registry created by another process, for reading.
+
+        Parameters:
+            name (str): The name of the segment (SharedSensorRegistry.name in the creating process).
+        """
+        return cls(SharedSegment(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        """
+        Returns the name other processes attach to.
+        """
+        return self.segment.name
+
+    @property
+    def sequence(self) -> int:
+        return self._counters[SEQUENCE]
+
+    @sequence.setter
+    def sequence(self, sequence: int):
+        self._counters[SEQUENCE] = sequence
+
+    def _block(self, slot: int) -> memoryview:
+        """
+        Returns the bytes of the device in a slot.
+        """
+        start = HEADER_SIZE + slot * self._device_size
+        return self.segment.buf[start:start + self._device_size]
+
+    def _attach_devices(self):
+        """
+        Wraps the devices the ingest process registered since the last call (called with the registry lock held).
+        """
+        for slot in range(len(self._slots), self._counters[DEVICE_COUNT]):
+            device = SharedSensorDevice(self._block(slot), self.capacity, self.rollup_windows, self._offsets)
+            self._slots.append(device)
+            self._devices[(device.name, device.device_id)] = device
+
+    def _new_device(self, status, queue: str) -> SharedSensorDevice:
+        """
+        Writes a new device to the next free slot. Readers see it once the device count includes it.
+        """
+        slot = self._counters[DEVICE_COUNT]
+        if slot >= self.max_devices:
+            raise RuntimeError(f"No room for {status.name}:{status.deviceId} in shared memory ({self.max_devices} devices).")
+        block = self._block(slot)
+        SharedSensorDevice.write_text(block, status.name, status.deviceId, status.unit, queue)
+        device = SharedSensorDevice(block, self.capacity, self.rollup_windows, self._offsets)
+        for window in device.rollups.windows.values():
+            window.clear()
+        device.last_update = time.time()
+        self._slots.append(device)
+        self._counters[DEVICE_COUNT] = slot + 1
+        return device
+
+    def record(self, status, queue: str, timestamp: float) -> SharedSensorDevice:
+        """
+        Stores one reading (see SensorRegistry.record). The whole change is one seqlock write.
+        """
+        device = self._register(status, queue)
+        with self._sequence_lock:
+            device.begin_write()
+            device.last_update = time.time()
+            sequence = self.sequence + 1
+            device.history.append(timestamp, status.value, sequence)
+            device.last_seq = sequence
+            device.rollups.add(timestamp, status.value)
+            device.end_write()
+            self.sequence = sequence
+        device.invalidate()
+        return device
+
+    def clear(self, device: SharedSensorDevice):
+        with self._sequence_lock:
+            device.begin_write()
+            sequence = self.sequence + 1
+            device.history.clear()
+            device.reset_seq = sequence
+            device.end_write()
+            self.sequence = sequence
+        device.invalidate()
+
+    def set_stale(self, device: SharedSensorDevice, stale: bool):
+        with self._sequence_lock:
+            device.begin_write()
+            sequence = self.sequence + 1
+            device.stale = stale
+            device.stale_seq = sequence
+            device.end_write()
+            self.sequence = sequence
+        device.invalidate()
+
+    def get(self, name: str, device_id: int):
+        with self._lock:
+            self._attach_devices()
+            return self._devices.get((name, device_id))
+
+    def devices(self):
+        with self._lock:
+            self._attach_devices()
+            return list(self._slots)
+
+    def unlink(self):
+        """
+        Removes the segment once every process detached from it (called by the owner when the gateway stops).
+        """
+        self.segment.unlink()
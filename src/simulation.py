@@ -0,0 +1,137 @@
+import struct
+import time
+import numpy as np
+from proto import greenhouse_pb2
+from publisher import routing_key
+
+# Protobuf tag of DeviceStatus.value (field 3, wire type 5 = 32-bit)
+VALUE_TAG = bytes([3 << 3 | 5])
+
+# Protobuf tag of DeviceStatus.timestamp (field 5, wire type 1 = 64-bit)
+TIMESTAMP_TAG = bytes([5 << 3 | 1])
+
+class SensorArray():
+    """
+    Vectorized random-walk engine that simulates a whole fleet of sensors.
+    Every sensor value lives in one NumPy array, so one step advances all sensors at once.
+    """
+    def __init__(self, ids, names, values, units, noise=0.5, seed=None, exchange: str = '') -> None:
+        """
+        Initializes the engine.
+
+        Parameters:
+            ids (list): The device ID of each sensor (unique per sensor name).
+            names (list): The name of each sensor (e.g., "sensor_temperature").
+            values (list): The initial value of each sensor.
+            units (list): The unit of measurement of each sensor.
+            noise (float | list): Standard deviation of each random-walk step, shared or per sensor.
+            seed (int): Seed of the random generator, for reproducible runs.
+            exchange (str): Topic exchange the readings are published to ('' for per-feature queues).
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.names = list(names)
+        self.units = list(units)
+        self.values = np.asarray(values, dtype=np.float64).copy()
+        self.noise = np.broadcast_to(np.asarray(noise, dtype=np.float64), self.values.shape).copy()
+        self._rng = np.random.default_rng(seed)
+        self._index = {(name, int(device_id)): index for index, (device_id, name) in enumerate(zip(self.ids, self.names))}
+        if len(self._index) != len(self.ids):
+            raise ValueError("Sensor IDs must be unique per sensor name.")
+        self._by_id = {}  # Device ID -> array indices of the sensors with that ID
+        for index, device_id in enumerate(self.ids):
+            self._by_id.setdefault(int(device_id), []).append(index)
+
+        # Pre-serialized parts of each DeviceStatus around the value field
+        self._prefixes = [
+            greenhouse_pb2.DeviceStatus(deviceId=int(device_id), name=name).SerializeToString() + VALUE_TAG
+            for device_id, name in zip(self.ids, self.names)
+        ]
+        self._suffixes = [greenhouse_pb2.DeviceStatus(unit=unit).SerializeToString() for unit in self.units]
+        self._queues = [routing_key(name, int(device_id), exchange) for device_id, name in zip(self.ids, self.names)]
+
+    @classmethod
+    def from_sensors(cls, sensors, seed=None, exchange: str = ''):
+        """
+        Builds the engine from Sensor objects (e.g., from fleet.load_inventory).
+
+        Parameters:
+            sensors (list): The sensors to simulate.
+            seed (int): Seed of the random generator.
+            exchange (str): Topic exchange the readings are published to.
+
+        Returns:
+            SensorArray: The engine.
+        """
+        return cls(
+            ids=[sensor.id for sensor in sensors],
+            names=[sensor.name for sensor in sensors],
+            values=[sensor.value for sensor in sensors],
+            units=[sensor.unit for sensor in sensors],
+            noise=[sensor.noise for sensor in sensors],
+            seed=seed,
+            exchange=exchange,
+        )
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def step(self):
+        """
+        Advances every sensor by one random-walk step.
+        """
+        self.values += self._rng.standard_normal(len(self.values)) * self.noise  # Add random noise to every value
+        np.round(self.values, 2, out=self.values)  # Round to 2 decimal places
+
+    def index_of(self, device_id: int, name: str = None) -> int:
+        """
+        Returns the array index of a device.
+
+        Parameters:
+            device_id (int): The device ID.
+            name (str): The sensor name. Without it, the ID must belong to one sensor only.
+
+        Raises:
+            KeyError: If the device is not simulated by this engine (or the ID is ambiguous without a name).
+        """
+        if name is not None:
+            return self._index[(name, device_id)]
+        indices = self._by_id[device_id]
+        if len(indices) != 1:
+            raise KeyError(device_id)
+        return indices[0]
+
+    def set_values(self, indices, values):
+        """
+        Applies actuator setpoints to several sensors at once.
+
+        Parameters:
+            indices (int | array): Array indices of the sensors.
+            values (float | array): The new values.
+        """
+        self.values[indices] = values
+
+    def encode(self, indices=None):
+        """
+        Serializes the current readings as DeviceStatus messages, all stamped with the current time.
+        The values of all sensors are converted to float32 in one call and spliced between
+        the pre-serialized ID/name and unit fields, which is valid protobuf wire format.
+
+        Parameters:
+            indices (array): Array indices of the sensors to encode. Encodes every sensor if None.
+
+        Returns:
+            list: (routing_key, body) tuples, ready for StatusPublisher.publish_many().
+        """
+        if indices is None:
+            indices = range(len(self.values))
+            packed = self.values.astype("<f4").tobytes()
+        else:
+            indices = np.asarray(indices)
+            packed = self.values[indices].astype("<f4").tobytes()
+
+        stamp = TIMESTAMP_TAG + struct.pack("<d", time.time())
+        prefixes, suffixes, queues = self._prefixes, self._suffixes, self._queues
+        return [
+            (queues[i], prefixes[i] + packed[4 * n:4 * n + 4] + suffixes[i] + stamp)
+            for n, i in enumerate(indices)
+        ]
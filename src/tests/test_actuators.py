@@ -0,0 +1,56 @@
+import asyncio
+from actuators import ActuatorCommandQueue, CommandSuperseded
+from proto import greenhouse_pb2
+
+class RecordingPool():
+    """
+    Stands in for ActuatorChannelPool: records the commands sent, after a short call.
+    """
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def set_value(self, address: str, request):
+        await asyncio.sleep(0.01)
+        self.sent.append((address, request.name, request.deviceId, request.value))
+        return greenhouse_pb2.ActuatorResponse(success="Success")
+
+def command(name: str, device_id: int, value: float):
+    return greenhouse_pb2.ActuatorRequest(name=name, deviceId=device_id, value=value, active=True)
+
+def test_actuators_sharing_an_address_do_not_supersede_each_other():
+    pool = RecordingPool()
+
+    async def run():
+        queue = ActuatorCommandQueue(pool, rate=0)
+        return await asyncio.gather(
+            queue.submit("localhost:50051", command("actuator_temperature", 1, 22.0)),
+            queue.submit("localhost:50051", command("actuator_light", 1, 60.0)),
+        )
+
+    responses = asyncio.run(run())
+    assert [response.success for response in responses] == ["Success", "Success"]
+    assert sorted(pool.sent) == [
+        ("localhost:50051", "actuator_light", 1, 60.0),
+        ("localhost:50051", "actuator_temperature", 1, 22.0),
+    ]
+
+def test_latest_command_of_a_device_wins():
+    pool = RecordingPool()
+
+    async def run():
+        queue = ActuatorCommandQueue(pool, rate=0)
+        first = asyncio.ensure_future(queue.submit("localhost:50051", command("actuator_light", 1, 10.0)))
+        await asyncio.sleep(0)  # The first command is in flight
+        results = await asyncio.gather(
+            queue.submit("localhost:50051", command("actuator_light", 1, 20.0)),
+            queue.submit("localhost:50051", command("actuator_light", 1, 30.0)),
+            return_exceptions=True,
+        )
+        return await first, results, queue.superseded
+
+    first, (second, third), superseded = asyncio.run(run())
+    assert first.success == "Success"
+    assert isinstance(second, CommandSuperseded)
+    assert third.success == "Success"
+    assert superseded == 1
+    assert [value for *_, value in pool.sent] == [10.0, 30.0]
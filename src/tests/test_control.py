@@ -0,0 +1,64 @@
+import asyncio
+import random
+import threading
+import pytest
+from control import ControlEngine, ControlLoop, HysteresisController, PIDController
+from greenhouse import Actuator, Sensor
+from proto import greenhouse_pb2
+
+# Simulated run (the defaults of benchmarks.control): the sensor loses DRIFT every tick on top of its random walk
+TICKS, PERIOD, INITIAL, SETPOINT, DRIFT, NOISE, BAND, SEED = 300, 2.0, 15.0, 22.0, 0.3, 0.2, 0.5, 1
+
+def simulate(controller) -> list:
+    """
+    Runs a closed loop of the control engine against an in-process sensor and actuator, waiting for each
+    command before the next tick. Returns the distances to the setpoint over the second half of the run (once settled).
+    """
+    random.seed(SEED)
+    sensor = Sensor(id=1, name="sensor_temperature", value=INITIAL, unit="°C", noise=NOISE)
+    actuator = Actuator(sensor)
+
+    async def send(name, device_id, value, active, received):
+        return actuator.apply(greenhouse_pb2.ActuatorRequest(name=name, deviceId=device_id, value=value, active=active))
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    engine = ControlEngine(send)
+    engine.start(loop)
+    if controller is not None:
+        engine.set_loop(sensor.name, sensor.id, ControlLoop(controller, "actuator_temperature", sensor.id))
+
+    trajectory = []
+    try:
+        for tick in range(TICKS):
+            sensor.step()
+            sensor.value = round(sensor.value - DRIFT, 2)
+            trajectory.append(sensor.value)
+            command = engine.on_reading(sensor.name, sensor.id, sensor.value, 1_700_000_000.0 + tick * PERIOD)
+            if command is not None:
+                command.result(timeout=5)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+    return [abs(value - SETPOINT) for value in trajectory[TICKS // 2:]]
+
+def test_open_loop_drifts_away_from_the_setpoint():
+    assert min(simulate(None)) > 10 * BAND
+
+def test_pid_holds_the_setpoint_despite_the_drift():
+    errors = simulate(PIDController(SETPOINT))
+    assert sum(errors) / len(errors) < BAND
+
+def test_hysteresis_holds_the_sensor_within_the_band():
+    errors = simulate(HysteresisController(SETPOINT, band=BAND))
+    assert max(errors) <= BAND + DRIFT + 4 * NOISE
+
+def test_hysteresis_only_commands_outside_the_band():
+    controller = HysteresisController(SETPOINT, band=BAND)
+    assert controller.update(SETPOINT - BAND / 2, 0.0) is None
+    assert controller.update(SETPOINT - 2 * BAND, 1.0) is not None
+
+@pytest.mark.parametrize("value", [SETPOINT, SETPOINT + 0.001])
+def test_pid_skips_negligible_changes(value):
+    controller = PIDController(SETPOINT)
+    controller.update(value, 0.0)
+    assert controller.update(value, PERIOD) is None
@@ -0,0 +1,21 @@
+from pika import frame, spec
+from publisher import StatusPublisher
+from transport import MEMORY_HOST, get_memory_broker
+
+def test_batch_confirms_count_a_republished_message_once():
+    publisher = StatusPublisher(host=MEMORY_HOST, confirms="batch")
+    on_confirm, nacked = publisher._on_confirm, []
+
+    def nack_first(method_frame):
+        # The broker rejects the first message once: the publisher sends it again
+        if not nacked:
+            nacked.append(method_frame.method.delivery_tag)
+            method_frame = frame.Method(0, spec.Basic.Nack(delivery_tag=method_frame.method.delivery_tag))
+        on_confirm(method_frame)
+
+    publisher._on_confirm = nack_first
+    publisher.publish_many([("test_publisher.nack", b"%d" % i) for i in range(3)])
+
+    assert nacked == [1]
+    assert get_memory_broker().depth("test_publisher.nack") == 4
+    assert publisher.messages_published == 3
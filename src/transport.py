@@ -0,0 +1,426 @@
+import collections
+import heapq
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+import pika
+from pika import frame, spec
+
+# Host name selecting the in-process broker instead of RabbitMQ
+MEMORY_HOST = "memory"
+
+# Fraction of the high watermark the queued messages must fall under for the in-memory broker to clear its alarm
+ALARM_CLEAR_RATIO = 0.8
+
+# Longest a consumer waits for a message before checking its timers again
+CONSUMER_POLL = 0.05
+
+# pika major versions whose channel internals select_confirms relies on, and the installed one
+WINDOWED_CONFIRMS_PIKA = (1,)
+PIKA_MAJOR = int(pika.__version__.split(".")[0])
+
+def open_connection(host: str, blocked_timeout: float = None):
+    """
+    Opens a broker connection: to RabbitMQ, or to the process' in-memory broker if host is MEMORY_HOST.
+    Both offer the parts of pika.BlockingConnection the publishers and consumers use.
+
+    Parameters:
+        host (str): The RabbitMQ host address, or MEMORY_HOST.
+        blocked_timeout (float): Seconds the broker may block the connection (flow control) before pika closes it
+                                 (None waits forever).
+
+    Returns:
+        pika.BlockingConnection or MemoryConnection: The open connection.
+    """
+    if host == MEMORY_HOST:
+        return get_memory_broker().connect()
+    return pika.BlockingConnection(pika.ConnectionParameters(host, blocked_connection_timeout=blocked_timeout))
+
+def select_confirms(channel, on_confirm):
+    """
+    Puts a channel in publisher confirm mode without making each publish wait for its confirm
+    (pika's BlockingChannel.confirm_delivery does), so a publisher can wait once for a window of messages.
+
+    Parameters:
+        channel (pika.adapters.blocking_connection.BlockingChannel or MemoryChannel): The channel.
+        on_confirm: Called with the method frame of each Basic.Ack or Basic.Nack, while the connection
+                    processes its events.
+
+    Raises:
+        RuntimeError: If the installed pika is not one of WINDOWED_CONFIRMS_PIKA.
+    """
+    if isinstance(channel, MemoryChannel):
+        channel.on_confirm = on_confirm
+        return
+    _select_pika_confirms(channel, on_confirm)
+
+def windowed_confirms_supported(host: str) -> bool:
+    """
+    Tells whether select_confirms can put the channels of a host in confirm mode with the installed pika.
+    """
+    return host == MEMORY_HOST or PIKA_MAJOR in WINDOWED_CONFIRMS_PIKA
+
+def _select_pika_confirms(channel, on_confirm):
+    """
+    Selects confirm mode on a pika BlockingChannel through the channel it wraps, keeping its publishes unconfirmed.
+    """
+    # pika 1.x: BlockingChannel._impl is the pika.channel.Channel the blocking adapter wraps. Its public
+    # confirm_delivery(ack_nack_callback, callback) sends Confirm.Select and calls ack_nack_callback with each
+    # Basic.Ack/Nack frame from BlockingConnection.process_data_events, while BlockingChannel.basic_publish
+    # only waits for a confirm when BlockingChannel.confirm_delivery was called. Other versions may differ.
+    if PIKA_MAJOR not in WINDOWED_CONFIRMS_PIKA:
+        raise RuntimeError(f"Windowed publisher confirms need pika {WINDOWED_CONFIRMS_PIKA}, found {pika.__version__}.")
+    selected = []
+    channel._impl.confirm_delivery(ack_nack_callback=on_confirm, callback=selected.append)
+    while not selected:
+        channel.connection.process_data_events(time_limit=CONSUMER_POLL)
+
+def topic_matches(pattern: str, key: str) -> bool:
+    """
+    Tells whether a routing key matches a topic binding ("*" is one word, "#" zero or more words).
+    """
+    def match(words, keys):
+        if not words:
+            return not keys
+        if words[0] == "#":
+            return any(match(words[1:], keys[i:]) for i in range(len(keys) + 1))
+        return bool(keys) and words[0] in ("*", keys[0]) and match(words[1:], keys[1:])
+    return match(pattern.split("."), key.split("."))
+
+class MemoryBroker():
+    """
+    An in-process stand-in for RabbitMQ: named queues, topic exchanges and bindings, with the
+    publish/consume/ack semantics the gateway relies on (prefetch limits, per-channel delivery tags,
+    multiple acks). Messages are not persisted, and unacknowledged messages are not redelivered.
+    Lets the sensors and the gateway run in one process, without a broker, for tests and benchmarks.
+    With a high watermark, it raises RabbitMQ's memory alarm when that many messages are queued:
+    connections are sent Connection.Blocked and publishes wait until the depth falls under
+    ALARM_CLEAR_RATIO of the watermark.
+    """
+    def __init__(self, high_watermark: int = None) -> None:
+        """
+        Parameters:
+            high_watermark (int): Queued messages that raise the memory alarm (None: never raised).
+        """
+        self.high_watermark = high_watermark
+        self.alarm = False  # Publishers are blocked
+        self.published = 0  # Messages routed to at least one queue
+        self.unroutable = 0  # Messages dropped because no queue matched
+        self._queued = 0  # Messages in every queue
+        self._connections = []  # Connections told about the alarm
+        self._queues = {}  # Queue name -> deque of (exchange, routing key, properties, body)
+        self._bindings = collections.defaultdict(list)  # Exchange -> [(pattern, queue)]
+        self._names = itertools.count(1)
+        self._condition = threading.Condition()  # Wakes consumers on new messages and callbacks
+
+    def connect(self) -> "MemoryConnection":
+        """
+        Opens a connection to the broker.
+        """
+        return MemoryConnection(self)
+
+    def declare_queue(self, name: str) -> str:
+        """
+        Declares a queue (a server-named one if name is empty) and returns its name.
+        """
+        with self._condition:
+            if not name:
+                name = f"amq.gen-{next(self._names)}"
+            self._queues.setdefault(name, collections.deque())
+            return name
+
+    def bind(self, exchange: str, queue: str, pattern: str):
+        """
+        Routes the messages published to a topic exchange with a matching routing key to a queue.
+        """
+        with self._condition:
+            if (pattern, queue) not in self._bindings[exchange]:
+                self._bindings[exchange].append((pattern, queue))
+
+    def publish(self, exchange: str, key: str, properties, body: bytes):
+        """
+        Routes a message: to the queue named by the routing key on the default exchange,
+        or to every queue bound with a matching pattern on a topic exchange.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not self.alarm)  # The broker stops reading from blocked publishers
+            if exchange:
+                targets = [queue for pattern, queue in self._bindings.get(exchange, ()) if topic_matches(pattern, key)]
+            else:
+                targets = [key] if key in self._queues else []
+            for queue in targets:
+                self._queues[queue].append((exchange, key, properties, body))
+            if targets:
+                self.published += 1
+                self._queued += len(targets)
+                self._update_alarm()
+                self._condition.notify_all()
+            else:
+                self.unroutable += 1
+
+    def take(self, queues):
+        """
+        Removes and returns the oldest message of the first non-empty queue, or None.
+        """
+        with self._condition:
+            for queue in queues:
+                messages = self._queues.get(queue)
+                if messages:
+                    self._queued -= 1
+                    self._update_alarm()
+                    return queue, messages.popleft()
+            return None
+
+    def watch_alarm(self, connection: "MemoryConnection"):
+        """
+        Tells a connection about memory alarm changes (and about the current alarm, if raised).
+        """
+        with self._condition:
+            self._connections.append(connection)
+            if self.alarm:
+                connection.on_alarm(True)
+
+    def _update_alarm(self):
+        """
+        Raises or clears the memory alarm (call with the lock held).
+        """
+        if self.high_watermark is None:
+            return
+        if self.alarm:
+            alarm = self._queued >= self.high_watermark * ALARM_CLEAR_RATIO
+        else:
+            alarm = self._queued >= self.high_watermark
+        if alarm != self.alarm:
+            self.alarm = alarm
+            self._connections = [connection for connection in self._connections if connection.is_open]
+            for connection in self._connections:
+                connection.on_alarm(alarm)
+            self._condition.notify_all()
+
+    def has_messages(self, queues) -> bool:
+        """
+        Tells whether one of the queues holds a message (call with the lock held, e.g., from wait()).
+        """
+        return any(self._queues.get(queue) for queue in queues)
+
+    def depth(self, queue: str = None) -> int:
+        """
+        Returns the number of messages waiting in a queue, or in every queue.
+        """
+        with self._condition:
+            if queue is not None:
+                return len(self._queues.get(queue, ()))
+            return sum(len(messages) for messages in self._queues.values())
+
+    def wait(self, timeout: float, ready):
+        """
+        Blocks until ready() is true, rechecked whenever something is published or a callback is scheduled,
+        or until the timeout passes. ready() is called with the broker lock held, so no wakeup is missed.
+        """
+        with self._condition:
+            self._condition.wait_for(ready, timeout)
+
+    def wake(self):
+        """
+        Wakes the waiting consumers.
+        """
+        with self._condition:
+            self._condition.notify_all()
+
+class MemoryConnection():
+    """
+    A connection to the in-memory broker, with the interface of pika.BlockingConnection.
+    Callbacks and timers run on the thread consuming from the connection's channel, as with pika.
+    """
+    def __init__(self, broker: MemoryBroker) -> None:
+        self.broker = broker
+        self.is_open = True
+        self._callbacks = collections.deque()
+        self._timers = []  # (due time, order, callback)
+        self._order = itertools.count()
+        self._blocked_callbacks = []
+        self._unblocked_callbacks = []
+
+    def channel(self) -> "MemoryChannel":
+        """
+        Opens a channel on the connection.
+        """
+        return MemoryChannel(self)
+
+    def add_callback_threadsafe(self, callback):
+        """
+        Runs a callback on the connection's consumer thread (safe to call from any thread).
+        """
+        self._callbacks.append(callback)
+        self.broker.wake()
+
+    def has_callbacks(self) -> bool:
+        """
+        Tells whether callbacks wait to run on the consumer thread.
+        """
+        return bool(self._callbacks)
+
+    def call_later(self, delay: float, callback):
+        """
+        Runs a callback on the connection's consumer thread after a delay.
+        """
+        heapq.heappush(self._timers, (time.monotonic() + delay, next(self._order), callback))
+
+    def process_events(self) -> float:
+        """
+        Runs the pending callbacks and the due timers.
+
+        Returns:
+            float: Seconds until the next timer (CONSUMER_POLL at most).
+        """
+        while self._callbacks:
+            self._callbacks.popleft()()
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            heapq.heappop(self._timers)[2]()
+        if self._timers:
+            return min(CONSUMER_POLL, max(0.0, self._timers[0][0] - time.monotonic()))
+        return CONSUMER_POLL
+
+    def add_on_connection_blocked_callback(self, callback):
+        """
+        Calls callback(connection, method_frame) when the broker raises its memory alarm.
+        """
+        self._blocked_callbacks.append(callback)
+        self.broker.watch_alarm(self)
+
+    def add_on_connection_unblocked_callback(self, callback):
+        """
+        Calls callback(connection, method_frame) when the broker clears its memory alarm.
+        """
+        self._unblocked_callbacks.append(callback)
+
+    def on_alarm(self, alarm: bool):
+        """
+        Runs the blocked or unblocked callbacks (called by the broker, with its lock held).
+        """
+        if alarm:
+            method_frame = frame.Method(0, spec.Connection.Blocked("memory alarm"))
+            callbacks = self._blocked_callbacks
+        else:
+            method_frame = frame.Method(0, spec.Connection.Unblocked())
+            callbacks = self._unblocked_callbacks
+        for callback in callbacks:
+            callback(self, method_frame)
+
+    def process_data_events(self, time_limit: float = 0):
+        """
+        Waits up to time_limit seconds for the memory alarm to clear (the only event publishers receive).
+        """
+        self.broker.wait(time_limit, lambda: not self.broker.alarm or not self.is_open)
+
+    def close(self):
+        """
+        Closes the connection.
+        """
+        self.is_open = False
+        self.broker.wake()
+
+class MemoryChannel():
+    """
+    A channel of the in-memory broker, with the parts of pika's BlockingChannel the gateway and publishers use.
+    """
+    def __init__(self, connection: MemoryConnection) -> None:
+        self.connection = connection
+        self.broker = connection.broker
+        self.prefetch = 0  # 0: no limit
+        self._consumers = {}  # Queue -> (callback, auto_ack)
+        self._order = []  # Consumed queues, rotated after each delivery so no queue starves the others
+        self._unacked = set()
+        self._tags = itertools.count(1)  # Delivery tags start at 1 on each channel
+        self._consuming = False
+        self.on_confirm = None  # Confirm callback set by select_confirms
+        self._published = 0  # Messages published since confirm mode was selected
+
+    @property
+    def is_open(self) -> bool:
+        return self.connection.is_open
+
+    def basic_qos(self, prefetch_count: int = 0, **kwargs):
+        self.prefetch = prefetch_count
+
+    def confirm_delivery(self):
+        pass  # In-memory publishes cannot be lost
+
+    def tx_select(self):
+        pass
+
+    def tx_commit(self):
+        pass
+
+    def exchange_declare(self, exchange: str, exchange_type: str = "direct", **kwargs):
+        pass  # Exchanges exist as soon as a queue is bound to them
+
+    def queue_declare(self, queue: str = "", **kwargs):
+        name = self.broker.declare_queue(queue)
+        return SimpleNamespace(method=SimpleNamespace(queue=name))
+
+    def queue_bind(self, queue: str, exchange: str, routing_key: str = None, **kwargs):
+        self.broker.bind(exchange, queue, routing_key or queue)
+
+    def basic_publish(self, exchange: str, routing_key: str, body: bytes, properties=None, **kwargs):
+        self.broker.publish(exchange, routing_key, properties or spec.BasicProperties(), body)
+        if self.on_confirm is not None:
+            self._published += 1
+            self.on_confirm(frame.Method(0, spec.Basic.Ack(delivery_tag=self._published)))  # Queued in memory: confirmed at once
+
+    def basic_consume(self, queue: str, on_message_callback, auto_ack: bool = False, **kwargs):
+        self._consumers[queue] = (on_message_callback, auto_ack)
+        self._order.append(queue)
+        return f"ctag-{queue}"
+
+    def basic_ack(self, delivery_tag: int = 0, multiple: bool = False):
+        if multiple:
+            self._unacked = {tag for tag in self._unacked if tag > delivery_tag}
+        else:
+            self._unacked.discard(delivery_tag)
+
+    def start_consuming(self):
+        """
+        Delivers messages to the consumers' callbacks, never more than the prefetch count unacknowledged,
+        and runs the connection's callbacks and timers, until stop_consuming() or the connection closes.
+        """
+        self._consuming = True
+        has_callbacks = self.connection.has_callbacks
+        while self._consuming and self.connection.is_open:
+            timeout = self.connection.process_events()
+            if self.prefetch and len(self._unacked) >= self.prefetch:
+                # Wait for acknowledgements (sent through add_callback_threadsafe)
+                self.broker.wait(timeout, lambda: has_callbacks() or not self._consuming)
+                continue
+            taken = self.broker.take(self._order)
+            if taken is None:
+                self.broker.wait(timeout, lambda: has_callbacks() or self.broker.has_messages(self._order) or not self._consuming)
+                continue
+            queue, (exchange, key, properties, body) = taken
+            self._order.append(self._order.pop(self._order.index(queue)))
+            callback, auto_ack = self._consumers[queue]
+            tag = next(self._tags)
+            if not auto_ack:
+                self._unacked.add(tag)
+            callback(self, spec.Basic.Deliver(f"ctag-{queue}", tag, False, exchange, key), properties, body)
+
+    def stop_consuming(self):
+        self._consuming = False
+        self.broker.wake()
+
+# Broker shared by everything in the process that connects to MEMORY_HOST
+_memory_broker = None
+_memory_lock = threading.Lock()
+
+def get_memory_broker() -> MemoryBroker:
+    """
+    Returns the process-wide in-memory broker, creating it on first use.
+    """
+    global _memory_broker
+
+    with _memory_lock:
+        if _memory_broker is None:
+            _memory_broker = MemoryBroker()
+        return _memory_broker
@@ -0,0 +1,300 @@
+import bisect
+import mmap
+import os
+import threading
+import time
+import numpy as np
+
+# Layout of one reading on disk: time of the reading (seconds since the epoch) and value
+RECORD_DTYPE = np.dtype([("t", "<f8"), ("v", "<f4")])
+
+# Segment file header: magic, record count, record capacity (padded to 64 bytes)
+SEGMENT_MAGIC = b"GHTS0001"
+HEADER_SIZE = 64
+
+# Records per segment file (~36 hours of readings every 2 seconds)
+SEGMENT_RECORDS = 65536
+
+# One timestamp out of INDEX_STRIDE records is kept in the in-memory sparse index
+INDEX_STRIDE = 256
+
+# Seconds of history kept on disk
+RETENTION_SECONDS = 28 * 24 * 3600
+
+class Segment():
+    """
+    One fixed-size, memory-mapped file of time-ordered records.
+    """
+    def __init__(self, path: str, capacity: int = SEGMENT_RECORDS) -> None:
+        """
+        Opens a segment file, creating and preallocating it if it does not exist.
+
+        Parameters:
+            path (str): Path to the segment file.
+            capacity (int): Number of records of a new segment (existing files keep their own capacity).
+        """
+        self.path = path
+        if not os.path.exists(path):
+            with open(path, "wb") as file:
+                file.truncate(HEADER_SIZE + capacity * RECORD_DTYPE.itemsize)
+                file.seek(0)
+                file.write(SEGMENT_MAGIC + np.array([0, capacity], dtype="<u8").tobytes())
+
+        with open(path, "r+b") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0)
+        if self._mmap[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not a segment file.")
+
+        # Header fields and records are NumPy views over the mapping (no copies)
+        self._header = np.frombuffer(self._mmap, dtype="<u8", count=2, offset=len(SEGMENT_MAGIC))
+        self.capacity = int(self._header[1])
+        self._records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=self.capacity, offset=HEADER_SIZE)
+
+        # Sparse index: the timestamp of every INDEX_STRIDE-th record
+        self._index = self.records()["t"][::INDEX_STRIDE].tolist()
+
+    def __len__(self) -> int:
+        return int(self._header[0])
+
+    @property
+    def full(self) -> bool:
+        return len(self) >= self.capacity
+
+    @property
+    def first_time(self) -> float:
+        return float(self._records["t"][0]) if len(self) else float("inf")
+
+    @property
+    def last_time(self) -> float:
+        return float(self._records["t"][len(self) - 1]) if len(self) else float("-inf")
+
+    def records(self):
+        """
+        Returns the written records as a read-only view of the mapping.
+        """
+        view = self._records[:len(self)]
+        view.flags.writeable = False
+        return view
+
+    def append(self, timestamp: float, value: float):
+        """
+        Appends one record. The count is updated after the record so readers never see a partial record.
+        """
+        count = len(self)
+        self._records[count] = (timestamp, value)
+        if count % INDEX_STRIDE == 0:
+            self._index.append(timestamp)
+        self._header[0] = count + 1
+
+    def search(self, start: float, end: float):
+        """
+        Returns the records with start <= t < end.
+        The sparse index narrows the search to a few pages, then a binary search runs over the mapped timestamps.
+        """
+        records = self.records()
+        low = max(bisect.bisect_left(self._index, start) - 1, 0) * INDEX_STRIDE
+        high = min(bisect.bisect_left(self._index, end) * INDEX_STRIDE + INDEX_STRIDE, len(records))
+        window = records["t"][low:high]
+        first = low + int(np.searchsorted(window, start, side="left"))
+        last = low + int(np.searchsorted(window, end, side="left"))
+        return records[first:last]
+
+    def flush(self):
+        """
+        Writes the mapped pages back to the file.
+        """
+        self._mmap.flush()
+
+class OutOfOrderReading(ValueError):
+    """
+    Raised when a reading is older than the newest reading stored for its device (it is not stored).
+    """
+
+class Series():
+    """
+    The segments of one device, ordered by time. Only the newest segment is written to.
+    """
+    def __init__(self, directory: str, segment_records: int = SEGMENT_RECORDS) -> None:
+        """
+        Opens (or creates) the segments stored in a directory.
+
+        Parameters:
+            directory (str): The directory holding the segment files of the device.
+            segment_records (int): Number of records of each new segment.
+        """
+        self.directory = directory
+        self.segment_records = segment_records
+        os.makedirs(directory, exist_ok=True)
+        names = sorted(name for name in os.listdir(directory) if name.endswith(".seg"))
+        self.segments = [Segment(os.path.join(directory, name)) for name in names]
+        self.out_of_order = 0  # Readings rejected because they are older than the newest stored one
+        self._lock = threading.Lock()
+
+    def append(self, timestamp: float, value: float):
+        """
+        Appends one reading, rolling over to a new segment when the newest one is full.
+        Segments stay sorted for binary search: a reading older than the newest stored one
+        (clock skew, a replay of an older recording) is rejected and counted in out_of_order.
+
+        Returns:
+            bool: True if a new segment was created.
+
+        Raises:
+            OutOfOrderReading: If the reading is older than the newest stored one.
+        """
+        with self._lock:
+            rolled = False
+            if self.segments and timestamp < self.segments[-1].last_time:
+                self.out_of_order += 1
+                raise OutOfOrderReading(f"Reading at {timestamp} is older than the newest stored one ({self.segments[-1].last_time}).")
+            if not self.segments or self.segments[-1].full:
+                if self.segments:
+                    self.segments[-1].flush()
+                # Segment files are named after their first timestamp (in microseconds) so they sort by time
+                path = os.path.join(self.directory, f"{int(timestamp * 1e6):020d}.seg")
+                self.segments.append(Segment(path, self.segment_records))
+                rolled = True
+            self.segments[-1].append(timestamp, value)
+            return rolled
+
+    def query(self, start: float, end: float):
+        """
+        Returns the timestamps and values of the readings with start <= t < end.
+        """
+        segments = list(self.segments)
+        # Skip the segments that end before the range with a binary search on their first timestamps
+        first = max(bisect.bisect_left([segment.first_time for segment in segments], start) - 1, 0)
+        parts = []
+        for segment in segments[first:]:
+            if segment.first_time >= end:
+                break
+            parts.append(segment.search(start, end))
+        records = np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+        return records["t"], records["v"]
+
+    def drop_before(self, cutoff: float):
+        """
+        Deletes the segments whose newest reading is older than the cutoff (never the segment being written).
+        """
+        with self._lock:
+            while len(self.segments) > 1 and self.segments[0].last_time < cutoff:
+                segment = self.segments.pop(0)
+                # Readers may still hold views of the mapping, so the file is unlinked and the mapping left to the GC
+                os.remove(segment.path)
+
+class TimeSeriesStore():
+    """
+    Append-only, segmented on-disk store of sensor readings, one series per (name, deviceId).
+    """
+    def __init__(self, root: str, retention_seconds: float = RETENTION_SECONDS, segment_records: int = SEGMENT_RECORDS) -> None:
+        """
+        Opens the store, loading every series already on disk.
+
+        Parameters:
+            root (str): The directory of the store. Series live in "<root>/<name>/<deviceId>/".
+            retention_seconds (float): Seconds of history to keep. Older segments are deleted on rollover.
+            segment_records (int): Number of records of each new segment.
+        """
+        self.root = root
+        self.retention_seconds = retention_seconds
+        self.segment_records = segment_records
+        self._series = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(root, exist_ok=True)
+        for name in os.listdir(root):
+            if not os.path.isdir(os.path.join(root, name)):
+                continue  # e.g., a stray file next to the series directories
+            for device_id in os.listdir(os.path.join(root, name)):
+                if device_id.isdigit() and os.path.isdir(os.path.join(root, name, device_id)):
+                    self._series[(name, int(device_id))] = Series(os.path.join(root, name, device_id), segment_records)
+        self.enforce_retention()
+
+    def append(self, name: str, device_id: int, timestamp: float, value: float):
+        """
+        Stores one reading.
+
+        Parameters:
+            name (str): The name of the sensor.
+            device_id (int): The ID of the device.
+            timestamp (float): The time of the reading (seconds since the epoch).
+            value (float): The sensor value.
+
+        Raises:
+            OutOfOrderReading: If the reading is older than the newest reading stored for the device.
+        """
+        key = (name, device_id)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    series = Series(os.path.join(self.root, name, str(device_id)), self.segment_records)
+                    self._series[key] = series
+        if series.append(timestamp, value):
+            series.drop_before(time.time() - self.retention_seconds)
+
+    @property
+    def out_of_order(self) -> int:
+        """
+        Returns the number of readings rejected because they were older than their device's newest one.
+        """
+        return sum(series.out_of_order for series in list(self._series.values()))
+
+    def device_ids(self, name: str):
+        """
+        Returns the IDs of the stored devices of a sensor.
+        """
+        return sorted(device_id for series_name, device_id in self._series if series_name == name)
+
+    def query(self, name: str, device_id: int, start: float, end: float, step: float = None):
+        """
+        Returns the readings of one device in a time range, optionally averaged over fixed steps.
+
+        Parameters:
+            name (str): The name of the sensor.
+            device_id (int): The ID of the device.
+            start (float): Start of the range (inclusive, seconds since the epoch).
+            end (float): End of the range (exclusive).
+            step (float): Bucket width in seconds. Readings are returned raw if None.
+
+        Returns:
+            tuple: The timestamps and values arrays (None if the device is not stored).
+        """
+        series = self._series.get((name, device_id))
+        if series is None:
+            return None
+        timestamps, values = series.query(start, end)
+        if step:
+            timestamps, values = downsample(timestamps, values, start, step)
+        return timestamps, values
+
+    def enforce_retention(self):
+        """
+        Deletes the segments older than the retention period in every series.
+        """
+        cutoff = time.time() - self.retention_seconds
+        for series in list(self._series.values()):
+            series.drop_before(cutoff)
+
+def downsample(timestamps, values, start: float, step: float):
+    """
+    Averages readings over fixed-width time buckets.
+
+    Parameters:
+        timestamps (array): Sorted reading times.
+        values (array): Reading values.
+        start (float): Start of the first bucket.
+        step (float): Bucket width in seconds.
+
+    Returns:
+        tuple: The start time and mean value of every non-empty bucket.
+    """
+    if len(timestamps) == 0:
+        return timestamps, values.astype(np.float64)
+    buckets = ((timestamps - start) // step).astype(np.int64)
+    bounds = np.flatnonzero(np.diff(buckets)) + 1  # Index of the first reading of each bucket
+    first = np.concatenate(([0], bounds))
+    sums = np.add.reduceat(values.astype(np.float64), first)
+    counts = np.diff(np.concatenate((first, [len(values)])))
+    return start + buckets[first] * step, sums / counts